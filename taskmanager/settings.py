@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .database import database_from_env, replicas_from_env, shards_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,11 +46,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that session and authentication queries are counted too
+    'tasks.metrics.MetricsMiddleware',
+    'tasks.querybudget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tasks.routers.DatabaseRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,14 +81,104 @@ WSGI_APPLICATION = 'taskmanager.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Configured by DATABASE_URL (SQLite by default, or PostgreSQL) with
+# persistent or pooled connections; see taskmanager/database.py.
 
 DATABASES = {
+    'default': database_from_env(os.environ, BASE_DIR),
+    **replicas_from_env(os.environ, BASE_DIR),
+    **shards_from_env(os.environ, BASE_DIR),
+}
+
+# Databases holding tasks, sharded by owner (DATABASE_SHARD_URLS); the
+# default database also keeps users and the shard directory. Only append:
+# a shard's position sets its range of task ids.
+TASK_SHARDS = ['default', *(alias for alias in DATABASES if alias.startswith('shard_'))]
+
+# Task reads during requests go to the replicas (DATABASE_REPLICA_URLS),
+# except for TASK_REPLICA_STICKY_SECONDS after the user modified a task, so
+# they always read their own writes; keep it above the replication lag.
+DATABASE_ROUTERS = ['tasks.routers.ShardRouter', 'tasks.routers.ReplicaRouter']
+TASK_READ_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+TASK_REPLICA_STICKY_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Per-process memory cache; point this at a shared backend (Redis,
+# Memcached) when running several workers so invalidations are seen by all.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Cache used for per-user task lists and stats, and how long entries live
+TASK_CACHE_ALIAS = 'default'
+TASK_CACHE_TIMEOUT = 300
+
+# Delta sync (/api/tasks/changes/): how long deletions are remembered, and
+# how many seconds of changes each sync repeats to cover in-flight writes
+TASK_TOMBSTONE_RETENTION_DAYS = 30
+TASK_SYNC_CURSOR_OVERLAP_SECONDS = 5
+
+# Rows fetched per database round trip by the streaming export
+TASK_EXPORT_CHUNK_SIZE = 2000
+
+# Streaming import: records validated and inserted per transaction, and
+# how many invalid records are reported back in detail
+TASK_IMPORT_BATCH_SIZE = 1000
+TASK_IMPORT_ERROR_LIMIT = 100
+
+# Views over their query budget (see tasks.querybudget) raise in development
+# and tests, and only log a warning in production
+TASK_QUERY_BUDGET_RAISE = DEBUG
+
+# /metrics (Prometheus text format). With several worker processes, point
+# TASK_METRICS_DIR at a directory shared by all workers of this deployment
+# (emptied on deploy) so every scrape sees all of them. When
+# TASK_METRICS_TOKEN is set, scrapers must send "Authorization: Bearer <token>".
+TASK_METRICS_DIR = os.environ.get('TASK_METRICS_DIR') or None
+TASK_METRICS_FLUSH_SECONDS = 1.0
+TASK_METRICS_TOKEN = os.environ.get('TASK_METRICS_TOKEN') or None
+
+# Server-Sent Events of task changes (/api/async/tasks/events/). The
+# in-process broker only reaches clients of the same worker process; run a
+# single ASGI worker or point TASK_EVENTS_BROKER at a pub/sub-backed broker.
+# Idle streams get a keepalive comment every TASK_EVENTS_KEEPALIVE_SECONDS;
+# clients more than TASK_EVENTS_QUEUE_SIZE events behind are told to resync.
+TASK_EVENTS_BROKER = 'tasks.events.InProcessBroker'
+TASK_EVENTS_KEEPALIVE_SECONDS = 15
+TASK_EVENTS_QUEUE_SIZE = 100
+
+# Background jobs (tasks.jobs, run by "manage.py run_workers"): attempts
+# per job and the delay before the first retry (doubled after each one),
+# how long a worker may go without reporting progress before its job is
+# run again, and per user, jobs running at once and queued or running.
+# Imports larger than TASK_IMPORT_INLINE_MAX_BYTES, or sent with
+# "Prefer: respond-async", run as jobs. Job files are kept in the
+# TASK_JOB_STORAGE storage, which web and worker processes must share.
+TASK_JOB_MAX_ATTEMPTS = 3
+TASK_JOB_RETRY_DELAY_SECONDS = 30
+TASK_JOB_LOCK_SECONDS = 300
+TASK_JOB_USER_CONCURRENCY = 1
+TASK_JOB_USER_QUEUE_LIMIT = 10
+TASK_JOB_BATCH_SIZE = 1000
+TASK_JOB_RETENTION_DAYS = 7
+TASK_JOB_STORAGE = 'default'
+TASK_IMPORT_INLINE_MAX_BYTES = 1024 * 1024
+
+# Overdue reminders (tasks.reminders, run by "manage.py run_overdue_scheduler"):
+# seconds between scheduler ticks, open tasks read per query, how long sent
+# reminders are kept, and the notifier sending them: ConsoleNotifier, or
+# FileNotifier appending JSON lines to TASK_REMINDER_FILE
+TASK_REMINDER_INTERVAL_SECONDS = 60
+TASK_REMINDER_BATCH_SIZE = 1000
+TASK_REMINDER_RETENTION_DAYS = 30
+TASK_REMINDER_NOTIFIER = 'tasks.reminders.ConsoleNotifier'
+TASK_REMINDER_FILE = BASE_DIR / 'reminders.ndjson'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -119,6 +216,9 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files, including background job files
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -131,8 +231,8 @@ LOGOUT_REDIRECT_URL = '/'
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
-        'rest_framework.filters.OrderingFilter',
+        'tasks.filters.TaskSearchFilter',
+        'tasks.filters.TaskOrderingFilter',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
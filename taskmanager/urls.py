@@ -17,6 +17,9 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from tasks.health import health_view
+from tasks.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # Handles login, logout, password reset, etc.
@@ -24,4 +27,8 @@ urlpatterns = [
     # Handles our app's pages (dashboard, signup)
     path('', include('tasks.urls')),
     path('api/', include('tasks.api_urls')),
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
+    # Load balancer health check (database round trip)
+    path('health', health_view, name='health'),
 ]
\ No newline at end of file
@@ -1,6 +1,15 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import TaskViewSet
+from .async_views import AsyncTaskDetailView, AsyncTaskEventsView, AsyncTaskListView
+from .views import JobViewSet, TaskViewSet
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet, basename='task')
-urlpatterns = router.urls
\ No newline at end of file
+router.register(r'jobs', JobViewSet, basename='job')
+urlpatterns = router.urls + [
+    # ASGI-native alternative to /api/tasks/ (list, retrieve, create, update, delete)
+    path('async/tasks/', AsyncTaskListView.as_view(), name='async-task-list'),
+    path('async/tasks/<int:pk>/', AsyncTaskDetailView.as_view(), name='async-task-detail'),
+    # Server-Sent Events stream of task changes
+    path('async/tasks/events/', AsyncTaskEventsView.as_view(), name='async-task-events'),
+]
\ No newline at end of file
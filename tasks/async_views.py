@@ -0,0 +1,209 @@
+"""
+ASGI-native versions of the task API list/retrieve/create/update/delete.
+
+These run on the event loop end to end: authentication, the async ORM and
+JSON rendering never block a worker thread (the ORM still hops to its
+executor thread for each query, as Django does for every async query).
+They share TaskFilter and TaskSerializer with TaskViewSet and return the
+same payloads. Responses are not cached and carry no ETag; use the
+regular /api/tasks/ for those.
+
+AsyncTaskEventsView streams the user's task changes as Server-Sent Events
+(see ``tasks.events``), so clients need not poll the list.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import ParseError
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .events import RESYNC, format_event, get_broker, get_keepalive_interval, make_event
+from .filters import TaskFilter
+from .models import Task
+from .search import SEARCH_RANK, is_searched
+from .serializes import TaskSerializer
+from .sharding import get_owner_shard, is_sharded
+
+
+class AsyncTaskAPIView(View):
+    """
+    Session-authenticated JSON view, the async counterpart of an APIView
+    """
+    page_size = api_settings.PAGE_SIZE
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.user = await request.auser()
+        # The routers read request.user, which would fetch the user again
+        # with a sync query
+        request.user = self.user
+        if not self.user.is_authenticated:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+        # Looking the shard up may query the directory, a sync query
+        self.shard = await sync_to_async(get_owner_shard)(self.user.pk) if is_sharded() else DEFAULT_DB_ALIAS
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except ParseError as exc:
+            return JsonResponse({'detail': exc.detail}, status=400)
+
+    def get_queryset(self):
+        return Task.objects.in_shard(self.shard).filter(owner=self.user)
+
+    def get_data(self, request):
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                raise ParseError('JSON parse error.')
+        # Form-encoded bodies are only parsed by Django for POST
+        return request.POST
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        response = await super().http_method_not_allowed(request, *args, **kwargs)
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405, headers={'Allow': response['Allow']})
+
+
+class AsyncTaskListView(AsyncTaskAPIView):
+    # Session, user, count, page (the first search of a process also looks
+    # up the FTS table); insert and counters (2) for POST
+    query_budgets = {
+        'get': 5,
+        'post': 5,
+    }
+
+    async def get(self, request):
+        filterset = TaskFilter(request.GET, queryset=self.get_queryset())
+        if not filterset.is_valid():
+            return JsonResponse(filterset.errors, status=400)
+        # Searching asks the routers for the queryset's database, and the
+        # first search looks up the FTS table: sync queries
+        queryset = await sync_to_async(lambda: filterset.qs)()
+        if request.GET.get('ordering'):
+            # id breaks ties so pages don't overlap
+            queryset = queryset.order_by(*queryset.query.order_by, 'id')
+        else:
+            queryset = queryset.order_by(SEARCH_RANK if is_searched(queryset) else 'due_date', 'id')
+
+        count = await queryset.acount()
+        try:
+            page = int(request.GET.get('page', 1))
+        except ValueError:
+            page = 0
+        if page < 1 or (page > 1 and (page - 1) * self.page_size >= count):
+            return JsonResponse({'detail': 'Invalid page.'}, status=404)
+
+        offset = (page - 1) * self.page_size
+        reader = TaskSerializer.get_row_reader()
+        rows = [row async for row in queryset.values(*reader.values())[offset:offset + self.page_size]]
+        url = request.build_absolute_uri()
+        return JsonResponse({
+            'count': count,
+            'next': replace_query_param(url, 'page', page + 1) if offset + self.page_size < count else None,
+            'previous': (
+                None if page == 1 else
+                remove_query_param(url, 'page') if page == 2 else
+                replace_query_param(url, 'page', page - 1)
+            ),
+            'results': reader.represent(rows),
+        })
+
+    async def post(self, request):
+        serializer = TaskSerializer(data=self.get_data(request))
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        task = await Task.objects.in_shard(self.shard).acreate(owner=self.user, **serializer.validated_data)
+        return JsonResponse(TaskSerializer(task).data, status=201)
+
+
+class AsyncTaskDetailView(AsyncTaskAPIView):
+    # Session, user, task; update or delete + tombstone, and counters (2)
+    query_budgets = {
+        'get': 3,
+        'put': 6,
+        'patch': 6,
+        'delete': 7,
+    }
+
+    async def get_object(self, pk):
+        try:
+            return await self.get_queryset().aget(pk=pk)
+        except Task.DoesNotExist:
+            return None
+
+    async def get(self, request, pk):
+        task = await self.get_object(pk)
+        if task is None:
+            return self.not_found()
+        return JsonResponse(TaskSerializer(task).data)
+
+    async def put(self, request, pk, partial=False):
+        task = await self.get_object(pk)
+        if task is None:
+            return self.not_found()
+        serializer = TaskSerializer(task, data=self.get_data(request), partial=partial)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        for attr, value in serializer.validated_data.items():
+            setattr(task, attr, value)
+        await task.asave()
+        return JsonResponse(TaskSerializer(task).data)
+
+    async def patch(self, request, pk):
+        return await self.put(request, pk, partial=True)
+
+    async def delete(self, request, pk):
+        task = await self.get_object(pk)
+        if task is None:
+            return self.not_found()
+        await task.adelete()
+        return HttpResponse(status=204)
+
+    def not_found(self):
+        return JsonResponse({'detail': 'No Task matches the given query.'}, status=404)
+
+
+class AsyncTaskEventsView(AsyncTaskAPIView):
+    """
+    Server-Sent Events stream of the user's task changes.
+
+    Events are ``created`` and ``updated`` (the task), ``deleted`` (its id)
+    and ``resync`` (refetch the list, or delta sync from the last cursor).
+    A client reconnecting with ``Last-Event-ID`` may have missed events
+    meanwhile, so its stream starts with ``resync``.
+    """
+    # Session, user; events carry their data, the stream runs no query
+    query_budgets = {
+        'get': 2,
+    }
+    retry_ms = 3000
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # A WSGI worker would be held for as long as the client listens
+            return JsonResponse({'detail': 'Event streams are only served under ASGI.'}, status=501)
+        broker = get_broker()
+        # Subscribed before responding, so no change is missed in between
+        subscription = broker.subscribe(self.user.pk)
+        resync = 'Last-Event-ID' in request.headers
+
+        async def stream():
+            try:
+                yield f'retry: {self.retry_ms}\n\n'
+                if resync:
+                    yield format_event(make_event(RESYNC, {}))
+                keepalive = get_keepalive_interval()
+                while True:
+                    event = await subscription.get(timeout=keepalive)
+                    # Comments keep proxies from closing an idle connection
+                    yield ': keepalive\n\n' if event is None else format_event(event)
+            finally:
+                broker.unsubscribe(subscription)
+
+        return StreamingHttpResponse(stream(), content_type='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
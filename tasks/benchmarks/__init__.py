@@ -0,0 +1,11 @@
+"""
+Benchmarks for the task hot paths.
+
+They are not collected by ``manage.py test`` (which only looks for
+``test*.py``). Run them explicitly against a throwaway test database:
+
+    python manage.py test tasks.benchmarks --pattern="bench_*.py"
+
+Dataset sizes can be scaled through ``TASK_BENCH_*`` environment variables.
+``bench_hot_paths`` also checks its results against ``baseline.json``.
+"""
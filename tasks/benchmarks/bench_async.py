@@ -0,0 +1,94 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.test import AsyncClient, Client, TransactionTestCase
+
+from .utils import bench_setting, percentile, report, seed_users, uncached
+
+
+@uncached
+class AsyncAPIBenchmark(TransactionTestCase):
+    """
+    Throughput of concurrent list requests: the async views on the ASGI
+    handler against the DRF viewset on the WSGI handler (one thread per
+    concurrent request, like a threaded WSGI server).
+
+    Both run in-process through the test clients, so the numbers compare
+    the request handling models rather than a server; run the app under
+    ``uvicorn taskmanager.asgi:application`` for end-to-end figures.
+    """
+
+    def setUp(self):
+        self.config = {
+            'tasks_per_user': bench_setting('async_tasks_per_user', 5000),
+            'concurrency': bench_setting('concurrency', 20),
+            'requests': bench_setting('async_requests', 400),
+        }
+        self.user = seed_users(1, self.config['tasks_per_user'])[0]
+
+    def summarize(self, latencies, elapsed):
+        return {
+            'req_per_s': round(len(latencies) / elapsed),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        }
+
+    def run_wsgi(self, url):
+        local = []
+
+        def worker(client, count):
+            latencies = []
+            for _ in range(count):
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.status_code
+            connections.close_all()
+            return latencies
+
+        concurrency = self.config['concurrency']
+        per_worker = self.config['requests'] // concurrency
+        # Logged in up front: concurrent session writes lock SQLite
+        clients = []
+        for _ in range(concurrency):
+            clients.append(Client())
+            clients[-1].force_login(self.user)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            for latencies in pool.map(worker, clients, [per_worker] * concurrency):
+                local.extend(latencies)
+        return self.summarize(local, time.perf_counter() - started)
+
+    def run_asgi(self, url):
+        async def request(client, semaphore):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url)
+                assert response.status_code == 200, response.status_code
+                return time.perf_counter() - started
+
+        async def main():
+            client = AsyncClient()
+            await client.aforce_login(self.user)
+            semaphore = asyncio.Semaphore(self.config['concurrency'])
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*[
+                request(client, semaphore) for _ in range(self.config['requests'])
+            ])
+            return self.summarize(latencies, time.perf_counter() - started)
+
+        return asyncio.run(main())
+
+    def test_concurrent_throughput(self):
+        results = {
+            'wsgi /api/tasks/': self.run_wsgi('/api/tasks/'),
+            'asgi /api/tasks/': self.run_asgi('/api/tasks/'),
+            'asgi /api/async/tasks/': self.run_asgi('/api/async/tasks/'),
+        }
+        report(
+            f"Concurrent list requests, {self.config['concurrency']} at a time, "
+            f"{self.config['tasks_per_user']} tasks",
+            results,
+        )
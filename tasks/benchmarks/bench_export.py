@@ -0,0 +1,47 @@
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from .utils import bench_setting, report, seed_tasks, uncached
+
+
+@uncached
+class ExportBenchmark(APITestCase):
+    """Throughput and peak memory of the streaming export"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.task_count = bench_setting('export_tasks', 200_000)
+        cls.user = User.objects.create_user(username='bench', password='benchpass123')
+        seed_tasks(cls.user, cls.task_count)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def export(self, params):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = self.client.get('/api/tasks/export/', params)
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.assertEqual(response.status_code, 200)
+        return {
+            'seconds': round(elapsed, 3),
+            'rows_per_s': round(self.task_count / elapsed),
+            'mb': round(size / 2**20, 1),
+            'peak_mem_mb': round(peak / 2**20, 2),
+        }
+
+    def test_export_throughput(self):
+        # Peak memory should stay flat as TASK_BENCH_EXPORT_TASKS grows
+        report(
+            f'Export of {self.task_count} tasks',
+            {
+                'ndjson': self.export({}),
+                'csv': self.export({'format': 'csv'}),
+            },
+        )
@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+from itertools import product
+
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from tasks.models import Task
+from .utils import (
+    bench_setting, count_queries, find_regressions, measure, report, seed_users, summarize, uncached,
+)
+
+RECENT = (date.today() - timedelta(days=30)).isoformat()
+
+# Values tried for each TaskFilter parameter; every combination is timed
+FILTER_OPTIONS = {
+    'completed': [None, 'true', 'false'],
+    'overdue': [None, 'true'],
+    'due_date_from': [None, RECENT],
+    'ordering': [None, '-due_date', 'title'],
+}
+
+# Stable labels for date-dependent values, so baseline entries keep matching
+VALUE_LABELS = {RECENT: 'today-30d'}
+
+
+def filter_combinations():
+    names = list(FILTER_OPTIONS)
+    for values in product(*FILTER_OPTIONS.values()):
+        yield {name: value for name, value in zip(names, values) if value is not None}
+
+
+def label_for(prefix, params):
+    query = '&'.join(f'{k}={VALUE_LABELS.get(v, v)}' for k, v in sorted(params.items()))
+    return f'{prefix}?{query}' if query else prefix
+
+
+@uncached
+class HotPathBenchmark(APITestCase):
+    """
+    Latency percentiles and query counts of the dashboard and API hot paths.
+
+    Fails when a path runs more queries than in ``baseline.json`` or, with the
+    same dataset sizes, gets slower than the baseline (see find_regressions).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.config = {
+            'users': bench_setting('users', 10),
+            'tasks_per_user': bench_setting('tasks_per_user', 5000),
+            'repeat': bench_setting('repeat', 20),
+        }
+        cls.user = seed_users(cls.config['users'], cls.config['tasks_per_user'])[0]
+        cls.task = Task.objects.filter(owner=cls.user).order_by('id').first()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.results = {}
+
+    def time(self, label, func):
+        """
+        Time ``func`` and record its latency summary and query count
+        """
+        samples = measure(func, repeat=self.config['repeat'])
+        self.results[label] = {**summarize(samples), 'queries': count_queries(func)}
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+
+    def test_hot_paths(self):
+        dashboard = reverse('task_list')
+        for params in [{}, {'completed': 'false'}, {'overdue': 'true'}, {'ordering': '-due_date'}, {'page': 50}]:
+            self.time(label_for('dashboard', params), lambda: self.get(dashboard, params))
+
+        for params in filter_combinations():
+            self.time(label_for('api list', params), lambda: self.get('/api/tasks/', params))
+
+        for params in [{'search': 'audit'}, {'search': 'budget audit'}, {'search': 'audit', 'ordering': 'due_date'}]:
+            self.time(label_for('api list', params), lambda: self.get('/api/tasks/', params))
+            self.time(label_for('dashboard', params), lambda: self.get(dashboard, params))
+
+        def create():
+            response = self.client.post('/api/tasks/', {'title': 'Benchmark task', 'due_date': '2030-01-01'})
+            self.assertEqual(response.status_code, 201)
+
+        def update():
+            response = self.client.patch(f'/api/tasks/{self.task.pk}/', {'completed': not self.task.completed})
+            self.assertEqual(response.status_code, 200)
+
+        self.time('api create', create)
+        self.time('api update', update)
+
+        report(
+            f"Hot paths, {self.config['users']} users x {self.config['tasks_per_user']} tasks",
+            self.results,
+        )
+        regressions = find_regressions('hot_paths', self.config, self.results)
+        self.assertFalse(regressions, 'Performance regressions:\n' + '\n'.join(regressions))
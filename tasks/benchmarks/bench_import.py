@@ -0,0 +1,54 @@
+import json
+import time
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+
+from tasks.importer import import_tasks
+from tasks.models import Task
+from tasks.serializes import TaskSerializer
+from .utils import WORDS, bench_setting, report, uncached
+
+
+@uncached
+class ImportBenchmark(TransactionTestCase):
+    """Import throughput (rows/sec) by batch size, against one row per request"""
+
+    def setUp(self):
+        self.task_count = bench_setting('import_tasks', 100_000)
+        self.user = User.objects.create_user(username='bench', password='benchpass123')
+        self.data = ''.join(
+            json.dumps({
+                'title': f'{WORDS[i % len(WORDS)]} {i}',
+                'description': f'Imported task number {i}',
+                'due_date': f'2030-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+                'completed': i % 3 == 0,
+            }) + '\n'
+            for i in range(self.task_count)
+        )
+
+    def run_import(self, batch_size):
+        Task.objects.all().delete()
+        started = time.perf_counter()
+        result = import_tasks(StringIO(self.data), 'ndjson', self.user, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(result.imported, self.task_count)
+        return {'seconds': round(elapsed, 3), 'rows_per_s': round(self.task_count / elapsed)}
+
+    def run_per_row(self, count):
+        # The existing write path: one validated serializer save per task
+        records = [json.loads(line) for line in self.data.splitlines()[:count]]
+        started = time.perf_counter()
+        for record in records:
+            serializer = TaskSerializer(data=record)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(owner=self.user)
+        elapsed = time.perf_counter() - started
+        return {'seconds': round(elapsed, 3), 'rows_per_s': round(count / elapsed)}
+
+    def test_import_throughput(self):
+        rows = {'per-row serializer save (first 2000)': self.run_per_row(min(2000, self.task_count))}
+        for batch_size in (100, 1000, 5000):
+            rows[f'import_tasks batch_size={batch_size}'] = self.run_import(batch_size)
+        report(f'Import of {self.task_count} tasks', rows)
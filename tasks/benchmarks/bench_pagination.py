@@ -0,0 +1,57 @@
+import statistics
+
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from tasks.models import Task
+from tasks.pagination import TaskCursorPagination
+from .utils import bench_setting, measure, report, seed_tasks, summarize, uncached
+
+
+@uncached
+class PaginationBenchmark(APITestCase):
+    """Compare per-page latency of page number and cursor pagination"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.page_size = TaskCursorPagination.page_size
+        cls.deep_page = bench_setting('deep_page', 5000)
+        cls.user = User.objects.create_user(username='bench', password='benchpass123')
+        seed_tasks(cls.user, cls.page_size * cls.deep_page)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def cursor_for_page(self, page):
+        """Build the cursor a client would hold after reading ``page - 1`` pages"""
+        paginator = TaskCursorPagination()
+        paginator.base_url = 'http://testserver/api/tasks/'
+        paginator.field_name = 'due_date'
+        last_row = (
+            Task.objects.filter(owner=self.user)
+            .order_by('due_date', 'id')[(page - 1) * self.page_size - 1]
+        )
+        return paginator.encode_cursor(last_row)
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), self.page_size)
+
+    def test_page_latency(self):
+        deep_cursor_url = self.cursor_for_page(self.deep_page)
+        results = {
+            'page number, page 1': measure(lambda: self.get('/api/tasks/', {'page': 1})),
+            f'page number, page {self.deep_page}': measure(lambda: self.get('/api/tasks/', {'page': self.deep_page})),
+            'cursor, page 1': measure(lambda: self.get('/api/tasks/', {'pagination': 'cursor'})),
+            f'cursor, page {self.deep_page}': measure(lambda: self.get(deep_cursor_url)),
+        }
+        report(
+            f'Pagination latency over {Task.objects.count()} tasks',
+            {label: summarize(samples) for label, samples in results.items()},
+        )
+
+        # Keyset pages must not get slower with depth
+        first = statistics.median(results['cursor, page 1'])
+        deep = statistics.median(results[f'cursor, page {self.deep_page}'])
+        self.assertLess(deep, first * 3)
@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+
+from tasks.models import OverdueWatermark, Task, TaskReminder
+from tasks.reminders import queue_reminders
+
+from .utils import bench_setting, count_queries, measure, report, seed_users, summarize
+
+
+def scan_overdue(today):
+    # Without a watermark: every open task past its due date, every tick
+    return list(Task.objects.filter(completed=False, due_date__lt=today).values_list('id', 'owner_id', 'title'))
+
+
+class RemindersBenchmark(TestCase):
+    """Overdue scheduler tick latency by number of tasks: full scan vs watermark"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sizes = (10_000, bench_setting('reminder_tasks', 200_000))
+        cls.users = seed_users(len(cls.sizes), 0)
+
+    def test_tick_latency(self):
+        today = date.today()
+        rows = {}
+        seeded = 0
+        for size, user in zip(self.sizes, self.users):
+            Task.objects.bulk_create([
+                Task(title=f'Task {i}', due_date=today - timedelta(days=i % 1000), completed=i % 3 == 0, owner=user)
+                for i in range(size - seeded)
+            ], batch_size=5000)
+            seeded = size
+
+            def tick():
+                # The tasks of one day became overdue since the last tick
+                TaskReminder.objects.all().delete()
+                OverdueWatermark.objects.all().delete()
+                return queue_reminders('default', today)
+
+            self.assertEqual(tick(), Task.objects.filter(completed=False, due_date=today - timedelta(days=1)).count())
+            repeat = bench_setting('reminder_repeat', 10)
+            rows[f'full scan, {size} tasks'] = {
+                **summarize(measure(lambda: scan_overdue(today), repeat=repeat)),
+                'queries': count_queries(lambda: scan_overdue(today)),
+            }
+            rows[f'watermark, {size} tasks'] = {**summarize(measure(tick, repeat=repeat)), 'queries': count_queries(tick)}
+        report('Overdue scheduler tick (one day of newly overdue tasks)', rows)
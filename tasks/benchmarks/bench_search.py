@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.db.models import Q
+from rest_framework.test import APITestCase
+
+from tasks.models import Task
+from tasks.search import get_search_backend, search_tasks
+from .utils import bench_setting, measure, report, seed_tasks, summarize, uncached
+
+
+@uncached
+class SearchBenchmark(APITestCase):
+    """Compare full-text search against leading-wildcard LIKE matching"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.task_count = bench_setting('search_tasks', 100_000)
+        cls.user = User.objects.create_user(username='bench', password='benchpass123')
+        seed_tasks(cls.user, cls.task_count)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def icontains_page(self, value):
+        queryset = Task.objects.filter(owner=self.user).filter(
+            Q(title__icontains=value) | Q(description__icontains=value)
+        )
+        queryset.count()
+        list(queryset.order_by('due_date', 'id')[:20])
+
+    def full_text_page(self, value):
+        queryset = search_tasks(Task.objects.filter(owner=self.user), value)
+        queryset.count()
+        list(queryset.order_by('search_rank', 'id')[:20])
+
+    def api_search(self, value):
+        response = self.client.get('/api/tasks/', {'search': value})
+        self.assertEqual(response.status_code, 200)
+
+    def test_search_latency(self):
+        # "audit" is in ~10% of rows, "99999" in a single title
+        results = {}
+        for term in ('audit', 'budget audit', '99999'):
+            results[f'icontains "{term}"'] = measure(lambda: self.icontains_page(term), repeat=5)
+            results[f'full text "{term}"'] = measure(lambda: self.full_text_page(term), repeat=5)
+            results[f'API ?search={term}'] = measure(lambda: self.api_search(term), repeat=5)
+        report(
+            f'Search latency over {self.task_count} tasks (backend: {get_search_backend("default")})',
+            {label: summarize(samples) for label, samples in results.items()},
+        )
@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from tasks.models import Task
+from tasks.renderers import FastJSONRenderer, orjson
+from tasks.serializes import TaskSerializer
+
+from .utils import bench_setting, measure, report, seed_tasks
+
+
+class SerializationBenchmark(TestCase):
+    """Throughput of building a task list body: serializer vs .values() rows, json vs orjson"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sizes = (1000, bench_setting('serialization_tasks', 10_000))
+        cls.user = User.objects.create_user(username='bench', password='benchpass123')
+        seed_tasks(cls.user, max(cls.sizes))
+
+    def paths(self, size):
+        queryset = Task.objects.filter(owner=self.user).order_by('due_date', 'id')[:size]
+        reader = TaskSerializer.get_row_reader()
+        return {
+            'serializer + json': lambda: JSONRenderer().render(TaskSerializer(queryset, many=True).data),
+            'rows + json': lambda: JSONRenderer().render(reader.represent(queryset.values(*reader.values()))),
+            'rows + orjson': lambda: FastJSONRenderer().render(reader.represent(queryset.values(*reader.values()))),
+        }
+
+    def test_serialization_throughput(self):
+        if orjson is None:
+            print('\norjson is not installed: "rows + orjson" falls back to json')
+        for size in self.sizes:
+            paths = self.paths(size)
+            bodies = {label: path() for label, path in paths.items()}
+            # The fast paths must not change a single byte
+            self.assertEqual(len(set(bodies.values())), 1)
+
+            rows = {}
+            for label, path in paths.items():
+                samples = measure(path, repeat=bench_setting('serialization_repeat', 10))
+                best = min(samples)
+                rows[label] = {
+                    'best_ms': round(best * 1000, 2),
+                    'rows_per_s': round(size / best),
+                }
+            baseline = rows['serializer + json']['best_ms']
+            for row in rows.values():
+                row['speedup'] = round(baseline / row['best_ms'], 1)
+            report(f'Serialization of {size} tasks (query included)', rows)
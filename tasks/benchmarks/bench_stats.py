@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Q
+from django.test import TestCase
+
+from tasks.models import Task
+from tasks.stats import TaskStats
+
+from .utils import bench_setting, count_queries, measure, report, seed_tasks, summarize
+
+
+def count_tasks(user, today):
+    # The stats before counters: one aggregate over all of the user's tasks
+    return Task.objects.for_owner(user).aggregate(
+        total_count=Count('id'),
+        completed_count=Count('id', filter=Q(completed=True)),
+        overdue_count=Count('id', filter=Q(completed=False, due_date__lt=today)),
+    )
+
+
+class StatsBenchmark(TestCase):
+    """Dashboard stats latency by number of tasks: counting tasks vs reading the counters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sizes = (1000, 10_000, bench_setting('stats_tasks', 100_000))
+        cls.users = {}
+        for size in cls.sizes:
+            cls.users[size] = User.objects.create_user(username=f'bench{size}', password='benchpass123')
+            seed_tasks(cls.users[size], size)
+
+    def test_stats_latency(self):
+        today = date.today()
+        rows = {}
+        for size, user in self.users.items():
+            stats = TaskStats.compute(user, today)
+            counted = count_tasks(user, today)
+            self.assertEqual(
+                (stats.total, stats.completed, stats.overdue),
+                (counted['total_count'], counted['completed_count'], counted['overdue_count']),
+            )
+            for label, func in [('count tasks', lambda: count_tasks(user, today)),
+                                ('read counters', lambda: TaskStats.compute(user, today))]:
+                samples = measure(func, repeat=bench_setting('stats_repeat', 20))
+                rows[f'{label}, {size} tasks'] = {**summarize(samples), 'queries': count_queries(func)}
+        report('Dashboard stats of one user', rows)
@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, connections
+from django.test import TransactionTestCase
+
+from tasks.models import Task
+from .utils import bench_setting, report, uncached
+
+
+@uncached
+class ConcurrentWriteBenchmark(TransactionTestCase):
+    """
+    Write throughput of the configured database with concurrent writers,
+    one thread and connection each, every task in its own transaction.
+
+    Run it once per backend, e.g. with ``DATABASE_URL=postgres://...``, and
+    for SQLite with ``DATABASE_TEST_NAME`` set to a file: the default
+    in-memory test database locks whole tables and fails concurrent
+    writers immediately instead of making them wait.
+    """
+
+    def setUp(self):
+        self.writes = bench_setting('writes', 200)
+        self.users = [
+            User.objects.create_user(username=f'writer{i}', password='benchpass123')
+            for i in range(max(bench_setting('writers', 8), 1))
+        ]
+
+    def write(self, user):
+        failed = 0
+        try:
+            for i in range(self.writes):
+                try:
+                    Task.objects.create(title=f'Write {i}', due_date=date(2030, 1, 1), owner=user)
+                except OperationalError:
+                    # SQLite: "database is locked" after the busy timeout, or "table is
+                    # locked" right away on the shared in-memory test database
+                    failed += 1
+        finally:
+            connections.close_all()
+        return failed
+
+    def run_writers(self, count):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(count) as pool:
+            failed = sum(pool.map(self.write, self.users[:count]))
+        elapsed = time.perf_counter() - started
+        written = count * self.writes - failed
+        return {'writes_per_s': round(written / elapsed), 'failed': failed, 'seconds': round(elapsed, 3)}
+
+    def test_concurrent_writes(self):
+        results = {}
+        for count in sorted({1, 2, len(self.users) // 2, len(self.users)} - {0}):
+            results[f'{count} writer(s)'] = self.run_writers(count)
+        report(f'Concurrent task writes on {connection.vendor}, {self.writes} per writer', results)
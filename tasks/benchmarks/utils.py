@@ -0,0 +1,166 @@
+import json
+import os
+import statistics
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from tasks.models import Task
+
+# Benchmarks measure the database/serialization work, not cache hits
+uncached = override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+
+# Vocabulary for seeded titles/descriptions so searches have realistic selectivity
+WORDS = [
+    'report', 'invoice', 'meeting', 'deploy', 'review', 'budget', 'client',
+    'design', 'release', 'backup', 'migrate', 'hiring', 'audit', 'roadmap',
+    'support', 'contract', 'research', 'training', 'security', 'forecast',
+]
+
+
+def bench_setting(name, default):
+    """
+    Read an integer benchmark setting from the ``TASK_BENCH_<NAME>`` env var
+    """
+    return int(os.environ.get(f'TASK_BENCH_{name.upper()}', default))
+
+
+def seed_tasks(owner, count, batch_size=5000):
+    """
+    Bulk insert ``count`` tasks for ``owner`` spread over ~3 years of due dates
+    """
+    start = date.today() - timedelta(days=365)
+    for offset in range(0, count, batch_size):
+        Task.objects.bulk_create([
+            Task(
+                title=f'{WORDS[i % len(WORDS)]} {WORDS[i // len(WORDS) % len(WORDS)]} {i}',
+                description=f'Seeded task number {i} about {WORDS[i * 7 % len(WORDS)]}',
+                due_date=start + timedelta(days=i % 1000),
+                completed=i % 3 == 0,
+                owner=owner,
+            )
+            for i in range(offset, min(offset + batch_size, count))
+        ])
+
+
+def seed_users(user_count, tasks_per_user, prefix='bench'):
+    """
+    Create ``user_count`` users owning ``tasks_per_user`` tasks each
+    """
+    users = []
+    for i in range(user_count):
+        user = User.objects.create_user(username=f'{prefix}{i}', password='benchpass123')
+        seed_tasks(user, tasks_per_user)
+        users.append(user)
+    return users
+
+
+def count_queries(func):
+    """
+    Return the number of queries one call of ``func`` runs
+    """
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    return len(queries)
+
+
+def measure(func, repeat=20, warmup=2):
+    """
+    Call ``func`` repeatedly and return the wall-clock duration of each call
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """
+    Return median/p95/max latency of ``samples`` in milliseconds
+    """
+    return {
+        'p50_ms': round(statistics.median(samples) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'max_ms': round(max(samples) * 1000, 3),
+    }
+
+
+def report(title, rows):
+    """
+    Print a small aligned table of ``{label: summary}`` rows
+    """
+    print(f'\n{title}')
+    for label, summary in rows.items():
+        values = '  '.join(f'{key}={value}' for key, value in summary.items())
+        print(f'  {label:<40} {values}')
+
+
+# Stored results of the hot path benchmarks; refresh on the machine that
+# runs the benchmarks with TASK_BENCH_UPDATE_BASELINE=1
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(suite, config, rows):
+    baseline = load_baseline()
+    baseline[suite] = {'config': config, 'results': rows}
+    with open(BASELINE_PATH, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def find_regressions(suite, config, rows):
+    """
+    Compare ``rows`` (label -> summary with ``queries``) to the baseline.
+
+    Any extra query is a regression. Latency is only compared when the
+    baseline was recorded with the same ``config`` (dataset sizes); a median
+    above the baseline by more than ``TASK_BENCH_TOLERANCE`` percent (and
+    more than 2ms, to ignore noise on very fast paths) is a regression. The
+    median is compared rather than p95, which a single hiccup can move.
+    Returns a list of messages, empty when there is nothing to report.
+    """
+    if os.environ.get('TASK_BENCH_UPDATE_BASELINE'):
+        save_baseline(suite, config, rows)
+        return []
+
+    stored = load_baseline().get(suite)
+    if stored is None:
+        return []
+    tolerance = bench_setting('tolerance', 100) / 100
+    same_config = stored['config'] == config
+
+    regressions = []
+    for label, row in rows.items():
+        base = stored['results'].get(label)
+        if base is None:
+            continue
+        if row['queries'] > base['queries']:
+            regressions.append(f"{label}: {row['queries']} queries, baseline {base['queries']}")
+        if same_config and row['p50_ms'] > max(base['p50_ms'] * (1 + tolerance), base['p50_ms'] + 2):
+            regressions.append(f"{label}: p50 {row['p50_ms']}ms, baseline {base['p50_ms']}ms")
+    return regressions
@@ -0,0 +1,113 @@
+"""
+Per-user caching of task query results.
+
+Every cache key embeds a per-user version number. Any write to one of the
+user's tasks bumps the version (see ``tasks.signals``), which makes all of
+the user's cached entries unreachable at once; they simply expire.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def get_cache():
+    return caches[getattr(settings, 'TASK_CACHE_ALIAS', 'default')]
+
+
+def get_cache_timeout():
+    return getattr(settings, 'TASK_CACHE_TIMEOUT', 300)
+
+
+def version_key(user_id):
+    return f'tasks:user:{user_id}:version'
+
+
+def modified_key(user_id):
+    return f'tasks:user:{user_id}:modified'
+
+
+def get_user_version(user_id):
+    """
+    Return the current cache version for a user's tasks
+    """
+    cache = get_cache()
+    version = cache.get(version_key(user_id))
+    if version is None:
+        # Start from the clock, not 1, so a version lost to eviction can
+        # never be reissued and resurrect entries cached under it.
+        cache.add(version_key(user_id), time.time_ns(), None)
+        version = cache.get(version_key(user_id), time.time_ns())
+    return version
+
+
+def bump_user_version(user_id):
+    """
+    Invalidate everything cached for a user's tasks
+    """
+    cache = get_cache()
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        cache.set(version_key(user_id), time.time_ns(), None)
+    cache.set(modified_key(user_id), time.time(), None)
+
+
+def reset_user_version(user_id):
+    """
+    Start a fresh cache namespace, e.g. for a new user reusing an old id
+    """
+    get_cache().set_many({
+        version_key(user_id): time.time_ns(),
+        modified_key(user_id): time.time(),
+    }, None)
+
+
+def get_user_last_modified(user_id):
+    """
+    Return the (epoch) time of the last write to a user's tasks.
+
+    When the timestamp was never recorded or got evicted, "now" is recorded
+    instead: clients revalidate once, which is always safe.
+    """
+    cache = get_cache()
+    modified = cache.get(modified_key(user_id))
+    if modified is None:
+        cache.add(modified_key(user_id), time.time(), None)
+        modified = cache.get(modified_key(user_id), time.time())
+    return modified
+
+
+def invalidate_user(user_id):
+    """
+    Invalidate now, and again once the current transaction commits.
+
+    The first bump makes the write visible to the rest of this request; the
+    second discards anything another request cached from data read before
+    the write was committed.
+    """
+    bump_user_version(user_id)
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+def user_cache_key(user_id, namespace, parts=()):
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return f'tasks:user:{user_id}:{get_user_version(user_id)}:{namespace}:{digest}'
+
+
+def cached_for_user(user, namespace, parts, compute):
+    """
+    Return ``compute()`` for ``user``, cached until their tasks change.
+
+    ``parts`` must identify everything else the result depends on (query
+    string, page, today's date, ...).
+    """
+    key = user_cache_key(user.pk, namespace, parts)
+    cache = get_cache()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, get_cache_timeout())
+    return value
@@ -0,0 +1,79 @@
+"""
+Conditional GET support (ETag / Last-Modified) for task views.
+
+List validators come from the per-user cache version, so answering a
+revalidation with 304 needs no database query at all. Single tasks use
+their ``updated_at`` column.
+"""
+import hashlib
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .cache import get_user_last_modified, get_user_version
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+
+def user_list_validators(request, namespace, page=False):
+    """
+    Return (etag, last_modified timestamp) for a user's list view.
+
+    Both change whenever one of the user's tasks changes, and at midnight,
+    when tasks can become overdue without being written. HTML pages
+    (``page=True``) embed a CSRF token, so theirs also change when the user
+    logs in again and the token is rotated.
+    """
+    user_id = request.user.pk
+    today = timezone.now().date()
+    parts = [
+        namespace,
+        user_id,
+        get_user_version(user_id),
+        today,
+        request.get_full_path(),
+        request.headers.get('Accept', ''),
+    ]
+    midnight = datetime.combine(today, dt_time.min, tzinfo=dt_timezone.utc).timestamp()
+    last_modified = max(get_user_last_modified(user_id), midnight)
+    if page:
+        # Pages are rendered with the token's secret, created here for a
+        # first visit, as rendering would
+        get_token(request)
+        parts.append(request.META['CSRF_COOKIE'])
+        if request.user.last_login is not None:
+            last_modified = max(last_modified, request.user.last_login.timestamp())
+    return make_etag(*parts), int(last_modified)
+
+
+def task_validators(request, task_id, updated_at):
+    """
+    Return (etag, last_modified timestamp) for a single task
+    """
+    etag = make_etag(
+        'task', task_id, updated_at.isoformat(), request.get_full_path(), request.headers.get('Accept', ''),
+    )
+    return etag, int(updated_at.timestamp())
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Return a 304 (or 412) response if the request's preconditions allow it
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Responses are per user; let browsers keep them but always revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
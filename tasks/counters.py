@@ -0,0 +1,184 @@
+"""
+Per-user task counters, maintained incrementally.
+
+``UserTaskCounters`` holds how many tasks each user has and how many of
+them are completed; ``UserTaskDueCount`` how many open tasks they have due
+on each date. The dashboard stats read one counters row and the user's due
+dates before today, whatever the number of tasks.
+
+Counters live in the owner's shard, next to their tasks, and change in the
+same transaction: ``Task.save()`` and ``delete()`` (through
+``tasks.signals``) and ``TaskQuerySet``'s ``bulk_create()``,
+``bulk_update()``, ``update()`` and ``delete()`` apply the difference they
+make with one upsert per table. Raw SQL, ``_raw_delete()`` and ``loaddata``
+bypass them: call ``reconcile_counters`` afterwards. The
+``reconcile_task_counters`` command recounts every user's tasks and repairs
+any drift; run it nightly.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connections, transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+from .cache import invalidate_user
+from .models import Task, UserTaskCounters, UserTaskDueCount
+
+# Task values the counters depend on, in the order CounterChanges takes them
+COUNTED_FIELDS = ('owner_id', 'due_date', 'completed')
+
+
+class CounterChanges:
+    """
+    Differences to apply to the counters of some users
+    """
+
+    def __init__(self):
+        self.totals = Counter()
+        self.completed = Counter()
+        # Open tasks per (owner_id, due_date)
+        self.open = Counter()
+
+    def add(self, owner_id, due_date, completed, count=1):
+        """
+        Count ``count`` more tasks with these values (fewer if negative)
+        """
+        self.totals[owner_id] += count
+        if Task._meta.get_field('completed').to_python(completed):
+            self.completed[owner_id] += count
+        else:
+            self.open[owner_id, Task._meta.get_field('due_date').to_python(due_date)] += count
+
+    def remove(self, owner_id, due_date, completed, count=1):
+        self.add(owner_id, due_date, completed, -count)
+
+    def save(self, using):
+        """
+        Apply the changes to the counters in ``using``
+        """
+        # The counters row first: PostgreSQL then holds the owner's other
+        # writers until this transaction ends
+        owners = sorted(
+            owner_id for owner_id in self.totals.keys() | self.completed.keys()
+            if self.totals[owner_id] or self.completed[owner_id]
+        )
+        add_to_counts(using, UserTaskCounters, ['owner'], ['total', 'completed'], [
+            (owner_id, self.totals[owner_id], self.completed[owner_id]) for owner_id in owners
+        ])
+        add_to_counts(using, UserTaskDueCount, ['owner', 'due_date'], ['open'], [
+            (owner_id, due_date, count) for (owner_id, due_date), count in sorted(self.open.items()) if count
+        ])
+
+
+def add_to_counts(using, model, keys, counts, rows):
+    """
+    Add the counts of ``rows`` (the values of ``keys`` then of ``counts``)
+    to ``model``'s rows, creating missing rows
+    """
+    if not rows:
+        return
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in keys + counts]
+    columns = ', '.join(quote(field.column) for field in fields)
+    conflict = ', '.join(quote(field.column) for field in fields[:len(keys)])
+    table = quote(model._meta.db_table)
+    increments = ', '.join(
+        f'{quote(field.column)} = {table}.{quote(field.column)} + excluded.{quote(field.column)}'
+        for field in fields[len(keys):]
+    )
+    # INSERT ... ON CONFLICT is understood by both SQLite and PostgreSQL
+    batch_size = connection.ops.bulk_batch_size(fields, rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            values = ', '.join(['(%s)' % ', '.join(['%s'] * len(fields))] * len(batch))
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES {values} '
+                f'ON CONFLICT ({conflict}) DO UPDATE SET {increments}',
+                [field.get_db_prep_save(value, connection) for row in batch for field, value in zip(fields, row)],
+            )
+
+
+def get_counts(user, today):
+    """
+    The counts of ``user``'s tasks: total, completed and overdue (open and
+    due before ``today``), read from their counters in one query
+    """
+    overdue = (
+        UserTaskDueCount.objects.filter(owner=OuterRef('owner'), due_date__lt=today)
+        .values('owner').annotate(overdue=Sum('open')).values('overdue')
+    )
+    row = (
+        UserTaskCounters.objects.for_owner(user)
+        .annotate(overdue=Subquery(overdue))
+        .values_list('total', 'completed', 'overdue')
+        .first()
+    )
+    total, completed, overdue = row or (0, 0, 0)
+    return {'total': total, 'completed': completed, 'overdue': overdue or 0}
+
+
+def reconcile_counters(using, owner_ids=None, batch_size=500):
+    """
+    Recount the counters of ``owner_ids`` (everyone with tasks or counters
+    in ``using`` by default) from their tasks, and repair those that
+    drifted; returns the ids of their owners.
+    """
+    if owner_ids is None:
+        owner_ids = sorted(
+            set(Task.objects.using(using).order_by().values_list('owner_id', flat=True).distinct())
+            | set(UserTaskCounters.objects.using(using).values_list('owner_id', flat=True))
+            | set(UserTaskDueCount.objects.using(using).order_by().values_list('owner_id', flat=True).distinct())
+        )
+    repaired = []
+    for start in range(0, len(owner_ids), batch_size):
+        repaired += _reconcile_batch(using, owner_ids[start:start + batch_size])
+    for owner_id in repaired:
+        invalidate_user(owner_id)
+    return repaired
+
+
+def _reconcile_batch(using, owner_ids):
+    with transaction.atomic(using=using):
+        # Writers of these users wait for the recount (on PostgreSQL; the
+        # writes of SQLite are serialized anyway)
+        stored = {
+            owner_id: (total, completed)
+            for owner_id, total, completed in UserTaskCounters.objects.using(using).select_for_update()
+            .filter(owner_id__in=owner_ids).values_list('owner_id', 'total', 'completed')
+        }
+        stored_open = defaultdict(dict)
+        for owner_id, due_date, count in (
+            UserTaskDueCount.objects.using(using).filter(owner_id__in=owner_ids).exclude(open=0)
+            .values_list('owner_id', 'due_date', 'open')
+        ):
+            stored_open[owner_id][due_date] = count
+
+        expected = CounterChanges()
+        for owner_id, due_date, completed, count in (
+            Task.objects.using(using).filter(owner_id__in=owner_ids)
+            .values_list(*COUNTED_FIELDS).annotate(Count('pk')).order_by()
+        ):
+            expected.add(owner_id, due_date, completed, count)
+        expected_open = defaultdict(dict)
+        for (owner_id, due_date), count in expected.open.items():
+            expected_open[owner_id][due_date] = count
+
+        drifted = [
+            owner_id for owner_id in owner_ids
+            if stored.get(owner_id, (0, 0)) != (expected.totals[owner_id], expected.completed[owner_id])
+            or stored_open[owner_id] != expected_open[owner_id]
+        ]
+        UserTaskDueCount.objects.using(using).filter(owner_id__in=owner_ids, open=0).delete()
+        if drifted:
+            UserTaskCounters.objects.using(using).filter(owner_id__in=drifted).delete()
+            UserTaskDueCount.objects.using(using).filter(owner_id__in=drifted).delete()
+            UserTaskCounters.objects.using(using).bulk_create([
+                UserTaskCounters(owner_id=owner_id, total=expected.totals[owner_id], completed=expected.completed[owner_id])
+                for owner_id in drifted if expected.totals[owner_id]
+            ])
+            UserTaskDueCount.objects.using(using).bulk_create([
+                UserTaskDueCount(owner_id=owner_id, due_date=due_date, open=count)
+                for owner_id in drifted for due_date, count in sorted(expected_open[owner_id].items())
+            ])
+    return drifted
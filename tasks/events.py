@@ -0,0 +1,136 @@
+"""
+Push of task changes to connected clients (Server-Sent Events).
+
+Task saves and deletes publish an event to the owner's subscribers once
+the transaction commits (see ``tasks.signals``); bulk writes publish a
+``resync`` event, telling clients to refetch or delta sync instead. Events
+go through the broker named by ``TASK_EVENTS_BROKER``. The default
+``InProcessBroker`` only reaches subscribers connected to the same process:
+with several workers, swap it for a broker backed by a pub/sub service
+that implements the same ``subscribe``, ``unsubscribe``, ``publish`` and
+``has_subscribers`` methods.
+"""
+import asyncio
+import itertools
+import json
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Sent to a client whose view of its tasks may be incomplete: it fell
+# behind, reconnected after missing events, or tasks changed in bulk
+RESYNC = 'resync'
+
+_event_ids = itertools.count(1)
+_brokers = {}
+
+
+def get_keepalive_interval():
+    return getattr(settings, 'TASK_EVENTS_KEEPALIVE_SECONDS', 15)
+
+
+def get_queue_size():
+    return getattr(settings, 'TASK_EVENTS_QUEUE_SIZE', 100)
+
+
+def make_event(event_type, data):
+    return {'id': next(_event_ids), 'type': event_type, 'data': data}
+
+
+def format_event(event):
+    """
+    Encode an event in the text/event-stream format
+    """
+    data = json.dumps(event['data'], separators=(',', ':'))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """
+    Queue of the events for one connected client, read on its event loop
+    """
+
+    def __init__(self, owner_id, queue_size):
+        self.owner_id = owner_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(queue_size)
+
+    def deliver(self, event):
+        # Runs on the subscriber's loop. A client too slow to keep up loses
+        # its backlog and is told to resync rather than blocking publishers.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = make_event(RESYNC, {})
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """
+        Return the next event, or None after ``timeout`` seconds without one
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """
+    Deliver events to the subscribers of the current process
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def subscribe(self, owner_id):
+        """
+        Subscribe to ``owner_id``'s events; call from the event loop
+        """
+        subscription = Subscription(owner_id, get_queue_size())
+        with self.lock:
+            self.subscriptions.setdefault(owner_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.owner_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.owner_id, None)
+
+    def has_subscribers(self, owner_id):
+        return owner_id in self.subscriptions
+
+    def publish(self, owner_id, event):
+        """
+        Deliver ``event`` to ``owner_id``'s subscribers; callable from any thread
+        """
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(owner_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Its event loop is gone
+                self.unsubscribe(subscription)
+
+
+def get_broker():
+    path = getattr(settings, 'TASK_EVENTS_BROKER', 'tasks.events.InProcessBroker')
+    broker = _brokers.get(path)
+    if broker is None:
+        broker = _brokers.setdefault(path, import_string(path)())
+    return broker
+
+
+def publish_task_event(owner_id, event_type, data):
+    """
+    Publish an event; ``data`` may be a callable, only called when someone
+    is subscribed
+    """
+    broker = get_broker()
+    if not broker.has_subscribers(owner_id):
+        return
+    broker.publish(owner_id, make_event(event_type, data() if callable(data) else data))
@@ -0,0 +1,72 @@
+"""
+Streaming export of tasks as NDJSON or CSV.
+
+Rows are read with ``.values().iterator()``, so only one chunk of tasks is
+held in memory at a time however many tasks are exported.
+"""
+import csv
+import io
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Same fields, in the same order, as TaskSerializer
+EXPORT_FIELDS = ('id', 'title', 'description', 'due_date', 'completed')
+
+
+def get_export_chunk_size():
+    return getattr(settings, 'TASK_EXPORT_CHUNK_SIZE', 2000)
+
+
+def iter_rows(queryset, chunk_size):
+    return queryset.values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def iter_batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def iter_ndjson(rows, chunk_size):
+    """
+    One JSON object per line; one string yielded per chunk of rows
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for batch in iter_batches(rows, chunk_size):
+        yield ''.join(encoder.encode(row) + '\n' for row in batch)
+
+
+def iter_csv(rows, chunk_size):
+    """
+    A header line, then one CSV line per task; one string yielded per chunk
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in iter_batches(rows, chunk_size):
+        writer.writerows([row[field] for field in EXPORT_FIELDS] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: nothing was exported
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
+
+
+def export_tasks(queryset, export_format, chunk_size=None):
+    """
+    Return an iterator of text chunks exporting ``queryset``.
+
+    The query only runs once the iterator is consumed.
+    """
+    if chunk_size is None:
+        chunk_size = get_export_chunk_size()
+    return EXPORT_FORMATS[export_format](iter_rows(queryset, chunk_size), chunk_size)
@@ -1,6 +1,7 @@
 import django_filters
-from django.db.models import Q
+from rest_framework import filters
 from .models import Task
+from .search import SEARCH_RANK, is_searched, search_tasks
 
 
 class TaskFilter(django_filters.FilterSet):
@@ -37,14 +38,9 @@ class TaskFilter(django_filters.FilterSet):
 
     def filter_search(self, queryset, name, value):
         """
-        Search in title and description fields
+        Full-text search in title and description fields
         """
-        if value:
-            return queryset.filter(
-                Q(title__icontains=value) | 
-                Q(description__icontains=value)
-            )
-        return queryset
+        return search_tasks(queryset, value)
 
     def filter_overdue(self, queryset, name, value):
         """
@@ -58,3 +54,26 @@ class TaskFilter(django_filters.FilterSet):
                 completed=False
             )
         return queryset
+
+
+class TaskSearchFilter(filters.SearchFilter):
+    """
+    DRF search backed by the full-text index for Task querysets
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if queryset.model is not Task:
+            return super().filter_queryset(request, queryset, view)
+        return search_tasks(queryset, ' '.join(self.get_search_terms(request)))
+
+
+class TaskOrderingFilter(filters.OrderingFilter):
+    """
+    DRF ordering that sorts search results by relevance unless the client
+    asked for an explicit ordering
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and is_searched(queryset):
+            return [SEARCH_RANK, 'id']
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,37 @@
+"""
+Health check for load balancers and orchestrators.
+"""
+import logging
+
+from django.db import DatabaseError, connections
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+
+def check_databases():
+    """
+    Return ``{alias: 'ok' or error}`` after a round trip to every database
+    """
+    results = {}
+    for connection in connections.all():
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            results[connection.alias] = 'ok'
+        except DatabaseError as exc:
+            logger.warning('Health check failed for database %r: %s', connection.alias, exc)
+            results[connection.alias] = 'unavailable'
+    return results
+
+
+def health_view(request):
+    """
+    200 when every database answers, 503 otherwise
+    """
+    databases = check_databases()
+    healthy = all(status == 'ok' for status in databases.values())
+    return JsonResponse(
+        {'status': 'ok' if healthy else 'unavailable', 'databases': databases},
+        status=200 if healthy else 503,
+    )
@@ -0,0 +1,237 @@
+"""
+Streaming import of tasks from CSV or NDJSON.
+
+Records are parsed one at a time, validated against the Task model in
+batches and written with one ``bulk_create`` per batch, each batch in its
+own transaction. Invalid records are skipped and reported. After every
+committed batch the number of records processed so far is a checkpoint:
+passing it back as ``start`` resumes an interrupted import.
+"""
+import csv
+import json
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from .models import Task
+from .sharding import get_owner_shard
+from .signals import tasks_bulk_changed
+
+# Columns read from each record; anything else (e.g. the ``id`` of an
+# export) is ignored
+IMPORT_FIELDS = ('title', 'description', 'due_date', 'completed')
+REQUIRED_FIELDS = ('title', 'due_date')
+
+FORMAT_EXTENSIONS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+class ImportFileError(ValueError):
+    """
+    The file as a whole cannot be imported (unknown format, bad header)
+    """
+
+
+class ImportInterrupted(Exception):
+    """
+    A batch failed to insert. Batches before it are committed; ``result``
+    holds the checkpoint to resume from.
+    """
+
+    def __init__(self, result, cause):
+        super().__init__(f'Import interrupted after {result.processed} records: {cause}')
+        self.result = result
+        self.cause = cause
+
+
+def get_import_batch_size():
+    return getattr(settings, 'TASK_IMPORT_BATCH_SIZE', 1000)
+
+
+def get_import_error_limit():
+    return getattr(settings, 'TASK_IMPORT_ERROR_LIMIT', 100)
+
+
+def guess_format(filename):
+    for extension, import_format in FORMAT_EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return import_format
+    return None
+
+
+def iter_ndjson_records(lines):
+    """
+    Yield ``(line number, record)``; blank lines are skipped and lines that
+    are not a JSON object are yielded as their parse error
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_number, ValidationError(f'Invalid JSON: {exc}')
+            continue
+        if not isinstance(record, dict):
+            record = ValidationError('Expected a JSON object.')
+        yield line_number, record
+
+
+def iter_csv_records(lines):
+    """
+    Yield ``(line number, record)`` for each CSV row after the header
+    """
+    reader = csv.DictReader(lines)
+    missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or ())]
+    if missing:
+        raise ImportFileError(f'Missing CSV columns: {", ".join(missing)}')
+    for record in reader:
+        yield reader.line_num, record
+
+
+RECORD_READERS = {
+    'csv': iter_csv_records,
+    'ndjson': iter_ndjson_records,
+}
+
+
+def clean_value(field, value):
+    if field == 'completed' and isinstance(value, str):
+        # Accept JSON-style booleans in CSV files as well as Django's own
+        lowered = value.strip().lower()
+        if lowered in ('true', 'false'):
+            return lowered == 'true'
+        if lowered == '':
+            return False
+    if field == 'description' and value == '':
+        return None
+    return value
+
+
+def build_task(record, owner):
+    """
+    Return a validated, unsaved Task for one record
+    """
+    if isinstance(record, ValidationError):
+        raise record
+    values = {
+        field: clean_value(field, record[field])
+        for field in IMPORT_FIELDS if record.get(field) is not None
+    }
+    check_types(values)
+    task = Task(owner=owner, **values)
+    task.full_clean(exclude=['owner'], validate_unique=False, validate_constraints=False)
+    return task
+
+
+def check_types(values):
+    """
+    Reject values of a JSON type a field cannot convert (a number or a list
+    for a date), which ``full_clean`` fails on with TypeError or ValueError
+    instead of a ValidationError
+    """
+    errors = {}
+    for field_name, value in values.items():
+        field = Task._meta.get_field(field_name)
+        try:
+            field.to_python(value)
+        except (TypeError, ValueError):
+            errors[field_name] = ValidationError(
+                field.error_messages.get('invalid', 'Enter a valid value.'), code='invalid', params={'value': value},
+            )
+        except ValidationError:
+            # Reported by full_clean
+            pass
+    if errors:
+        raise ValidationError(errors)
+
+
+class ImportResult:
+    """
+    Counters of an import run, updated after every batch
+    """
+
+    def __init__(self, start=0):
+        self.start = start
+        self.processed = start
+        self.imported = 0
+        self.invalid = 0
+        self.errors = []
+        self.started_at = time.perf_counter()
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.perf_counter() - self.started_at
+        return round((self.processed - self.start) / elapsed) if elapsed else 0
+
+    def add_error(self, line, error):
+        self.invalid += 1
+        if len(self.errors) < get_import_error_limit():
+            messages = getattr(error, 'message_dict', None) or {'non_field_errors': error.messages}
+            self.errors.append({'line': line, 'errors': messages})
+
+    def as_dict(self):
+        return {
+            'processed': self.processed,
+            'imported': self.imported,
+            'invalid': self.invalid,
+            'errors': self.errors,
+        }
+
+
+def import_tasks(lines, import_format, owner, start=0, batch_size=None, progress=None):
+    """
+    Import the records of ``lines`` (an iterable of text lines) for ``owner``.
+
+    The first ``start`` records are skipped. ``progress(result)`` is called
+    after every committed batch. Returns an ImportResult; raises
+    ImportFileError or ImportInterrupted.
+    """
+    if import_format not in RECORD_READERS:
+        raise ImportFileError(f'Unknown import format: {import_format}')
+    if batch_size is None:
+        batch_size = get_import_batch_size()
+
+    result = ImportResult(start)
+    batch = []
+    seen = 0
+    try:
+        for line, record in RECORD_READERS[import_format](lines):
+            seen += 1
+            if seen <= start:
+                continue
+            try:
+                batch.append(build_task(record, owner))
+            except ValidationError as exc:
+                result.add_error(line, exc)
+            if seen - result.processed >= batch_size:
+                _import_batch(batch, owner, result, seen)
+                batch = []
+                if progress is not None:
+                    progress(result)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFileError(f'Unreadable file after {result.processed} records: {exc}')
+
+    if seen > result.processed:
+        _import_batch(batch, owner, result, seen)
+        if progress is not None:
+            progress(result)
+    return result
+
+
+def _import_batch(tasks, owner, result, processed):
+    shard = get_owner_shard(owner.pk)
+    try:
+        with transaction.atomic(using=shard):
+            Task.objects.db_manager(shard).bulk_create(tasks)
+    except DatabaseError as exc:
+        raise ImportInterrupted(result, exc) from exc
+    result.processed = processed
+    result.imported += len(tasks)
+    if tasks:
+        tasks_bulk_changed.send(sender=Task, owner_ids=[owner.pk])
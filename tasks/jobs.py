@@ -0,0 +1,417 @@
+"""
+Background jobs: long operations on a user's tasks, run outside requests.
+
+The API records a ``Job`` (``enqueue``) and answers ``202 Accepted`` with
+its status URL (``/api/jobs/<id>/``); ``manage.py run_workers`` runs jobs
+in a pool of worker processes. Each kind of job is a function registered
+with ``@job_handler(kind)``: it gets the job, reports progress with
+``report_progress`` (which also keeps its lock) and returns the job's result.
+
+A job raising an exception is retried up to ``TASK_JOB_MAX_ATTEMPTS``
+times, waiting ``TASK_JOB_RETRY_DELAY_SECONDS`` and twice as long after
+every attempt, unless it raised ``JobFailed`` (retrying cannot help). A job
+whose worker stopped is run again once its lock expires
+(``TASK_JOB_LOCK_SECONDS`` after its last progress report), so handlers
+must be safe to run twice. Each user has at most
+``TASK_JOB_USER_CONCURRENCY`` jobs running and ``TASK_JOB_USER_QUEUE_LIMIT``
+jobs queued or running.
+
+Files (uploaded imports, exports) are kept in the ``TASK_JOB_STORAGE``
+storage, which web and worker processes must share. Finished jobs and their
+files are deleted ``TASK_JOB_RETENTION_DAYS`` after they finished.
+"""
+import io
+import logging
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import storages
+from django.db import models, transaction
+from django.db.models import Count, F, Q
+from django.http import QueryDict
+from django.utils import timezone
+
+from .export import EXPORT_FORMATS, export_tasks
+from .filters import TaskFilter
+from .importer import ImportFileError, get_import_error_limit, import_tasks
+from .models import Job, Task
+from .sharding import get_owner_shard
+from .signals import tasks_bulk_changed
+
+logger = logging.getLogger(__name__)
+
+FINISHED = (Job.Status.SUCCEEDED, Job.Status.FAILED, Job.Status.CANCELLED)
+
+HANDLERS = {}
+
+
+class JobFailed(Exception):
+    """
+    The job cannot succeed, don't retry it
+    """
+
+
+class TooManyJobs(Exception):
+    """
+    The user already has TASK_JOB_USER_QUEUE_LIMIT jobs queued or running
+    """
+
+
+def get_max_attempts():
+    return getattr(settings, 'TASK_JOB_MAX_ATTEMPTS', 3)
+
+
+def get_retry_delay():
+    return timedelta(seconds=getattr(settings, 'TASK_JOB_RETRY_DELAY_SECONDS', 30))
+
+
+def get_lock_duration():
+    return timedelta(seconds=getattr(settings, 'TASK_JOB_LOCK_SECONDS', 300))
+
+
+def get_user_concurrency():
+    return getattr(settings, 'TASK_JOB_USER_CONCURRENCY', 1)
+
+
+def get_user_queue_limit():
+    return getattr(settings, 'TASK_JOB_USER_QUEUE_LIMIT', 10)
+
+
+def get_batch_size():
+    return getattr(settings, 'TASK_JOB_BATCH_SIZE', 1000)
+
+
+def get_retention():
+    return timedelta(days=getattr(settings, 'TASK_JOB_RETENTION_DAYS', 7))
+
+
+def get_storage():
+    return storages[getattr(settings, 'TASK_JOB_STORAGE', 'default')]
+
+
+def job_handler(kind):
+    """
+    Register the decorated function as the handler of ``kind`` jobs
+    """
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, owner, payload=None):
+    """
+    Queue a ``kind`` job for ``owner``; raises TooManyJobs over the user's limit
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    pending = Job.objects.filter(owner=owner, status__in=[Job.Status.QUEUED, Job.Status.RUNNING]).count()
+    if pending >= get_user_queue_limit():
+        raise TooManyJobs(f'{pending} jobs are already queued or running')
+    return Job.objects.create(kind=kind, owner=owner, payload=payload or {}, max_attempts=get_max_attempts())
+
+
+def save_job_file(name, content):
+    """
+    Store ``content`` (a File or bytes) for a job; returns the stored name
+    """
+    if isinstance(content, bytes):
+        content = ContentFile(content)
+    return get_storage().save(f'jobs/{uuid.uuid4().hex}/{name}', content)
+
+
+def claim_job(now=None):
+    """
+    Mark the next job due as running for this worker and return it, or None
+    when no job is due
+    """
+    if now is None:
+        now = timezone.now()
+    limit = get_user_concurrency()
+    running = Q(status=Job.Status.RUNNING, locked_until__gt=now)
+    due = Q(status=Job.Status.QUEUED, run_after__lte=now) | Q(status=Job.Status.RUNNING, locked_until__lte=now)
+    busy = (
+        Job.objects.filter(running).values('owner')
+        .annotate(running=Count('pk')).filter(running__gte=limit).values('owner')
+    )
+    candidates = Job.objects.filter(due).exclude(owner__in=busy).order_by('run_after', 'pk')
+    for pk in candidates.values_list('pk', flat=True)[:10]:
+        # Only one worker's update matches
+        claimed = Job.objects.filter(due, pk=pk).update(
+            status=Job.Status.RUNNING,
+            attempts=F('attempts') + 1,
+            started_at=now,
+            locked_until=now + get_lock_duration(),
+        )
+        if not claimed:
+            continue
+        job = Job.objects.get(pk=pk)
+        if job.owner_id is not None and Job.objects.filter(running, owner=job.owner_id).count() > limit:
+            # Another worker started a job of this user meanwhile
+            Job.objects.filter(pk=pk, attempts=job.attempts).update(
+                status=Job.Status.QUEUED, attempts=F('attempts') - 1, locked_until=None,
+            )
+            continue
+        if job.attempts > job.max_attempts:
+            finish_job(job, Job.Status.FAILED, error=f'Stopped after {job.max_attempts} attempts: its worker stopped')
+            continue
+        return job
+    return None
+
+
+def report_progress(job, **progress):
+    """
+    Save the job's progress and extend its lock; returns False when the job
+    was taken over by another worker (its lock had expired)
+    """
+    job.progress = {**job.progress, **progress}
+    return bool(Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, attempts=job.attempts).update(
+        progress=job.progress, locked_until=timezone.now() + get_lock_duration(),
+    ))
+
+
+def finish_job(job, status, result=None, error=''):
+    # Unless another worker took the job over: its attempt is the current one
+    finished = Job.objects.filter(pk=job.pk, attempts=job.attempts).update(
+        status=status, result=result, error=error, finished_at=timezone.now(), locked_until=None,
+    )
+    if finished and 'file' in job.payload:
+        get_storage().delete(job.payload['file'])
+
+
+def run_job(job):
+    """
+    Run a claimed job and record how it went
+    """
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise JobFailed(f'Unknown job kind: {job.kind}')
+        result = handler(job)
+    except JobFailed as exc:
+        finish_job(job, Job.Status.FAILED, error=str(exc))
+    except Exception as exc:
+        logger.exception('Job %s (%s) failed, attempt %s of %s', job.pk, job.kind, job.attempts, job.max_attempts)
+        error = f'{type(exc).__name__}: {exc}'
+        if job.attempts >= job.max_attempts:
+            finish_job(job, Job.Status.FAILED, error=error)
+        else:
+            Job.objects.filter(pk=job.pk, attempts=job.attempts).update(
+                status=Job.Status.QUEUED,
+                error=error,
+                run_after=timezone.now() + get_retry_delay() * 2 ** (job.attempts - 1),
+                locked_until=None,
+            )
+    else:
+        finish_job(job, Job.Status.SUCCEEDED, result=result)
+
+
+def cancel_job(job):
+    """
+    Cancel a queued job; returns False if it already started
+    """
+    cancelled = Job.objects.filter(pk=job.pk, status=Job.Status.QUEUED).update(
+        status=Job.Status.CANCELLED, finished_at=timezone.now(),
+    )
+    if cancelled and 'file' in job.payload:
+        get_storage().delete(job.payload['file'])
+    return bool(cancelled)
+
+
+def prune_jobs(now=None):
+    """
+    Delete jobs finished more than TASK_JOB_RETENTION_DAYS ago, with their
+    files; returns the number deleted
+    """
+    if now is None:
+        now = timezone.now()
+    expired = Job.objects.filter(status__in=FINISHED, finished_at__lt=now - get_retention())
+    storage = get_storage()
+    for result in expired.filter(kind='export').values_list('result', flat=True):
+        if result and 'file' in result:
+            storage.delete(result['file'])
+    deleted, _ = expired.delete()
+    return deleted
+
+
+def work(burst=False, poll_interval=1.0, stop=None):
+    """
+    Run jobs until ``stop`` (an Event) is set or, with ``burst``, until no
+    job is due; returns the number of jobs run
+    """
+    ran = 0
+    pruned_at = 0
+    while stop is None or not stop.is_set():
+        job = claim_job()
+        if job is not None:
+            run_job(job)
+            ran += 1
+            continue
+        if burst:
+            break
+        if time.monotonic() - pruned_at > 3600:
+            prune_jobs()
+            pruned_at = time.monotonic()
+        if stop is not None:
+            stop.wait(poll_interval)
+        else:
+            time.sleep(poll_interval)
+    return ran
+
+
+def job_filter_params(params):
+    """
+    The TaskFilter parameters of ``params`` (a QueryDict or dict), as
+    stored in job payloads
+    """
+    if not isinstance(params, QueryDict):
+        query = QueryDict(mutable=True)
+        for name, value in params.items():
+            for item in value if isinstance(value, list) else [value]:
+                query.appendlist(name, str(item))
+        params = query
+    return {name: params.getlist(name) for name in params if name in TaskFilter.base_filters}
+
+
+def get_filterset(owner, filters):
+    """
+    TaskFilter of ``owner``'s tasks with the stored parameters ``filters``
+    """
+    params = QueryDict(mutable=True)
+    for name, values in filters.items():
+        params.setlist(name, values)
+    return TaskFilter(params, queryset=Task.objects.for_owner(owner).order_by('due_date', 'id'))
+
+
+def filter_owner_tasks(owner, filters):
+    """
+    ``owner``'s tasks matching the stored TaskFilter parameters ``filters``
+    """
+    filterset = get_filterset(owner, filters)
+    if not filterset.is_valid():
+        raise JobFailed(f'Invalid filters: {filterset.errors.as_json()}')
+    return filterset.qs
+
+
+def get_job_owner(job):
+    if job.owner is None:
+        raise JobFailed('The user was deleted')
+    return job.owner
+
+
+def update_in_batches(job, queryset, update):
+    """
+    Call ``update(batch)`` on the tasks of ``queryset`` one batch of ids at
+    a time, each in its own transaction; returns the number of tasks,
+    including those done by previous attempts
+    """
+    owner = get_job_owner(job)
+    shard = get_owner_shard(owner.pk)
+    # A retry finds the tasks left by the previous attempts
+    previous = job.progress.get('done', 0)
+    ids = list(queryset.values_list('pk', flat=True))
+    size = get_batch_size()
+    for start in range(0, len(ids), size):
+        with transaction.atomic(using=shard):
+            update(Task.objects.for_owner(owner).filter(pk__in=ids[start:start + size]))
+        done = previous + min(start + size, len(ids))
+        if not report_progress(job, done=done, total=previous + len(ids)):
+            raise JobFailed('Taken over by another worker')
+    return previous + len(ids)
+
+
+@job_handler('complete')
+def complete_tasks(job):
+    """
+    Mark the owner's tasks matching ``filters`` completed
+    """
+    owner = get_job_owner(job)
+    queryset = filter_owner_tasks(owner, job.payload.get('filters', {})).filter(completed=False)
+
+    def complete(batch):
+        # update() doesn't maintain auto_now fields
+        batch.update(completed=True, updated_at=timezone.now())
+        tasks_bulk_changed.send(sender=Task, owner_ids=[owner.pk])
+
+    return {'completed': update_in_batches(job, queryset, complete)}
+
+
+@job_handler('delete')
+def delete_tasks(job):
+    """
+    Delete the owner's tasks matching ``filters``
+    """
+    owner = get_job_owner(job)
+    queryset = filter_owner_tasks(owner, job.payload.get('filters', {}))
+    return {'deleted': update_in_batches(job, queryset, lambda batch: batch.delete())}
+
+
+@job_handler('export')
+def export_job(job):
+    """
+    Export the owner's tasks matching ``filters`` to a file in ``format``
+    """
+    owner = get_job_owner(job)
+    export_format = job.payload.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        raise JobFailed(f'Unknown export format: {export_format}')
+    queryset = filter_owner_tasks(owner, job.payload.get('filters', {}))
+    with tempfile.TemporaryFile() as output:
+        for chunk in export_tasks(queryset, export_format):
+            output.write(chunk.encode('utf-8'))
+        size = output.tell()
+        output.seek(0)
+        name = save_job_file(f'tasks.{export_format}', File(output))
+    return {'file': name, 'format': export_format, 'size': size}
+
+
+@job_handler('import')
+def import_job(job):
+    """
+    Import the uploaded ``file``, resuming from the last checkpoint after a
+    failed attempt
+    """
+    owner = get_job_owner(job)
+    before = {'processed': job.payload.get('start', 0), 'imported': 0, 'invalid': 0, 'errors': [], **job.progress}
+
+    def counts(result):
+        return {
+            'processed': result.processed,
+            'imported': before['imported'] + result.imported,
+            'invalid': before['invalid'] + result.invalid,
+            'errors': (before['errors'] + result.errors)[:get_import_error_limit()],
+        }
+
+    def progress(result):
+        if not report_progress(job, **counts(result)):
+            raise JobFailed('Taken over by another worker')
+
+    with get_storage().open(job.payload['file'], 'rb') as upload:
+        lines = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+        try:
+            # ImportInterrupted is retried, from the last batch committed
+            result = import_tasks(lines, job.payload['format'], owner, before['processed'], progress=progress)
+        except ImportFileError as exc:
+            raise JobFailed(str(exc))
+    return counts(result)
+
+
+@job_handler('delete_account')
+def delete_account(job):
+    """
+    Delete the owner, their tasks first in batches so no transaction holds
+    all of them
+    """
+    owner = job.owner
+    if owner is None:
+        # Deleted by a previous attempt
+        return {'deleted': True}
+    # Without tombstones or counters: they go with the user
+    update_in_batches(job, Task.objects.for_owner(owner), lambda batch: models.QuerySet.delete(batch))
+    User.objects.filter(pk=owner.pk).delete()
+    return {'deleted': True}
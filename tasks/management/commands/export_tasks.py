@@ -0,0 +1,49 @@
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from tasks.export import EXPORT_FORMATS, export_tasks
+from tasks.filters import TaskFilter
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = "Stream a user's tasks as NDJSON or CSV, with the API's filter parameters"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', '-o', help='File to write to (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per query (default: TASK_EXPORT_CHUNK_SIZE)')
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='NAME=VALUE',
+            help='TaskFilter parameter, e.g. --filter completed=false --filter ordering=-due_date',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        params = QueryDict(mutable=True)
+        for item in options['filter']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f"Invalid filter '{item}', expected NAME=VALUE")
+            params.appendlist(name, value)
+
+        queryset = Task.objects.for_owner(user).order_by('due_date', 'id')
+        filterset = TaskFilter(params, queryset=queryset)
+        if not filterset.is_valid():
+            raise CommandError(f'Invalid filters: {filterset.errors.as_json()}')
+
+        chunks = export_tasks(filterset.qs, options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(chunks)
+            self.stderr.write(f"Exported tasks of {user.username} to {options['output']}")
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
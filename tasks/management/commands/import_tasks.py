@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.importer import ImportFileError, ImportInterrupted, RECORD_READERS, guess_format, import_tasks
+
+
+class Command(BaseCommand):
+    help = 'Import tasks for a user from a CSV or NDJSON file, resumable after a failure'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help="CSV or NDJSON file, or '-' for stdin")
+        parser.add_argument('--format', choices=sorted(RECORD_READERS), help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, help='Records per transaction (default: TASK_IMPORT_BATCH_SIZE)')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <path>.checkpoint)')
+        parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint of an interrupted run')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        path = options['path']
+        import_format = options['format'] or guess_format(path)
+        if import_format is None:
+            raise CommandError('Cannot tell the file format from its name, pass --format')
+
+        checkpoint = options['checkpoint'] or (None if path == '-' else f'{path}.checkpoint')
+        start = self.read_checkpoint(checkpoint) if options['resume'] else 0
+
+        def progress(result):
+            self.write_checkpoint(checkpoint, result.processed)
+            if options['verbosity'] >= 1:
+                self.stderr.write(
+                    f'{result.processed} records processed, {result.imported} imported, '
+                    f'{result.invalid} invalid ({result.rows_per_second} rows/s)'
+                )
+
+        try:
+            if path == '-':
+                result = import_tasks(sys.stdin, import_format, user, start, options['batch_size'], progress)
+            else:
+                with open(path, newline='', encoding='utf-8-sig') as lines:
+                    result = import_tasks(lines, import_format, user, start, options['batch_size'], progress)
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except ImportFileError as exc:
+            raise CommandError(str(exc))
+        except ImportInterrupted as exc:
+            raise CommandError(f'{exc}\nRun again with --resume to continue from record {exc.result.processed}')
+
+        for error in result.errors:
+            self.stderr.write(f"Line {error['line']}: {json.dumps(error['errors'])}")
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.imported} tasks for {user.username}, skipped {result.invalid} invalid records'
+        ))
+
+    def read_checkpoint(self, checkpoint):
+        if checkpoint is None:
+            raise CommandError('--resume needs --checkpoint when reading stdin')
+        try:
+            with open(checkpoint) as f:
+                return int(f.read())
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            raise CommandError(f'Corrupt checkpoint file {checkpoint}')
+
+    def write_checkpoint(self, checkpoint, processed):
+        if checkpoint is None:
+            return
+        # Replace atomically so a crash never leaves a half-written file
+        with open(f'{checkpoint}.tmp', 'w') as f:
+            f.write(str(processed))
+        os.replace(f'{checkpoint}.tmp', checkpoint)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from tasks.sync import get_tombstone_retention, prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete task tombstones older than TASK_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} tombstones older than {get_tombstone_retention().days} days'
+        ))
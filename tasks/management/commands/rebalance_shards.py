@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.sharding import get_owner_shard, get_shards, is_sharded, move_owner_tasks
+
+
+class Command(BaseCommand):
+    help = "Move users' tasks to another shard (TASK_SHARDS); users should be idle meanwhile"
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='+', metavar='username')
+        parser.add_argument('--to', required=True, dest='shard', help='Database alias of the target shard')
+
+    def handle(self, *args, **options):
+        if not is_sharded():
+            raise CommandError('Tasks are not sharded, set DATABASE_SHARD_URLS')
+        shard = options['shard']
+        if shard not in get_shards():
+            raise CommandError(f"Unknown shard '{shard}', expected one of: {', '.join(get_shards())}")
+
+        users = {user.username: user for user in User.objects.filter(username__in=options['usernames'])}
+        missing = [username for username in options['usernames'] if username not in users]
+        if missing:
+            raise CommandError(f"User '{missing[0]}' does not exist")
+
+        for username in options['usernames']:
+            user = users[username]
+            source = get_owner_shard(user.pk)
+            if source == shard:
+                self.stdout.write(f'{username} is already on {shard}')
+                continue
+            moved = move_owner_tasks(user, shard)
+            self.stdout.write(self.style.SUCCESS(f'Moved {moved} tasks of {username} from {source} to {shard}'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from tasks.counters import reconcile_counters
+from tasks.sharding import get_shards
+
+
+class Command(BaseCommand):
+    help = "Recount every user's task counters from their tasks and repair drift; run nightly"
+
+    def handle(self, *args, **options):
+        for shard in get_shards():
+            repaired = reconcile_counters(shard)
+            self.stdout.write(self.style.SUCCESS(f'Repaired the task counters of {len(repaired)} users on {shard}'))
@@ -0,0 +1,48 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.reminders import get_notifier, prune_reminders, run_scheduler
+
+
+class Command(BaseCommand):
+    help = 'Queue and send reminders of tasks passing their due date, every few seconds until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run one tick and exit')
+        parser.add_argument(
+            '--interval', type=float, default=getattr(settings, 'TASK_REMINDER_INTERVAL_SECONDS', 60),
+            help='Seconds between ticks (default: TASK_REMINDER_INTERVAL_SECONDS)',
+        )
+
+    def handle(self, *args, **options):
+        notifier = get_notifier()
+        if options['once']:
+            self.tick(notifier, verbose=True)
+            return
+
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            stop.set()
+
+        previous = {signum: signal.signal(signum, request_stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+        pruned_at = 0
+        try:
+            while not stop.is_set():
+                self.tick(notifier)
+                if time.monotonic() - pruned_at > 3600:
+                    prune_reminders()
+                    pruned_at = time.monotonic()
+                stop.wait(options['interval'])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def tick(self, notifier, verbose=False):
+        found, sent = run_scheduler(notifier)
+        if found or sent or verbose:
+            self.stdout.write(self.style.SUCCESS(f'Found {found} newly overdue tasks, sent {sent} reminders'))
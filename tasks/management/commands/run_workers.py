@@ -0,0 +1,77 @@
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks.jobs import work
+
+# Set by the parent process on SIGINT or SIGTERM: workers finish their job
+# and exit
+stop = None
+
+
+def init_worker(stop_event):
+    global stop
+    # Only the parent handles signals, so running jobs are not interrupted
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    stop = stop_event
+    django.setup()
+
+
+def run_worker(burst, poll_interval):
+    try:
+        return work(burst=burst, poll_interval=poll_interval, stop=stop)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs (tasks.jobs) in a pool of worker processes until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=multiprocessing.cpu_count(),
+            help='Worker processes (default: one per CPU); 1 runs jobs in this process',
+        )
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds between looks for due jobs while idle (default: 1)',
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        burst, poll_interval = options['burst'], options['poll_interval']
+        if processes == 1:
+            stop_event = threading.Event()
+            with self.stop_on_signals(stop_event):
+                ran = work(burst=burst, poll_interval=poll_interval, stop=stop_event)
+        else:
+            stop_event = multiprocessing.Event()
+            # Connections must not be shared with forked workers
+            connections.close_all()
+            with self.stop_on_signals(stop_event), ProcessPoolExecutor(
+                processes, initializer=init_worker, initargs=(stop_event,),
+            ) as pool:
+                workers = [pool.submit(run_worker, burst, poll_interval) for _ in range(processes)]
+                ran = sum(worker.result() for worker in workers)
+        self.stdout.write(self.style.SUCCESS(f'Ran {ran} jobs'))
+
+    @contextmanager
+    def stop_on_signals(self, stop_event):
+        def request_stop(signum, frame):
+            self.stderr.write('Stopping once the running jobs finish')
+            stop_event.set()
+
+        previous = {signum: signal.signal(signum, request_stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            yield
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
@@ -0,0 +1,324 @@
+"""
+Request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` records, per view and method: request counts by
+status, a latency histogram, SQL query counts and time (from
+``request.query_stats``, see ``tasks.querybudget``), serializer time and a
+response size histogram. Metrics are aggregated in memory per process,
+under one lock held only for a few dict updates.
+
+With several worker processes (gunicorn), set ``TASK_METRICS_DIR`` to a
+directory shared by the workers: each one writes a snapshot of its
+metrics there at most every ``TASK_METRICS_FLUSH_SECONDS``, and
+``/metrics`` serves the sum of all snapshots, whichever worker answers.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+# name: (type, help, buckets)
+METRICS = {
+    'task_http_requests_total': ('counter', 'Requests by view, method and status.', None),
+    'task_http_request_duration_seconds': ('histogram', 'Request latency.', LATENCY_BUCKETS),
+    'task_http_response_size_bytes': ('histogram', 'Response body size.', SIZE_BUCKETS),
+    'task_db_queries_per_request': ('histogram', 'SQL queries run per request.', QUERY_BUCKETS),
+    'task_db_query_duration_seconds_total': ('counter', 'Time spent in SQL queries.', None),
+    'task_serializer_duration_seconds_total': ('counter', 'Time spent producing serializer data.', None),
+}
+
+_current_request = ContextVar('task_request_metrics', default=None)
+
+
+def get_metrics_dir():
+    return getattr(settings, 'TASK_METRICS_DIR', None)
+
+
+def get_flush_interval():
+    return getattr(settings, 'TASK_METRICS_FLUSH_SECONDS', 1.0)
+
+
+def label_key(**labels):
+    """
+    Serialized labels, as used in snapshots
+    """
+    return json.dumps(sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """
+    In-memory metrics of the current process
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.last_flush = 0.0
+        # name -> label tuple -> value (counters) or [bucket counts..., sum, count]
+        self.values = {name: {} for name in METRICS}
+
+    def inc(self, name, key, amount=1):
+        values = self.values[name]
+        values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, key, value):
+        buckets = METRICS[name][2]
+        values = self.values[name]
+        histogram = values.get(key)
+        if histogram is None:
+            histogram = values[key] = [0] * (len(buckets) + 2)
+        # Per-bucket counts, cumulated when rendering; values above the last
+        # bucket only count towards +Inf
+        index = bisect_left(buckets, value)
+        if index < len(buckets):
+            histogram[index] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def record(self, view, method, status, duration, size, queries, query_time, serializer_time):
+        if os.getpid() != self.pid:
+            # Forked worker: don't report the parent's numbers as our own
+            self.reset()
+        # Label tuples are sorted by name, like label_key()
+        key = (('method', method), ('view', view))
+        with self.lock:
+            self.inc('task_http_requests_total', (('method', method), ('status', str(status)), ('view', view)))
+            self.observe('task_http_request_duration_seconds', key, duration)
+            if size is not None:
+                self.observe('task_http_response_size_bytes', key, size)
+            if queries is not None:
+                self.observe('task_db_queries_per_request', key, queries)
+                self.inc('task_db_query_duration_seconds_total', key, query_time)
+            if serializer_time:
+                self.inc('task_serializer_duration_seconds_total', key, serializer_time)
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {
+                    label_key(**dict(key)): list(value) if isinstance(value, list) else value
+                    for key, value in values.items()
+                }
+                for name, values in self.values.items()
+            }
+
+    def maybe_flush(self, force=False):
+        """
+        Write this process' snapshot to TASK_METRICS_DIR, if configured
+        """
+        directory = get_metrics_dir()
+        now = time.monotonic()
+        if not directory or (not force and now - self.last_flush < get_flush_interval()):
+            return
+        self.last_flush = now
+        path = Path(directory) / f'metrics-{os.getpid()}.json'
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+
+registry = MetricsRegistry()
+
+
+def merge_snapshots(snapshots):
+    merged = {name: {} for name in METRICS}
+    for snapshot in snapshots:
+        for name, values in snapshot.items():
+            if name not in merged:
+                continue
+            for key, value in values.items():
+                if isinstance(value, list):
+                    current = merged[name].setdefault(key, [0] * len(value))
+                    merged[name][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged[name][key] = merged[name].get(key, 0) + value
+    return merged
+
+
+def collect():
+    """
+    Metrics of this process, or of all worker processes in TASK_METRICS_DIR
+    """
+    directory = get_metrics_dir()
+    if not directory:
+        return registry.snapshot()
+    registry.maybe_flush(force=True)
+    snapshots = []
+    for path in Path(directory).glob('metrics-*.json'):
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # Being replaced by its worker right now; picked up next scrape
+            continue
+    return merge_snapshots(snapshots)
+
+
+def format_labels(key, **extra):
+    labels = dict(json.loads(key), **extra)
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    """
+    Render a snapshot in the Prometheus text exposition format
+    """
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(snapshot.get(name, {}).items()):
+            if kind == 'counter':
+                lines.append(f'{name}{format_labels(key)} {format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(key, le=format_value(float(bound)))} {cumulative}')
+            lines.append(f'{name}_bucket{format_labels(key, le="+Inf")} {value[-1]}')
+            lines.append(f'{name}_sum{format_labels(key)} {format_value(float(value[-2]))}')
+            lines.append(f'{name}_count{format_labels(key)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.serializer_time = 0.0
+
+
+@contextmanager
+def time_serializer():
+    """
+    Add the time spent in the block to the current request's serializer time
+    """
+    current = _current_request.get()
+    if current is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.serializer_time += time.perf_counter() - started
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """
+    Record request metrics; install right before QueryBudgetMiddleware
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        current = RequestMetrics()
+        token = _current_request.set(current)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        return self.process_response(request, response, started, current)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        current = RequestMetrics()
+        token = _current_request.set(current)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        return self.process_response(request, response, started, current)
+
+    def process_response(self, request, response, started, current):
+        def record(size):
+            stats = getattr(request, 'query_stats', None)
+            registry.record(
+                view=get_view_name(request),
+                method=request.method,
+                status=response.status_code,
+                duration=time.perf_counter() - started,
+                size=size,
+                queries=stats.count if stats is not None else None,
+                query_time=stats.duration if stats is not None else 0.0,
+                serializer_time=current.serializer_time,
+            )
+
+        if response.streaming:
+            # Recorded once the body has been sent
+            if response.is_async:
+                response.streaming_content = self.acount_streamed(response.streaming_content, record)
+            else:
+                response.streaming_content = self.count_streamed(response.streaming_content, record)
+        else:
+            record(len(response.content))
+        return response
+
+    @staticmethod
+    def count_streamed(content, record):
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            record(size)
+
+    @staticmethod
+    async def acount_streamed(content, record):
+        size = 0
+        try:
+            async for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            record(size)
+
+
+def metrics_view(request):
+    """
+    Serve the metrics; protected by a bearer token when TASK_METRICS_TOKEN is set
+    """
+    token = getattr(settings, 'TASK_METRICS_TOKEN', None)
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from tasks.search import install_search_index, remove_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_owner_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, remove_search_index),
+    ]
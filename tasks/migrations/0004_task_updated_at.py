@@ -0,0 +1,23 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+from tasks.search import install_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_task_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        # Adding the column rebuilds the table on SQLite, which drops the
+        # full-text search triggers
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from tasks.search import install_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tasks', '0005_task_created_at_tombstones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('shard', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='owner',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='tasktombstone',
+            name='owner',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        # Dropping the constraint rebuilds the table on SQLite, which drops
+        # the full-text search triggers
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-17 08:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_tasks(apps, schema_editor):
+    """
+    Build the counters of the tasks already in this database
+    """
+    using = schema_editor.connection.alias
+    Task = apps.get_model('tasks', 'Task')
+    UserTaskCounters = apps.get_model('tasks', 'UserTaskCounters')
+    UserTaskDueCount = apps.get_model('tasks', 'UserTaskDueCount')
+    tasks = Task.objects.using(using).order_by()
+    UserTaskCounters.objects.using(using).bulk_create([
+        UserTaskCounters(owner_id=owner_id, total=total, completed=completed)
+        for owner_id, total, completed in tasks.values('owner_id').annotate(
+            total_count=models.Count('id'),
+            completed_count=models.Count('id', filter=models.Q(completed=True)),
+        ).values_list('owner_id', 'total_count', 'completed_count')
+    ], batch_size=500)
+    UserTaskDueCount.objects.using(using).bulk_create([
+        UserTaskDueCount(owner_id=owner_id, due_date=due_date, open=count)
+        for owner_id, due_date, count in tasks.filter(completed=False).values('owner_id', 'due_date')
+        .annotate(open_count=models.Count('id')).values_list('owner_id', 'due_date', 'open_count')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tasks', '0006_task_sharding'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskCounters',
+            fields=[
+                ('owner', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'user task counters',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserTaskDueCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_date', models.DateField()),
+                ('open', models.IntegerField(default=0)),
+                ('owner', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner', 'due_date'), name='task_due_count_owner_date_uniq')],
+            },
+        ),
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
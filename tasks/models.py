@@ -1,12 +1,350 @@
-from django.db import models
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, models, router, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+# Set while TaskQuerySet.bulk_update() runs its update() queries, whose
+# changes it counts itself
+_bulk_updating = ContextVar('task_bulk_updating', default=False)
+
+
+class OwnedQuerySet(models.QuerySet):
+    """
+    Rows owned by one user, stored in that user's shard (see ``tasks.sharding``)
+    """
+
+    def in_shard(self, shard):
+        # The default database is left to the routers, which may read from
+        # a replica
+        return self if shard == DEFAULT_DB_ALIAS else self.using(shard)
+
+    def for_owner(self, owner):
+        """
+        ``owner``'s rows, read from and written to their shard
+        """
+        from .sharding import get_owner_shard
+
+        return self.in_shard(get_owner_shard(owner.pk)).filter(owner=owner)
+
+
+class TaskQuerySet(OwnedQuerySet):
+    """
+    Bulk writes keep the owners' counters (see ``tasks.counters``) up to date
+    """
+
+    def delete(self):
+        """
+        Delete the tasks and record their tombstones with a single insert
+        """
+        from .counters import CounterChanges
+
+        with transaction.atomic(using=self.db):
+            deleted = list(self.values_list('pk', 'owner_id', 'due_date', 'completed'))
+            result = super().delete()
+            TaskTombstone.objects.using(self.db).bulk_create([
+                TaskTombstone(task_id=pk, owner_id=owner_id) for pk, owner_id, _, _ in deleted
+            ])
+            changes = CounterChanges()
+            for _, owner_id, due_date, completed in deleted:
+                changes.remove(owner_id, due_date, completed)
+            changes.save(self.db)
+        return result
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .counters import CounterChanges, reconcile_counters
+
+        objs = list(objs)
+        self._for_write = True
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # Which rows were inserted is unknown: recount
+                reconcile_counters(self.db, sorted({task.owner_id for task in objs}))
+            else:
+                changes = CounterChanges()
+                for task in objs:
+                    changes.add(*task.get_counted_values())
+                changes.save(self.db)
+        for task in objs:
+            task.remember_counted_values()
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        from .counters import COUNTED_FIELDS, CounterChanges
+
+        objs = list(objs)
+        updated = {self.model._meta.get_field(name).attname for name in fields}
+        if updated.isdisjoint(COUNTED_FIELDS):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+
+        self._for_write = True
+        with transaction.atomic(using=self.db, savepoint=False):
+            unknown = [task.pk for task in objs if task._counted is None]
+            stored = {}
+            if unknown:
+                rows = self.model._base_manager.using(self.db).filter(pk__in=unknown).values_list('pk', *COUNTED_FIELDS)
+                stored = {pk: tuple(counted) for pk, *counted in rows}
+            token = _bulk_updating.set(True)
+            try:
+                rows = super().bulk_update(objs, fields, *args, **kwargs)
+            finally:
+                _bulk_updating.reset(token)
+            changes = CounterChanges()
+            for task in objs:
+                counted = task._counted or stored.get(task.pk)
+                if counted is None:
+                    # Not in the database, so not updated
+                    continue
+                changes.remove(*counted)
+                changes.add(*(
+                    getattr(task, name) if name in updated else value
+                    for name, value in zip(COUNTED_FIELDS, counted)
+                ))
+            changes.save(self.db)
+        for task in objs:
+            task.remember_counted_values()
+        return rows
+
+    def update(self, **kwargs):
+        from .counters import COUNTED_FIELDS, CounterChanges, reconcile_counters
+
+        values = {
+            self.model._meta.get_field(name).attname: value.pk if isinstance(value, models.Model) else value
+            for name, value in kwargs.items()
+        }
+        if _bulk_updating.get() or values.keys().isdisjoint(COUNTED_FIELDS):
+            return super().update(**kwargs)
+
+        self._for_write = True
+        with transaction.atomic(using=self.db, savepoint=False):
+            groups = list(self.values_list(*COUNTED_FIELDS).annotate(models.Count('pk')).order_by())
+            rows = super().update(**kwargs)
+            if any(hasattr(values[name], 'resolve_expression') for name in values.keys() & set(COUNTED_FIELDS)):
+                # New values computed by the database: recount
+                owners = {group[0] for group in groups}
+                if 'owner_id' in values:
+                    owners.add(values['owner_id'])
+                reconcile_counters(self.db, sorted(owners))
+            else:
+                changes = CounterChanges()
+                for *counted, count in groups:
+                    changes.remove(*counted, count=count)
+                    changes.add(*(values.get(name, value) for name, value in zip(COUNTED_FIELDS, counted)), count=count)
+                changes.save(self.db)
+        return rows
+
 
 class Task(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     due_date = models.DateField()
     completed = models.BooleanField(default=False)
-    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Tasks may live in another database (shard) than their owner
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    # Owner, due date and completion as last read or written, which the
+    # counters count this task as (see tasks.counters); None if unknown
+    _counted = None
+
+    class Meta:
+        # Every query is scoped by owner, then filters on completed/due_date
+        # or orders by due_date.
+        indexes = [
+            models.Index(fields=['owner', 'due_date'], name='task_owner_due_idx'),
+            models.Index(fields=['owner', 'completed', 'due_date'], name='task_owner_done_due_idx'),
+            models.Index(
+                fields=['owner', 'due_date'],
+                name='task_owner_open_due_idx',
+                condition=models.Q(completed=False),
+            ),
+            # Delta sync: the user's tasks changed since a cursor
+            models.Index(fields=['owner', 'updated_at'], name='task_owner_updated_idx'),
+            # Overdue scheduler: every user's open tasks due on a date, by id
+            models.Index(fields=['due_date', 'id'], name='task_open_due_id_idx', condition=models.Q(completed=False)),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def save(self, *args, **kwargs):
+        # post_save updates the counters (tasks.signals): in the same transaction
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        task.remember_counted_values()
+        return task
+
+    def get_counted_values(self):
+        return self.owner_id, self.due_date, self.completed
+
+    def remember_counted_values(self):
+        if not self.get_deferred_fields() & {'owner_id', 'due_date', 'completed'}:
+            self._counted = self.get_counted_values()
+
+
+class TaskTombstone(models.Model):
+    """
+    Record of a deleted task, so sync clients can learn about deletions.
+    """
+    task_id = models.BigIntegerField()
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'deleted_at'], name='tombstone_owner_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f'Task {self.task_id} deleted at {self.deleted_at}'
+
+
+class UserShard(models.Model):
+    """
+    Shard (database alias) holding a user's tasks and tombstones, when tasks
+    are sharded; stored in the default database.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    shard = models.CharField(max_length=100)
+
+    def __str__(self):
+        return f'{self.user_id} on {self.shard}'
+
+
+class TaskReminder(models.Model):
+    """
+    Reminder that a task passed its due date, queued by the overdue
+    scheduler and sent by its notifier (see ``tasks.reminders``).
+    """
+    task_id = models.BigIntegerField()
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    title = models.CharField(max_length=200)
+    due_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Queued once per deadline, however often the scheduler sees it
+            models.UniqueConstraint(fields=['task_id', 'due_date'], name='reminder_task_due_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['id'], name='reminder_pending_idx', condition=models.Q(sent_at__isnull=True)),
+            models.Index(fields=['sent_at'], name='reminder_sent_idx'),
+        ]
+
+    def __str__(self):
+        return f'Task {self.task_id} overdue since {self.due_date}'
+
+
+class OverdueWatermark(models.Model):
+    """
+    How far the overdue scheduler got through the open tasks of its
+    database: those due before ``due_date``, and those due on it up to
+    ``task_id``. One row per database holding tasks.
+    """
+    due_date = models.DateField()
+    task_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Overdue tasks seen up to task {self.task_id} due {self.due_date}'
+
+
+class UserTaskCounters(models.Model):
+    """
+    Number of tasks a user has and of those completed, kept up to date as
+    tasks are written (see ``tasks.counters``); stored in the user's shard.
+    """
+    owner = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, db_constraint=False)
+    total = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'user task counters'
+
+    @property
+    def open(self):
+        return self.total - self.completed
+
+    def __str__(self):
+        return f'{self.owner_id}: {self.completed}/{self.total} completed'
+
+
+class UserTaskDueCount(models.Model):
+    """
+    Number of a user's open tasks due on a date, kept up to date as tasks
+    are written (see ``tasks.counters``); stored in the user's shard.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    due_date = models.DateField()
+    open = models.IntegerField(default=0)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Also serves the overdue sum: the owner's dates before today
+            models.UniqueConstraint(fields=['owner', 'due_date'], name='task_due_count_owner_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.owner_id}: {self.open} open due {self.due_date}'
+
+
+class Job(models.Model):
+    """
+    A long operation on a user's tasks, run by a background worker (see
+    ``tasks.jobs``); stored in the default database.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued'
+        RUNNING = 'running'
+        SUCCEEDED = 'succeeded'
+        FAILED = 'failed'
+        CANCELLED = 'cancelled'
+
+    kind = models.CharField(max_length=50)
+    # Null once the user is deleted, e.g. by their delete_account job
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    payload = models.JSONField(default=dict)
+    progress = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # Queued jobs wait until then (retries back off); running jobs whose
+    # lock expired lost their worker and are run again
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the next job due
+            models.Index(fields=['status', 'run_after'], name='job_status_due_idx'),
+            # Per-user limits and job lists
+            models.Index(fields=['owner', 'status'], name='job_owner_status_idx'),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f'{self.kind} job {self.pk} ({self.status})'
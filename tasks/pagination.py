@@ -0,0 +1,162 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework import exceptions
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .filters import TaskFilter
+from .models import Task
+from .search import is_searched
+
+
+class TaskCursorPagination(BasePagination):
+    """
+    Keyset pagination on (ordering field, id).
+
+    Each page is fetched with a range condition on the last row of the
+    previous page instead of an OFFSET, and no COUNT(*) is run, so page
+    5000 costs the same as page 1.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    default_ordering = 'due_date'
+    invalid_cursor_message = 'Invalid cursor'
+    search_message = (
+        'Search results are ranked by relevance and cannot be paginated with a cursor; '
+        'order them with the ordering parameter.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(request)
+        if ordering is None:
+            if is_searched(queryset):
+                # Keyset pages follow an ordering field, not SEARCH_RANK: the
+                # same search would come back in a different order
+                raise exceptions.ValidationError({'search': [self.search_message]})
+            ordering = self.default_ordering, False
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.field_name, self.descending = ordering
+
+        prefix = '-' if self.descending else ''
+        queryset = queryset.order_by(prefix + self.field_name, prefix + 'id')
+        selected = queryset.query.values_select
+        if selected and not {self.field_name, 'id'} <= set(selected):
+            # .values() rows (TaskViewSet.list): the cursor is read from them
+            queryset = queryset.values(*selected, *({self.field_name, 'id'} - set(selected)))
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            value, pk = position
+            after = 'lt' if self.descending else 'gt'
+            after_or_equal = 'lte' if self.descending else 'gte'
+            # The first condition gives the database an index range to seek
+            # into; the second skips rows of the previous page that share
+            # the same ordering value.
+            queryset = queryset.filter(
+                Q(**{f'{self.field_name}__{after_or_equal}': value}),
+                Q(**{f'{self.field_name}__{after}': value}) | Q(**{f'id__{after}': pk}),
+            )
+
+        # Fetch one extra row to know whether there is a next page
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_ordering(self, request):
+        """
+        Return (field name, descending) from the TaskFilter ordering param,
+        or None without one
+        """
+        choices = TaskFilter.base_filters['ordering'].param_map
+        requested = request.query_params.get(self.ordering_query_param, '')
+        requested = requested.split(',')[0].strip()
+
+        field_name = requested.lstrip('-')
+        if field_name in choices:
+            try:
+                Task._meta.get_field(choices[field_name])
+            except FieldDoesNotExist:
+                pass
+            else:
+                return choices[field_name], requested.startswith('-')
+        return None
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            value, pk = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            field = Task._meta.get_field(self.field_name)
+            return field.to_python(value), int(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise exceptions.NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance):
+        if isinstance(instance, dict):
+            instance = Task(id=instance['id'], **{self.field_name: instance[self.field_name]})
+        field = Task._meta.get_field(self.field_name)
+        position = [field.value_to_string(instance), instance.pk]
+        encoded = urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+
+class TaskPagination(PageNumberPagination):
+    """
+    Page number pagination by default; keyset pagination when the client
+    asks for it with ``?pagination=cursor`` or sends a ``cursor``.
+    """
+    mode_query_param = 'pagination'
+    cursor_pagination_class = TaskCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,182 @@
+"""
+Per-request SQL query budgets.
+
+Views declare how many queries a request may run: ``query_budget`` on a
+class-based view, or ``query_budgets`` (action name -> budget) on a
+viewset; ``None`` means unbudgeted. ``QueryBudgetMiddleware`` counts and
+times the queries of every request and logs a warning when a view goes
+over its budget, or raises QueryBudgetExceeded when
+``TASK_QUERY_BUDGET_RAISE`` is set (development and tests), so N+1
+queries fail loudly before they reach production.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    """
+    Number and total duration of the queries run during a request
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Stats of every record_queries() block active in the current context.
+# Concurrent async requests share the executor thread's connection, so
+# queries are attributed by context rather than by connection.
+_active_stats = ContextVar('task_query_stats', default=())
+
+
+def _record_query(execute, sql, params, many, context):
+    active = _active_stats.get()
+    if not active:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for stats in active:
+            stats.count += 1
+            stats.duration += duration
+
+
+def install_query_recorder():
+    """
+    Install the query recording ``execute_wrapper`` on this thread's
+    connections; it costs a context lookup per query outside of requests
+    """
+    for connection in connections.all():
+        if _record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_record_query)
+
+
+@contextmanager
+def record_queries():
+    """
+    Yield a QueryStats recording the queries run on every database
+    """
+    install_query_recorder()
+    stats = QueryStats()
+    token = _active_stats.set(_active_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(token)
+
+
+def get_query_budget(request):
+    """
+    Return the budget declared by the view that handled ``request``.
+
+    A plain view class may also declare ``query_budgets`` per HTTP method.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view = match.func
+    view_class = getattr(view, 'cls', None) or getattr(view, 'view_class', None)
+    if view_class is None:
+        return getattr(view, 'query_budget', None)
+
+    budgets = getattr(view_class, 'query_budgets', None)
+    if budgets is not None:
+        method = request.method.lower()
+        if method == 'head':
+            method = 'get'
+        actions = getattr(view, 'actions', None)
+        return budgets.get(actions.get(method) if actions is not None else method)
+    return getattr(view_class, 'query_budget', None)
+
+
+class QueryBudgetMiddleware:
+    """
+    Record ``request.query_stats`` and enforce the view's query budget.
+
+    Install it first so session and authentication queries are counted.
+    Queries run while a streaming response is consumed are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries() as stats:
+            response = self.get_response(request)
+        request.query_stats = stats
+        self.check_budget(request, stats)
+        return response
+
+    async def __acall__(self, request):
+        # Under ASGI the ORM runs in the thread-sensitive executor thread,
+        # whose connections are the ones to wrap; the context is copied there
+        await sync_to_async(install_query_recorder)()
+        stats = QueryStats()
+        token = _active_stats.set(_active_stats.get() + (stats,))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _active_stats.reset(token)
+        request.query_stats = stats
+        self.check_budget(request, stats)
+        return response
+
+    def check_budget(self, request, stats):
+        budget = get_query_budget(request)
+        if budget is None or stats.count <= budget:
+            return
+        message = (
+            f'{request.method} {request.path} ran {stats.count} queries '
+            f'({stats.duration * 1000:.1f}ms), budget is {budget}'
+        )
+        if getattr(settings, 'TASK_QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase helpers for query budgets
+    """
+
+    def assertWithinQueryBudget(self, response):
+        """
+        Fail unless the request behind ``response`` stayed within its
+        view's declared budget
+        """
+        request = getattr(response, 'wsgi_request', None) or response.asgi_request
+        budget = get_query_budget(request)
+        self.assertIsNotNone(budget, f'{request.method} {request.path} declares no query budget')
+        self.assertLessEqual(
+            request.query_stats.count, budget,
+            f'{request.method} {request.path} ran {request.query_stats.count} queries, budget is {budget}',
+        )
+
+    @contextmanager
+    def assertMaxQueries(self, budget):
+        """
+        Fail when the block runs more than ``budget`` queries
+        """
+        with record_queries() as stats:
+            yield stats
+        self.assertLessEqual(stats.count, budget, f'{stats.count} queries run, budget is {budget}')
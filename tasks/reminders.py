@@ -0,0 +1,200 @@
+"""
+Overdue reminders: a scheduler notices tasks passing their due date.
+
+A task is overdue from the day after its due date, while it is open. Every
+tick, ``run_scheduler`` walks each database's open tasks due before today
+with ``task_open_due_id_idx``, starting from its ``OverdueWatermark``: one
+date at a time, by id, ``TASK_REMINDER_BATCH_SIZE`` tasks per query and
+transaction. Each batch queues a ``TaskReminder`` per task and moves the
+watermark, so ticks only read the tasks that became overdue since the last
+one, and a stopped scheduler carries on where it was.
+
+Queued reminders of tasks still overdue are then sent through the
+``TASK_REMINDER_NOTIFIER`` (any class with a ``send(reminders)`` method)
+and marked sent; reminders of tasks completed, rescheduled or deleted
+meanwhile are dropped. A notifier failing leaves its reminders queued
+for the next tick: a reminder may be sent twice, never lost. Run a single
+scheduler (``manage.py run_overdue_scheduler``).
+
+The first tick of a database starts with the tasks due yesterday: tasks
+overdue before the scheduler ran get no reminder. Tasks created or
+rescheduled with a due date the watermark already passed get none either.
+"""
+import json
+import logging
+import sys
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OverdueWatermark, Task, TaskReminder
+from .sharding import get_shards
+
+logger = logging.getLogger(__name__)
+
+
+def get_reminder_batch_size():
+    return getattr(settings, 'TASK_REMINDER_BATCH_SIZE', 1000)
+
+
+def get_reminder_retention():
+    return timedelta(days=getattr(settings, 'TASK_REMINDER_RETENTION_DAYS', 30))
+
+
+def get_notifier():
+    path = getattr(settings, 'TASK_REMINDER_NOTIFIER', 'tasks.reminders.ConsoleNotifier')
+    return import_string(path)()
+
+
+class ConsoleNotifier:
+    """
+    Write one line per reminder to standard output
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, reminders):
+        for reminder in reminders:
+            self.stream.write(
+                f'Task {reminder.task_id} of user {reminder.owner_id} is overdue: '
+                f'"{reminder.title}" was due {reminder.due_date}\n'
+            )
+        self.stream.flush()
+
+
+class FileNotifier:
+    """
+    Append one JSON object per reminder to the TASK_REMINDER_FILE file
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.TASK_REMINDER_FILE
+
+    def send(self, reminders):
+        with open(self.path, 'a', encoding='utf-8') as output:
+            for reminder in reminders:
+                output.write(json.dumps({
+                    'task_id': reminder.task_id,
+                    'owner_id': reminder.owner_id,
+                    'title': reminder.title,
+                    'due_date': reminder.due_date.isoformat(),
+                }) + '\n')
+
+
+def get_watermark(using, today):
+    watermark = OverdueWatermark.objects.using(using).first()
+    if watermark is None:
+        watermark = OverdueWatermark.objects.using(using).create(due_date=today - timedelta(days=1))
+    return watermark
+
+
+def queue_reminders(using, today=None):
+    """
+    Queue reminders for the open tasks of ``using`` that became overdue
+    since the last call; returns how many tasks were found (those already
+    queued, like the tasks of a user moved to this shard, are not queued
+    twice)
+    """
+    if today is None:
+        today = timezone.localdate()
+    batch_size = get_reminder_batch_size()
+    watermark = get_watermark(using, today)
+    open_tasks = Task.objects.using(using).filter(completed=False)
+    found = 0
+    while watermark.due_date < today:
+        batch = list(
+            open_tasks.filter(due_date=watermark.due_date, id__gt=watermark.task_id)
+            .order_by('id').values_list('id', 'owner_id', 'title')[:batch_size]
+        )
+        if batch:
+            with transaction.atomic(using=using):
+                TaskReminder.objects.using(using).bulk_create([
+                    TaskReminder(task_id=pk, owner_id=owner_id, title=title, due_date=watermark.due_date)
+                    for pk, owner_id, title in batch
+                ], ignore_conflicts=True)
+                watermark.task_id = batch[-1][0]
+                watermark.save(using=using)
+            found += len(batch)
+            if len(batch) == batch_size:
+                continue
+        # On to the next date with open tasks, if it has passed
+        next_date = (
+            open_tasks.filter(due_date__gt=watermark.due_date, due_date__lt=today)
+            .order_by('due_date').values_list('due_date', flat=True).first()
+        )
+        if next_date is None:
+            break
+        watermark.due_date, watermark.task_id = next_date, 0
+    return found
+
+
+def send_reminders(using, notifier, today=None):
+    """
+    Send the queued reminders of ``using`` through ``notifier``; returns
+    how many were sent
+    """
+    if today is None:
+        today = timezone.localdate()
+    batch_size = get_reminder_batch_size()
+    pending = TaskReminder.objects.using(using).filter(sent_at__isnull=True).order_by('id')
+    sent = 0
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return sent
+        last_id = batch[-1].pk
+        overdue = set(
+            Task.objects.using(using)
+            .filter(pk__in=[reminder.task_id for reminder in batch], completed=False, due_date__lt=today)
+            .values_list('id', 'due_date')
+        )
+        due = [reminder for reminder in batch if (reminder.task_id, reminder.due_date) in overdue]
+        if len(due) < len(batch):
+            # Completed, rescheduled or deleted since they were queued
+            TaskReminder.objects.using(using).filter(pk__in=[reminder.pk for reminder in batch]).exclude(
+                pk__in=[reminder.pk for reminder in due]
+            ).delete()
+        if not due:
+            continue
+        try:
+            notifier.send(due)
+        except Exception:
+            logger.exception('Sending %s task reminders failed, retrying on the next tick', len(due))
+            return sent
+        TaskReminder.objects.using(using).filter(pk__in=[reminder.pk for reminder in due]).update(
+            sent_at=timezone.now(),
+        )
+        sent += len(due)
+
+
+def prune_reminders(now=None):
+    """
+    Delete reminders sent more than TASK_REMINDER_RETENTION_DAYS ago;
+    returns the count
+    """
+    if now is None:
+        now = timezone.now()
+    deleted = 0
+    for shard in get_shards():
+        count, _ = TaskReminder.objects.using(shard).filter(sent_at__lt=now - get_reminder_retention()).delete()
+        deleted += count
+    return deleted
+
+
+def run_scheduler(notifier=None, today=None):
+    """
+    One scheduler tick over every database holding tasks; returns the
+    numbers of overdue tasks found and of reminders sent
+    """
+    if notifier is None:
+        notifier = get_notifier()
+    found = sent = 0
+    for shard in get_shards():
+        found += queue_reminders(shard, today)
+        sent += send_reminders(shard, notifier, today)
+    return found, sent
@@ -0,0 +1,199 @@
+"""
+Database routing of task queries: shards and read replicas.
+
+``ShardRouter`` sends task queries to the shard of the task's owner, or of
+the requesting user (see ``tasks.sharding``); install it first. Replicas
+serve the default database only.
+
+``ReplicaRouter`` sends reads of owner-scoped task data made while serving
+a request to one of ``TASK_READ_REPLICAS``; writes, everything else (users,
+sessions) and work outside requests (commands, workers) use the primary.
+Replicas lag behind the primary, so a user who modified their tasks within
+the last ``TASK_REPLICA_STICKY_SECONDS`` reads from the primary: the
+last-write time is the one kept for conditional GETs (``tasks.cache``), so
+it is shared by all workers through the cache. A request also switches to
+the primary once it writes, and inside transactions.
+
+``DatabaseRoutingMiddleware`` makes the current request visible to the
+routers; install it after AuthenticationMiddleware.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache import get_user_last_modified
+from .sharding import get_owner_shard, get_shards, is_sharded
+
+# Models whose rows belong to one user, and whose freshness for that user
+# is tracked by the last-write time
+ROUTED_MODELS = {
+    'tasks.task', 'tasks.tasktombstone', 'tasks.taskreminder', 'tasks.usertaskcounters', 'tasks.usertaskduecount',
+}
+
+_current_request = ContextVar('task_routing_request', default=None)
+
+
+def is_primary(alias):
+    """
+    Whether ``alias`` connects to the primary database itself, as replicas
+    do in test runs (TEST MIRROR)
+    """
+    primary = connections[DEFAULT_DB_ALIAS].settings_dict
+    database = connections[alias].settings_dict
+    return all(database[key] == primary[key] for key in ('ENGINE', 'NAME', 'HOST', 'PORT'))
+
+
+def get_read_replicas():
+    # Reading a mirror through its own connection would miss the rows of
+    # the current transaction (e.g. a test's)
+    return [alias for alias in getattr(settings, 'TASK_READ_REPLICAS', []) if not is_primary(alias)]
+
+
+def get_sticky_seconds():
+    return getattr(settings, 'TASK_REPLICA_STICKY_SECONDS', 5)
+
+
+class RequestRouting:
+    """
+    Where the current request reads task data from
+    """
+
+    def __init__(self, request, replicas):
+        self.request = request
+        self.wrote = False
+        self.recently_wrote = None
+        # One replica per request, so its reads are consistent
+        self.replica = random.choice(replicas) if replicas else None
+
+    def get_user_id(self):
+        user = getattr(self.request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return None
+        return user.pk
+
+    def use_primary(self):
+        if self.wrote:
+            return True
+        if self.recently_wrote is None:
+            # Decided on the first task read, once the user is authenticated
+            user_id = self.get_user_id()
+            if user_id is None:
+                return False
+            self.recently_wrote = time.time() - get_user_last_modified(user_id) < get_sticky_seconds()
+        return self.recently_wrote
+
+
+def in_transaction():
+    # TestCase runs every test in transactions of its own, which don't count
+    # (the same test Atomic uses for durable blocks)
+    return any(not block._from_testcase for block in connections[DEFAULT_DB_ALIAS].atomic_blocks)
+
+
+class ShardRouter:
+    """
+    Route task queries to the shard of the task's owner or the requesting user
+    """
+
+    def db_for_read(self, model, **hints):
+        return self.db_for_owner(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_owner(model, hints)
+
+    def db_for_owner(self, model, hints):
+        if not is_sharded():
+            return None
+        instance = hints.get('instance')
+        if model._meta.label_lower not in ROUTED_MODELS:
+            # The owner of a task read from a shard (task.owner), or anything
+            # else related to it, is in the default database
+            if instance is not None and instance._state.db in get_shards():
+                return DEFAULT_DB_ALIAS
+            return None
+
+        if instance is not None and instance._meta.label_lower in ROUTED_MODELS:
+            owner_id = instance.owner_id
+        elif instance is not None and isinstance(instance, model._meta.get_field('owner').related_model):
+            # Related manager: user.task_set
+            owner_id = instance.pk
+        else:
+            routing = _current_request.get()
+            owner_id = routing.get_user_id() if routing is not None else None
+        if owner_id is None:
+            return None
+        shard = get_owner_shard(owner_id)
+        # Left to ReplicaRouter
+        return None if shard == DEFAULT_DB_ALIAS else shard
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not is_sharded():
+            return None
+        databases = set(get_shards())
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRouter:
+    """
+    Route task reads to a replica, unless the user needs to read their writes
+    """
+
+    def db_for_read(self, model, **hints):
+        reads = _current_request.get()
+        if reads is None or reads.replica is None or model._meta.label_lower not in ROUTED_MODELS:
+            return None
+        if in_transaction() or reads.use_primary():
+            return DEFAULT_DB_ALIAS
+        return reads.replica
+
+    def db_for_write(self, model, **hints):
+        reads = _current_request.get()
+        if reads is not None:
+            reads.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_read_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Let the routers route the queries of the current request
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        replicas = get_read_replicas()
+        if not replicas and not is_sharded():
+            return self.get_response(request)
+        token = _current_request.set(RequestRouting(request, replicas))
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+    async def __acall__(self, request):
+        replicas = get_read_replicas()
+        if not replicas and not is_sharded():
+            return await self.get_response(request)
+        token = _current_request.set(RequestRouting(request, replicas))
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_request.reset(token)
@@ -0,0 +1,177 @@
+"""
+Full-text search over task titles and descriptions.
+
+On SQLite the ``tasks_task_fts`` FTS5 table mirrors ``tasks_task`` through
+triggers; on PostgreSQL a GIN expression index over the same tsvector is
+used. Other databases (or SQLite builds without FTS5) fall back to
+``icontains`` matching.
+"""
+import re
+
+from django.db import connections, OperationalError
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Task
+
+# Annotation holding the relevance of a match; lower is more relevant.
+SEARCH_RANK = 'search_rank'
+
+TASK_TABLE = Task._meta.db_table
+FTS_TABLE = f'{TASK_TABLE}_fts'
+
+SQLITE_SEARCH_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='{TASK_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TASK_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TASK_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON {TASK_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+SQLITE_DROP_SEARCH_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+POSTGRES_DOCUMENT = (
+    f"to_tsvector('english', coalesce({TASK_TABLE}.title, '') || ' ' || coalesce({TASK_TABLE}.description, ''))"
+)
+POSTGRES_INDEX = f'{TASK_TABLE}_search_idx'
+
+# Databases (alias, name) on which the FTS5 table was found
+_fts_available = {}
+
+
+def install_search_index(apps, schema_editor):
+    """
+    Migration operation creating the full-text index for the current engine.
+
+    Safe to run again: SQLite table rebuilds performed by later migrations
+    drop the triggers, so those migrations re-run this to restore them.
+    """
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            for sql in SQLITE_SEARCH_SQL:
+                schema_editor.execute(sql)
+        except OperationalError:
+            # SQLite built without FTS5: searches fall back to icontains
+            return
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {POSTGRES_INDEX} ON {TASK_TABLE} USING GIN (({POSTGRES_DOCUMENT}))'
+        )
+    _fts_available.clear()
+
+
+def remove_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for sql in SQLITE_DROP_SEARCH_SQL:
+            schema_editor.execute(sql)
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {POSTGRES_INDEX}')
+    _fts_available.clear()
+
+
+def get_search_backend(using):
+    """
+    Return 'sqlite', 'postgresql' or None (no full-text index) for a database
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        key = (using, connection.settings_dict['NAME'])
+        if key not in _fts_available:
+            _fts_available[key] = FTS_TABLE in connection.introspection.table_names()
+        if _fts_available[key]:
+            return 'sqlite'
+    return None
+
+
+def search_terms(value):
+    """
+    Split a search string into word tokens
+    """
+    return re.findall(r'\w+', value or '')
+
+
+def is_searched(queryset):
+    """
+    Return whether ``search_tasks`` was already applied to ``queryset``
+    """
+    # Unmasked: .values() hides the rank without dropping the search
+    return SEARCH_RANK in queryset.query.annotations or SEARCH_RANK in queryset.query.extra
+
+
+def search_tasks(queryset, value):
+    """
+    Filter ``queryset`` to tasks matching ``value`` and add a SEARCH_RANK.
+
+    Every term must match the title or description; terms match word
+    prefixes, so "proj" finds "Project". Applying the same search twice
+    (e.g. from both TaskFilter and TaskSearchFilter) is a no-op.
+    """
+    if not value or is_searched(queryset):
+        return queryset
+
+    terms = search_terms(value)
+    backend = get_search_backend(queryset.db)
+    if not terms or backend is None:
+        return queryset.filter(
+            Q(title__icontains=value) |
+            Q(description__icontains=value)
+        ).annotate(**{SEARCH_RANK: Value(0.0, output_field=FloatField())})
+
+    if backend == 'sqlite':
+        match = ' '.join('"%s"*' % term for term in terms)
+        # Join the FTS table so bm25() is computed in the same pass as the
+        # match. The unary + stops SQLite from probing the FTS table once
+        # per owner row, so the MATCH always drives the join.
+        # bm25() is negative, more relevant matches are smaller; titles weigh more.
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{TASK_TABLE}.id = +{FTS_TABLE}.rowid', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            select={SEARCH_RANK: f'bm25({FTS_TABLE}, 10.0, 1.0)'},
+        )
+
+    query = ' & '.join('%s:*' % term for term in terms)
+    matches = RawSQL(
+        f"{POSTGRES_DOCUMENT} @@ to_tsquery('english', %s)",
+        [query],
+        output_field=BooleanField(),
+    )
+    # ts_rank() grows with relevance, negate it to sort ascending
+    rank = RawSQL(
+        f"-ts_rank({POSTGRES_DOCUMENT}, to_tsquery('english', %s))",
+        [query],
+        output_field=FloatField(),
+    )
+    return queryset.filter(matches).annotate(**{SEARCH_RANK: rank})
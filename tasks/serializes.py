@@ -1,7 +1,250 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Task
+from rest_framework.reverse import reverse
+from .metrics import time_serializer
+from .models import Job, Task
+from .sharding import get_owner_shard
+from .signals import tasks_bulk_changed
+
+
+# Serializer fields whose representation of a database value is the value
+PASSTHROUGH_FIELDS = (serializers.BooleanField, serializers.CharField, serializers.IntegerField)
+
+
+def strict_int(value):
+    """
+    Return a number sent in a request body (an id) as an integer, or None
+    if it is neither an integer nor a string of digits: ``true`` and
+    ``1.9`` are not ids, although int() takes them
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        return int(value)
+    return None
+
+
+class RowReader:
+    """
+    Fast read path: a serializer's representation built from ``.values()``
+    rows instead of model instances.
+
+    ModelSerializer runs its per-field machinery (attribute lookup, None
+    check, to_representation) for every field of every row, which costs
+    more than the query for long lists. Rows already hold the column
+    values: only the fields whose representation differs from the value
+    (dates) are converted, with the serializer field's own method, so the
+    result is identical to the serializer's.
+    """
+
+    def __init__(self, columns, converters):
+        # (name, column) of every field, in output order
+        self.columns = columns
+        # (name, to_representation) of the fields to convert
+        self.converters = converters
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """
+        Return a reader for ``serializer``, or None when one of its fields
+        is not a plain column of the model (relations, methods, dotted sources)
+        """
+        model = serializer.Meta.model
+        columns, converters = [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if model_field.is_relation or not model_field.concrete:
+                return None
+            columns.append((name, field.source))
+            if type(field) not in PASSTHROUGH_FIELDS:
+                converters.append((name, field.to_representation))
+        return cls(columns, converters)
+
+    def values(self):
+        """
+        The columns to pass to ``.values()`` (or ``.only()``)
+        """
+        return [column for _, column in self.columns]
+
+    def represent(self, rows):
+        with time_serializer():
+            results = []
+            for row in rows:
+                item = {name: row[column] for name, column in self.columns}
+                for name, to_representation in self.converters:
+                    # The serializer doesn't convert None either
+                    if item[name] is not None:
+                        item[name] = to_representation(item[name])
+                results.append(item)
+            return results
+
+    def represent_columns(self, rows):
+        """
+        The representation of ``rows`` as one list of values per field
+        """
+        rows = list(rows)
+        with time_serializer():
+            columns = {name: [row[column] for row in rows] for name, column in self.columns}
+            for name, to_representation in self.converters:
+                columns[name] = [None if value is None else to_representation(value) for value in columns[name]]
+            return columns
+
+
+class TaskListSerializer(serializers.ListSerializer):
+    """
+    Validates a list of tasks and writes it with one bulk query.
+
+    For bulk updates ``instance`` is the list of targeted tasks and every
+    item must carry the ``id`` of one of them.
+    """
+    bulk_batch_size = 500
+
+    @property
+    def data(self):
+        with time_serializer():
+            return super().data
+
+    def to_internal_value(self, data):
+        self._seen_ids = set()
+        self._tasks_by_id = {task.pk: task for task in self.instance or []}
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+
+        task = self.get_instance(data)
+        self.child.instance = task
+        self.child.initial_data = data
+        try:
+            validated = super().run_child_validation(data)
+        finally:
+            self.child.instance = None
+        validated['id'] = task.pk
+        return validated
+
+    def get_instance(self, data):
+        """
+        Return the targeted task for one item of a bulk update
+        """
+        if not isinstance(data, dict):
+            # Let the child serializer report the invalid item
+            return None
+        pk = strict_int(data.get('id'))
+        if pk is None:
+            raise serializers.ValidationError({'id': ['A valid task id is required.']})
+
+        if pk in self._seen_ids:
+            raise serializers.ValidationError({'id': ['Duplicate task id.']})
+        self._seen_ids.add(pk)
+
+        if pk not in self._tasks_by_id:
+            raise serializers.ValidationError({'id': ['Task not found.']})
+        return self._tasks_by_id[pk]
+
+    def create(self, validated_data):
+        tasks = [Task(**attrs) for attrs in validated_data]
+        tasks = Task.objects.db_manager(self.get_shard(tasks)).bulk_create(tasks, batch_size=self.bulk_batch_size)
+        self.send_bulk_changed(tasks)
+        return tasks
+
+    def update(self, instance, validated_data):
+        tasks_by_id = {task.pk: task for task in instance}
+        tasks = []
+        fields = set()
+        for attrs in validated_data:
+            task = tasks_by_id[attrs.pop('id')]
+            for attr, value in attrs.items():
+                setattr(task, attr, value)
+            fields.update(attrs)
+            tasks.append(task)
+
+        if fields:
+            # bulk_update() doesn't maintain auto_now fields
+            now = timezone.now()
+            for task in tasks:
+                task.updated_at = now
+            fields.add('updated_at')
+            Task.objects.db_manager(self.get_shard(tasks)).bulk_update(tasks, sorted(fields), batch_size=self.bulk_batch_size)
+            self.send_bulk_changed(tasks)
+        return tasks
+
+    def get_shard(self, tasks):
+        # Bulk requests only target the requesting user's tasks
+        return get_owner_shard(tasks[0].owner_id) if tasks else DEFAULT_DB_ALIAS
+
+    def send_bulk_changed(self, tasks):
+        # bulk_create/bulk_update don't send post_save
+        tasks_bulk_changed.send(sender=Task, owner_ids={task.owner_id for task in tasks})
+
 
 class TaskSerializer(serializers.ModelSerializer):
+    """
+    ``fields`` narrows the output to these field names (sparse fieldsets);
+    check them with ``validate_field_names`` first.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @property
+    def data(self):
+        with time_serializer():
+            return super().data
+
+    @classmethod
+    def validate_field_names(cls, names):
+        """
+        Return the known field names among ``names``, in output order, or
+        raise a ValidationError naming the unknown ones
+        """
+        known = list(cls().fields)
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(known)}."
+            )
+        return [name for name in known if name in names]
+
+    @classmethod
+    def get_row_reader(cls, fields=None):
+        """
+        RowReader producing the same representation as this serializer
+        """
+        return RowReader.for_serializer(cls(fields=fields))
+
     class Meta:
         model = Task
-        fields = ['id', 'title', 'description', 'due_date', 'completed']
\ No newline at end of file
+        fields = ['id', 'title', 'description', 'due_date', 'completed']
+        list_serializer_class = TaskListSerializer
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Status of a background job; finished exports link to their file
+    """
+    url = serializers.HyperlinkedIdentityField(view_name='job-detail')
+    download_url = serializers.SerializerMethodField()
+
+    def get_download_url(self, job):
+        if job.kind != 'export' or job.status != Job.Status.SUCCEEDED:
+            return None
+        return reverse('job-download', kwargs={'pk': job.pk}, request=self.context.get('request'))
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'url', 'kind', 'status', 'progress', 'result', 'error', 'attempts',
+            'created_at', 'started_at', 'finished_at', 'download_url',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,160 @@
+"""
+Horizontal sharding of tasks by owner.
+
+``TASK_SHARDS`` lists the databases holding tasks, ``default`` first
+(``DATABASE_SHARD_URLS`` adds ``shard_1``, ``shard_2``...; only ever append
+to the list). All of a user's tasks and tombstones live in one shard,
+recorded in the ``UserShard`` directory of the default database, which
+keeps users, sessions and everything else. New users are spread over the
+shards by id; users created before sharding was enabled stay on
+``default``. Lookups are cached in the task cache, which must be shared by
+all workers, as for the conditional GET validators.
+
+``ShardRouter`` (see ``tasks.routers``) routes task queries by the owner of
+the instance or the requesting user. Code running outside requests picks
+the shard itself, with ``Task.objects.for_owner(user)``. Queries spanning
+users, such as the admin's, only see one shard.
+
+Each shard allocates task ids from its own range of ``SHARD_ID_RANGE`` ids,
+so ids stay unique across shards. ``move_owner_tasks`` (the
+``rebalance_shards`` command) moves a user to another shard.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .cache import get_cache, get_cache_timeout
+from .models import Task, TaskReminder, TaskTombstone, UserShard, UserTaskCounters, UserTaskDueCount
+
+SHARD_ID_RANGE = 2 ** 40
+
+
+def get_shards():
+    return getattr(settings, 'TASK_SHARDS', [DEFAULT_DB_ALIAS])
+
+
+def is_sharded():
+    return len(get_shards()) > 1
+
+
+def shard_key(user_id):
+    return f'tasks:user:{user_id}:shard'
+
+
+def get_owner_shard(user_id):
+    """
+    Return the alias of the database holding ``user_id``'s tasks
+    """
+    if not is_sharded():
+        return DEFAULT_DB_ALIAS
+    cache = get_cache()
+    shard = cache.get(shard_key(user_id))
+    if shard is None:
+        shard = (
+            UserShard.objects.using(DEFAULT_DB_ALIAS)
+            .filter(user_id=user_id).values_list('shard', flat=True).first()
+        ) or DEFAULT_DB_ALIAS
+        cache.set(shard_key(user_id), shard, get_cache_timeout())
+    return shard
+
+
+def assign_shard(user):
+    """
+    Record the shard of a new user
+    """
+    shards = get_shards()
+    shard = shards[user.pk % len(shards)]
+    UserShard.objects.using(DEFAULT_DB_ALIAS).create(user=user, shard=shard)
+    # Ids can be reused after a rollback: replace what an old user left
+    get_cache().set(shard_key(user.pk), shard, get_cache_timeout())
+    return shard
+
+
+def reserve_id_range(shard):
+    """
+    Make ``shard`` allocate task ids from its own range
+    """
+    start = get_shards().index(shard) * SHARD_ID_RANGE
+    if not start:
+        return
+    connection = connections[shard]
+    table = Task._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # AUTOINCREMENT continues after the largest id in sqlite_sequence
+            cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, start])
+            elif row[0] < start:
+                cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [start, table])
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+            sequence = cursor.fetchone()[0]
+            cursor.execute(f'SELECT last_value FROM {sequence}')
+            if cursor.fetchone()[0] < start:
+                cursor.execute('SELECT setval(%s, %s)', [sequence, start])
+
+
+def move_owner_tasks(user, shard):
+    """
+    Move ``user``'s tasks, tombstones and queued reminders to ``shard``;
+    returns the number of tasks moved.
+
+    Tasks get new ids from their new shard (ids are unique per shard range):
+    their old ids are recorded as deleted, so sync clients drop them, and
+    the tasks sync again as updated. Writes made to the old shard while the
+    move runs are lost, so move users while they are idle.
+    """
+    # Not at module level: tasks.signals imports this module
+    from .signals import tasks_bulk_changed
+
+    if shard not in get_shards():
+        raise ValueError(f'Unknown shard {shard!r}, expected one of TASK_SHARDS')
+    source = get_owner_shard(user.pk)
+    if source == shard:
+        return 0
+
+    fields = [field.attname for field in Task._meta.concrete_fields if not field.primary_key]
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), transaction.atomic(using=source), transaction.atomic(using=shard):
+        old_tasks = list(Task.objects.using(source).select_for_update().filter(owner=user).order_by('id'))
+        tombstones = list(TaskTombstone.objects.using(source).filter(owner=user).order_by('id'))
+        reminders = list(TaskReminder.objects.using(source).filter(owner=user, sent_at__isnull=True).order_by('id'))
+
+        tasks = Task.objects.using(shard).bulk_create([
+            Task(**{name: getattr(task, name) for name in fields}) for task in old_tasks
+        ])
+        # bulk_create() stamps auto_now_add fields
+        now = timezone.now()
+        for task, old_task in zip(tasks, old_tasks):
+            task.created_at, task.updated_at = old_task.created_at, now
+        moved = TaskTombstone.objects.using(shard).bulk_create([
+            TaskTombstone(task_id=tombstone.task_id, owner=user) for tombstone in tombstones
+        ] + [
+            TaskTombstone(task_id=task.pk, owner=user) for task in old_tasks
+        ])
+        for tombstone, old_tombstone in zip(moved, tombstones):
+            tombstone.deleted_at = old_tombstone.deleted_at
+        # Queued reminders follow their tasks' new ids
+        new_ids = {old_task.pk: task.pk for old_task, task in zip(old_tasks, tasks)}
+        TaskReminder.objects.using(shard).bulk_create([
+            TaskReminder(task_id=new_ids[reminder.task_id], owner=user, title=reminder.title, due_date=reminder.due_date)
+            for reminder in reminders if reminder.task_id in new_ids
+        ])
+        if tasks:
+            Task.objects.using(shard).bulk_update(tasks, ['created_at', 'updated_at'])
+        if tombstones:
+            TaskTombstone.objects.using(shard).bulk_update(moved[:len(tombstones)], ['deleted_at'])
+
+        # Without signals: the tasks moved, they were not deleted
+        Task.objects.using(source).filter(owner=user)._raw_delete(source)
+        TaskTombstone.objects.using(source).filter(owner=user).delete()
+        TaskReminder.objects.using(source).filter(owner=user).delete()
+        # bulk_create() counted the tasks in the new shard
+        UserTaskCounters.objects.using(source).filter(owner=user).delete()
+        UserTaskDueCount.objects.using(source).filter(owner=user).delete()
+        UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(user=user, defaults={'shard': shard})
+
+    get_cache().delete(shard_key(user.pk))
+    tasks_bulk_changed.send(sender=Task, owner_ids=[user.pk])
+    return len(tasks)
@@ -0,0 +1,138 @@
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from .cache import invalidate_user, reset_user_version
+from .counters import COUNTED_FIELDS, CounterChanges
+from .events import RESYNC, publish_task_event
+from .models import Task, TaskQuerySet, TaskReminder, TaskTombstone, UserTaskCounters, UserTaskDueCount
+from .sharding import assign_shard, get_owner_shard, get_shards, is_sharded, reserve_id_range
+
+# Sent after bulk writes that bypass post_save/post_delete (bulk_create,
+# bulk_update). ``owner_ids`` lists the users whose tasks changed.
+tasks_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_cache(sender, instance, **kwargs):
+    invalidate_user(instance.owner_id)
+
+
+def is_bulk_delete(origin):
+    # Deleting the owner removes their tombstones and counters too.
+    # TaskQuerySet.delete() records its tombstones and counts in bulk.
+    return isinstance(origin, (User, TaskQuerySet)) or getattr(origin, 'model', None) is User
+
+
+@receiver(post_delete, sender=Task)
+def record_task_tombstone(sender, instance, origin=None, **kwargs):
+    if is_bulk_delete(origin):
+        return
+    TaskTombstone.objects.using(instance._state.db).create(task_id=instance.pk, owner_id=instance.owner_id)
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def invalidate_bulk_task_cache(sender, owner_ids, **kwargs):
+    for owner_id in owner_ids:
+        invalidate_user(owner_id)
+
+
+@receiver(pre_save, sender=Task)
+@receiver(pre_delete, sender=Task)
+def load_counted_task(sender, instance, raw=False, origin=None, **kwargs):
+    # Tasks read with deferred fields or built with the id of a stored
+    # task don't know what the counters count them as
+    if raw or is_bulk_delete(origin) or instance._counted is not None or instance.pk is None:
+        return
+    counted = (
+        Task._base_manager.using(kwargs.get('using') or instance._state.db)
+        .filter(pk=instance.pk).values_list(*COUNTED_FIELDS).first()
+    )
+    instance._counted = counted and tuple(counted)
+
+
+@receiver(post_save, sender=Task)
+def count_saved_task(sender, instance, created, raw, update_fields, using, **kwargs):
+    if raw:
+        return
+    changes = CounterChanges()
+    counted = None if created else instance._counted
+    if counted is None:
+        changes.add(*instance.get_counted_values())
+    else:
+        # Deferred fields and those left out of update_fields were not saved
+        saved = {name for name in COUNTED_FIELDS if name not in instance.get_deferred_fields()}
+        if update_fields is not None:
+            saved &= {Task._meta.get_field(name).attname for name in update_fields}
+        changes.remove(*counted)
+        changes.add(*(
+            getattr(instance, name) if name in saved else value for name, value in zip(COUNTED_FIELDS, counted)
+        ))
+    changes.save(using)
+    instance.remember_counted_values()
+
+
+@receiver(post_delete, sender=Task)
+def count_deleted_task(sender, instance, origin=None, using=None, **kwargs):
+    if is_bulk_delete(origin) or instance._counted is None:
+        return
+    changes = CounterChanges()
+    changes.remove(*instance._counted)
+    changes.save(using)
+    instance._counted = None
+
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, **kwargs):
+    from .serializes import TaskSerializer
+
+    event_type = 'created' if created else 'updated'
+    transaction.on_commit(lambda: publish_task_event(
+        instance.owner_id, event_type, lambda: TaskSerializer(instance).data,
+    ))
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_deleted(sender, instance, **kwargs):
+    owner_id, data = instance.owner_id, {'id': instance.pk}
+    transaction.on_commit(lambda: publish_task_event(owner_id, 'deleted', data))
+
+
+@receiver(tasks_bulk_changed, sender=Task)
+def publish_bulk_task_change(sender, owner_ids, **kwargs):
+    # Bulk writes don't say which tasks changed; clients refetch instead
+    for owner_id in owner_ids:
+        transaction.on_commit(lambda owner_id=owner_id: publish_task_event(owner_id, RESYNC, {}))
+
+
+@receiver(post_save, sender=User)
+def reset_new_user_cache(sender, instance, created, **kwargs):
+    # Database ids can be reused (e.g. after a rollback), never serve a new
+    # user entries cached for an old one
+    if created:
+        reset_user_version(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def assign_new_user_shard(sender, instance, created, **kwargs):
+    if created and is_sharded():
+        assign_shard(instance)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_tasks(sender, instance, **kwargs):
+    # The cascade only reaches the default database. Deleted like the
+    # cascade does: with signals, but without tombstones.
+    shard = get_owner_shard(instance.pk)
+    if shard != DEFAULT_DB_ALIAS:
+        models.QuerySet.delete(Task.objects.using(shard).filter(owner=instance))
+        for model in (TaskTombstone, TaskReminder, UserTaskCounters, UserTaskDueCount):
+            model.objects.using(shard).filter(owner=instance).delete()
+
+
+def reserve_shard_id_range(sender, using, **kwargs):
+    # Connected to post_migrate for this app in TasksConfig.ready()
+    if using in get_shards():
+        reserve_id_range(using)
@@ -0,0 +1,57 @@
+from django.utils import timezone
+
+from .cache import cached_for_user
+from .counters import get_counts
+
+
+class TaskStats:
+    """
+    Dashboard counters for a single user's tasks.
+
+    Read from the user's task counters (see ``tasks.counters``) in one
+    query, instead of counting their tasks.
+    """
+
+    def __init__(self, total=0, completed=0, incomplete=0, overdue=0):
+        self.total = total
+        self.completed = completed
+        self.incomplete = incomplete
+        self.overdue = overdue
+
+    @classmethod
+    def for_user(cls, user, today=None):
+        """
+        Stats for all tasks owned by ``user``, cached until their tasks change
+        """
+        if today is None:
+            today = timezone.now().date()
+        return cached_for_user(user, 'stats', (today,), lambda: cls.compute(user, today))
+
+    @classmethod
+    def compute(cls, user, today):
+        """
+        Stats for all tasks owned by ``user``, from their counters
+        """
+        counts = get_counts(user, today)
+        return cls(
+            total=counts['total'],
+            completed=counts['completed'],
+            incomplete=counts['total'] - counts['completed'],
+            overdue=counts['overdue'],
+        )
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'completed': self.completed,
+            'incomplete': self.incomplete,
+            'overdue': self.overdue,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, TaskStats):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return '<TaskStats total=%(total)s completed=%(completed)s incomplete=%(incomplete)s overdue=%(overdue)s>' % self.as_dict()
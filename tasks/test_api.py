@@ -99,6 +99,25 @@ class TaskAPITest(APITestCase):
         response = self.client.get(f'/api/tasks/{other_task.pk}/')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_api_task_stats(self):
+        """Test the stats action returns the user's dashboard counters"""
+        Task.objects.create(
+            title='Overdue API Task',
+            due_date=date.today() - timedelta(days=1),
+            owner=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/tasks/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'total': 2, 'completed': 0, 'incomplete': 2, 'overdue': 1,
+        })
+
+    def test_api_task_stats_requires_authentication(self):
+        """Test the stats action requires authentication"""
+        response = self.client.get('/api/tasks/stats/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
 
 class TaskAPIFilteringTest(APITestCase):
     """Test cases for API filtering and search"""
@@ -163,3 +182,254 @@ class TaskAPIFilteringTest(APITestCase):
         response = self.client.get('/api/tasks/', {'ordering': 'due_date'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 3)
+
+
+class TaskAPICursorPaginationTest(APITestCase):
+    """Test cases for keyset (cursor) pagination on the API"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        # Three tasks share each due date so pages split ties
+        Task.objects.bulk_create([
+            Task(
+                title=f'Task {i:02d}',
+                due_date=date.today() + timedelta(days=i // 3),
+                owner=self.user
+            )
+            for i in range(45)
+        ])
+        self.client.force_authenticate(user=self.user)
+
+    def collect_pages(self, params):
+        """Follow next links and return all titles and the page count"""
+        titles = []
+        pages = 0
+        response = self.client.get('/api/tasks/', params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles.extend(task['title'] for task in response.data['results'])
+            pages += 1
+            if not response.data['next']:
+                return titles, pages
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_mode_response_shape(self):
+        """Test cursor pages have no count and a next link"""
+        response = self.client.get('/api/tasks/', {'pagination': 'cursor'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIn('cursor=', response.data['next'])
+
+    def test_cursor_walks_all_tasks_once(self):
+        """Test following cursors visits every task exactly once in order"""
+        titles, pages = self.collect_pages({'pagination': 'cursor'})
+        self.assertEqual(pages, 3)
+        self.assertEqual(titles, [f'Task {i:02d}' for i in range(45)])
+
+    def test_cursor_descending_ordering(self):
+        """Test cursor pagination honours descending due date ordering"""
+        titles, _ = self.collect_pages({'pagination': 'cursor', 'ordering': '-due_date'})
+        self.assertEqual(len(titles), 45)
+        self.assertEqual(len(set(titles)), 45)
+        self.assertEqual(titles[:3], ['Task 44', 'Task 43', 'Task 42'])
+
+    def test_cursor_title_ordering(self):
+        """Test cursor pagination honours title ordering"""
+        titles, _ = self.collect_pages({'pagination': 'cursor', 'ordering': '-title'})
+        self.assertEqual(titles, sorted(titles, reverse=True))
+
+    def test_cursor_with_filters(self):
+        """Test cursor pagination combines with TaskFilter parameters"""
+        Task.objects.filter(title__in=['Task 00', 'Task 01']).update(completed=True)
+        titles, _ = self.collect_pages({'pagination': 'cursor', 'completed': 'true'})
+        self.assertEqual(titles, ['Task 00', 'Task 01'])
+
+    def test_cursor_skips_count_query(self):
+        """Test a cursor page runs a single query for the rows"""
+        with self.assertNumQueries(1):
+            self.client.get('/api/tasks/', {'pagination': 'cursor'})
+
+    def test_cursor_rejects_search_without_ordering(self):
+        """Test searches ranked by relevance are not cursor paginated, as pages would lose that order"""
+        for params in ({'pagination': 'cursor'}, {'cursor': 'abc'}):
+            response = self.client.get('/api/tasks/', {**params, 'search': 'task'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('search', response.data)
+        response = self.client.get('/api/tasks/', {'pagination': 'cursor', 'search': ''})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cursor_search_with_ordering(self):
+        """Test searches with an explicit ordering are cursor paginated in that order"""
+        Task.objects.create(title='Unrelated', due_date=date.today(), owner=self.user)
+        params = {'search': 'task', 'ordering': '-title'}
+        titles, pages = self.collect_pages({**params, 'pagination': 'cursor'})
+        self.assertEqual(pages, 3)
+        self.assertEqual(titles, [f'Task {i:02d}' for i in range(44, -1, -1)])
+        first_page = self.client.get('/api/tasks/', params).data['results']
+        self.assertEqual([task['title'] for task in first_page], titles[:20])
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor returns 404"""
+        response = self.client.get('/api/tasks/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_mode_is_default(self):
+        """Test page number pagination remains the default"""
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.data['count'], 45)
+
+
+class TaskAPIBulkTest(APITestCase):
+    """Test cases for the bulk create/update/delete endpoint"""
+
+    url = '/api/tasks/bulk/'
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            password='otherpass123'
+        )
+        self.task1 = Task.objects.create(title='First', due_date=date.today(), owner=self.user)
+        self.task2 = Task.objects.create(title='Second', due_date=date.today(), owner=self.user)
+        self.other_task = Task.objects.create(title='Other', due_date=date.today(), owner=self.other_user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_requires_authentication(self):
+        """Test the bulk endpoint requires authentication"""
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_create(self):
+        """Test creating many tasks in one request"""
+        data = [
+            {'title': f'Bulk {i}', 'due_date': str(date.today() + timedelta(days=i))}
+            for i in range(50)
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 50)
+        self.assertTrue(all(task['id'] for task in response.data))
+        self.assertEqual(Task.objects.filter(owner=self.user, title__startswith='Bulk').count(), 50)
+
+    def test_bulk_create_single_insert(self):
+        """Test bulk create writes with one INSERT"""
+        data = [{'title': f'Bulk {i}', 'due_date': str(date.today())} for i in range(20)]
+        with self.assertNumQueries(5):  # savepoint, INSERT, counters (2), release
+            self.client.post(self.url, data, format='json')
+
+    def test_bulk_create_reports_item_errors(self):
+        """Test invalid items are reported per item and nothing is written"""
+        data = [
+            {'title': 'Valid', 'due_date': str(date.today())},
+            {'title': '', 'due_date': 'not-a-date'},
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('title', response.data[1])
+        self.assertIn('due_date', response.data[1])
+        self.assertFalse(Task.objects.filter(title='Valid').exists())
+
+    def test_bulk_create_rejects_non_list(self):
+        """Test the bulk payload must be a list"""
+        response = self.client.post(self.url, {'title': 'Single'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_limit(self):
+        """Test requests above the batch limit are rejected"""
+        data = [{'title': 'Too many', 'due_date': str(date.today())}] * 1001
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Task.objects.filter(title='Too many').exists())
+
+    def test_bulk_update(self):
+        """Test partially updating many tasks in one request"""
+        data = [
+            {'id': self.task1.pk, 'completed': True},
+            {'id': self.task2.pk, 'title': 'Second renamed'},
+        ]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.task1.refresh_from_db()
+        self.task2.refresh_from_db()
+        self.assertTrue(self.task1.completed)
+        self.assertEqual(self.task1.title, 'First')
+        self.assertEqual(self.task2.title, 'Second renamed')
+        self.assertEqual([task['id'] for task in response.data], [self.task1.pk, self.task2.pk])
+
+    def test_bulk_update_other_users_task(self):
+        """Test other users' tasks cannot be updated and nothing is written"""
+        data = [
+            {'id': self.task1.pk, 'completed': True},
+            {'id': self.other_task.pk, 'completed': True},
+        ]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('id', response.data[1])
+        self.task1.refresh_from_db()
+        self.other_task.refresh_from_db()
+        self.assertFalse(self.task1.completed)
+        self.assertFalse(self.other_task.completed)
+
+    def test_bulk_update_missing_and_duplicate_ids(self):
+        """Test items without an id or with a repeated id are rejected"""
+        data = [
+            {'completed': True},
+            {'id': self.task1.pk, 'completed': True},
+            {'id': self.task1.pk, 'completed': False},
+        ]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', response.data[0])
+        self.assertEqual(response.data[1], {})
+        self.assertIn('id', response.data[2])
+
+    def test_bulk_delete(self):
+        """Test deleting many tasks in one request"""
+        response = self.client.delete(self.url, {'ids': [self.task1.pk, self.task2.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Task.objects.filter(owner=self.user).exists())
+
+    def test_bulk_delete_other_users_task(self):
+        """Test other users' tasks cannot be deleted and nothing is deleted"""
+        response = self.client.delete(self.url, {'ids': [self.task1.pk, self.other_task.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['ids'][0], {})
+        self.assertIn('id', response.data['ids'][1])
+        self.assertTrue(Task.objects.filter(pk=self.task1.pk).exists())
+        self.assertTrue(Task.objects.filter(pk=self.other_task.pk).exists())
+
+    def test_bulk_ids_must_be_integers(self):
+        """Test booleans and fractional numbers are rejected as ids, where int() would take them"""
+        Task.objects.filter(pk=1).delete()
+        task = Task.objects.create(pk=1, title='Task one', due_date=date.today(), owner=self.user)
+        for ids in ([True], [1.9], ['1.0'], [' 1']):
+            response = self.client.delete(self.url, {'ids': ids}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data['ids'][0], {'id': ['A valid task id is required.']})
+        response = self.client.patch(self.url, [{'id': True, 'completed': True}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', response.data[0])
+        task.refresh_from_db()
+        self.assertFalse(task.completed)
+
+        response = self.client.delete(self.url, {'ids': ['1', self.task1.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Task.objects.filter(pk__in=[1, self.task1.pk]).exists())
+
+    def test_bulk_delete_requires_ids(self):
+        """Test bulk delete requires a list of ids"""
+        response = self.client.delete(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
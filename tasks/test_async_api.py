@@ -0,0 +1,237 @@
+import asyncio
+import json
+from datetime import date, timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import AsyncRequestFactory, TestCase, override_settings
+
+from .async_views import AsyncTaskDetailView
+from .models import Task, TaskTombstone
+from .querybudget import QueryBudgetTestMixin
+from .serializes import TaskSerializer
+
+# Query budgets are checked without the cache, and enforced
+uncached = override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    TASK_QUERY_BUDGET_RAISE=True,
+)
+
+
+@uncached
+class TaskAsyncAPITest(QueryBudgetTestMixin, TestCase):
+    """Test cases for the ASGI-native task API"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other_user = User.objects.create_user(username='otheruser', password='testpass123')
+        self.tasks = Task.objects.bulk_create([
+            Task(
+                title=f'Async Task {i}',
+                description='Project notes' if i % 5 == 0 else 'Description',
+                due_date=date.today() + timedelta(days=i % 7),
+                completed=i % 2 == 0,
+                owner=self.user,
+            )
+            for i in range(25)
+        ])
+        self.task = self.tasks[0]
+        self.other_task = Task.objects.create(
+            title='Other Task', due_date=date.today(), owner=self.other_user
+        )
+
+    async def login(self):
+        await self.async_client.aforce_login(self.user)
+
+    async def expected_results(self, queryset):
+        return await sync_to_async(lambda: TaskSerializer(list(queryset), many=True).data)()
+
+    async def test_requires_authentication(self):
+        """Test that the async API rejects anonymous requests"""
+        response = await self.async_client.get('/api/async/tasks/')
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(f'/api/async/tasks/{self.task.pk}/')
+        self.assertEqual(response.status_code, 403)
+
+    async def test_list_matches_api_payload(self):
+        """Test the async list returns the same page as /api/tasks/"""
+        await self.login()
+        response = await self.async_client.get('/api/async/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+        data = response.json()
+        self.assertEqual(data['count'], 25)
+        self.assertIsNone(data['previous'])
+        self.assertEqual(data['next'], 'http://testserver/api/async/tasks/?page=2')
+        expected = await self.expected_results(
+            Task.objects.filter(owner=self.user).order_by('due_date', 'id')[:20]
+        )
+        self.assertEqual(data['results'], expected)
+
+        response = await self.async_client.get('/api/async/tasks/', {'page': 2})
+        data = response.json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['next'])
+        self.assertEqual(data['previous'], 'http://testserver/api/async/tasks/')
+
+    async def test_concurrent_requests_counted_separately(self):
+        """Test concurrent requests on one connection each count only their own queries"""
+        await self.login()
+        responses = await asyncio.gather(*[
+            self.async_client.get('/api/async/tasks/', {'page': page}) for page in (1, 2, 1, 2)
+        ])
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertWithinQueryBudget(response)
+            self.assertGreater(response.asgi_request.query_stats.count, 0)
+
+    async def test_list_invalid_page(self):
+        """Test that a page past the end returns 404"""
+        await self.login()
+        response = await self.async_client.get('/api/async/tasks/', {'page': 3})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_list_filters_and_ordering(self):
+        """Test the async list accepts the TaskFilter parameters"""
+        await self.login()
+        response = await self.async_client.get('/api/async/tasks/', {'completed': 'true', 'ordering': '-due_date'})
+        data = response.json()
+        self.assertEqual(data['count'], 13)
+        expected = await self.expected_results(
+            Task.objects.filter(owner=self.user, completed=True).order_by('-due_date', 'id')[:20]
+        )
+        self.assertEqual(data['results'], expected)
+
+        response = await self.async_client.get('/api/async/tasks/', {'due_date_from': 'not-a-date'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('due_date_from', response.json())
+
+    async def test_list_search(self):
+        """Test full-text search through the async list"""
+        await self.login()
+        response = await self.async_client.get('/api/async/tasks/', {'search': 'proj'})
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+        titles = {task['title'] for task in response.json()['results']}
+        self.assertEqual(titles, {f'Async Task {i}' for i in range(0, 25, 5)})
+
+    async def test_create(self):
+        """Test creating a task from a JSON body"""
+        await self.login()
+        response = await self.async_client.post(
+            '/api/async/tasks/',
+            json.dumps({'title': 'New Async Task', 'due_date': '2030-01-01'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertWithinQueryBudget(response)
+        task = await Task.objects.select_related('owner').aget(title='New Async Task')
+        self.assertEqual(task.owner, self.user)
+        self.assertEqual(response.json()['id'], task.pk)
+
+    async def test_create_form_encoded(self):
+        """Test creating a task from a form-encoded body"""
+        await self.login()
+        response = await self.async_client.post('/api/async/tasks/', {'title': 'Form Task', 'due_date': '2030-01-01'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Task.objects.filter(title='Form Task').aexists())
+
+    async def test_create_invalid(self):
+        """Test validation errors and malformed JSON return 400"""
+        await self.login()
+        response = await self.async_client.post(
+            '/api/async/tasks/', json.dumps({'title': 'No due date'}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('due_date', response.json())
+        for body in ('{', b'{"title": "\xff"}'):
+            response = await self.async_client.post('/api/async/tasks/', body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'detail': 'JSON parse error.'})
+
+    async def test_errors_not_reported_as_parse_errors(self):
+        """Test a ValueError raised past the body parsing is not answered as malformed JSON"""
+        await self.login()
+        with mock.patch.object(TaskSerializer, 'is_valid', side_effect=ValueError('Unexpected')):
+            with self.assertRaisesMessage(ValueError, 'Unexpected'):
+                await self.async_client.post(
+                    '/api/async/tasks/', json.dumps({'title': 'Task', 'due_date': '2030-01-01'}),
+                    content_type='application/json',
+                )
+
+    async def test_retrieve(self):
+        """Test retrieving a task"""
+        await self.login()
+        response = await self.async_client.get(f'/api/async/tasks/{self.task.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+        self.assertEqual(response.json(), (await self.expected_results([self.task]))[0])
+
+    async def test_other_users_task_not_found(self):
+        """Test that another user's task returns 404 for every method"""
+        await self.login()
+        url = f'/api/async/tasks/{self.other_task.pk}/'
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+        self.assertEqual((await self.async_client.patch(url, '{}', content_type='application/json')).status_code, 404)
+        self.assertEqual((await self.async_client.delete(url)).status_code, 404)
+        self.assertTrue(await Task.objects.filter(pk=self.other_task.pk).aexists())
+
+    async def test_update(self):
+        """Test full and partial updates"""
+        await self.login()
+        url = f'/api/async/tasks/{self.task.pk}/'
+        response = await self.async_client.put(
+            url, json.dumps({'title': 'Replaced', 'due_date': '2030-01-01', 'completed': True}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+        response = await self.async_client.patch(
+            url, json.dumps({'completed': False}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinQueryBudget(response)
+        task = await Task.objects.aget(pk=self.task.pk)
+        self.assertEqual(task.title, 'Replaced')
+        self.assertFalse(task.completed)
+        self.assertEqual(response.json()['title'], 'Replaced')
+
+    async def test_update_invalid(self):
+        """Test that a full update without required fields returns 400"""
+        await self.login()
+        response = await self.async_client.put(
+            f'/api/async/tasks/{self.task.pk}/', json.dumps({'title': 'Only title'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_delete(self):
+        """Test deleting a task records a tombstone for sync"""
+        await self.login()
+        response = await self.async_client.delete(f'/api/async/tasks/{self.task.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertWithinQueryBudget(response)
+        self.assertFalse(await Task.objects.filter(pk=self.task.pk).aexists())
+        self.assertTrue(await TaskTombstone.objects.filter(task_id=self.task.pk).aexists())
+
+    async def test_delete_response_has_no_body(self):
+        """Test the 204 of a delete has an empty body, like /api/tasks/"""
+        # Called without the test client, which empties 204 bodies itself
+        request = AsyncRequestFactory().delete(f'/api/async/tasks/{self.task.pk}/')
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        response = await AsyncTaskDetailView.as_view()(request, pk=self.task.pk)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.content, b'')
+
+    async def test_method_not_allowed(self):
+        """Test unsupported methods return 405"""
+        await self.login()
+        response = await self.async_client.delete('/api/async/tasks/')
+        self.assertEqual(response.status_code, 405)
+        self.assertIn('GET', response['Allow'])
@@ -0,0 +1,130 @@
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+from datetime import date, timedelta
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from .cache import get_user_version
+from .models import Task
+from .stats import TaskStats
+
+
+class TaskCacheTest(TestCase):
+    """Test cases for per-user caching and signal-driven invalidation"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.task = Task.objects.create(
+            title='Cached Task',
+            due_date=date.today() + timedelta(days=1),
+            owner=self.user
+        )
+
+    def test_stats_served_from_cache(self):
+        """Test repeated stats reads hit the cache"""
+        TaskStats.for_user(self.user)
+        with self.assertNumQueries(0):
+            stats = TaskStats.for_user(self.user)
+        self.assertEqual(stats.total, 1)
+
+    def test_save_invalidates_stats(self):
+        """Test saving a task makes the change visible immediately"""
+        TaskStats.for_user(self.user)
+        self.task.completed = True
+        self.task.save()
+        self.assertEqual(TaskStats.for_user(self.user).completed, 1)
+
+    def test_delete_invalidates_stats(self):
+        """Test deleting a task makes the change visible immediately"""
+        TaskStats.for_user(self.user)
+        self.task.delete()
+        self.assertEqual(TaskStats.for_user(self.user).total, 0)
+
+    def test_invalidation_is_per_user(self):
+        """Test writes only invalidate the owner's cache"""
+        other_user = User.objects.create_user(username='otheruser', password='otherpass123')
+        version = get_user_version(self.user.pk)
+        Task.objects.create(title='Other Task', due_date=date.today(), owner=other_user)
+        self.assertEqual(get_user_version(self.user.pk), version)
+
+    def test_new_user_gets_fresh_namespace(self):
+        """Test a new user never sees entries cached under a reused id"""
+        version = get_user_version(self.user.pk)
+        self.user.delete()
+        user = User.objects.create_user(pk=self.user.pk, username='newuser', password='newpass123')
+        self.assertNotEqual(get_user_version(user.pk), version)
+        self.assertEqual(TaskStats.for_user(user).total, 0)
+
+    def test_dashboard_page_served_from_cache(self):
+        """Test a repeated dashboard request only runs session/auth queries"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.get(reverse('task_list'))
+        with self.assertNumQueries(2):  # session, user
+            response = self.client.get(reverse('task_list'))
+        self.assertContains(response, 'Cached Task')
+        self.assertEqual(response.context['total_tasks'], 1)
+
+    def test_dashboard_sees_new_task(self):
+        """Test the dashboard shows a task created after it was cached"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.get(reverse('task_list'))
+        self.client.post(reverse('task_create'), {
+            'title': 'Fresh Task',
+            'description': '',
+            'due_date': date.today() + timedelta(days=2),
+        })
+        response = self.client.get(reverse('task_list'))
+        self.assertContains(response, 'Fresh Task')
+        self.assertEqual(response.context['total_tasks'], 2)
+
+
+class TaskAPICacheTest(APITestCase):
+    """Test cases for cached API list responses"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        Task.objects.create(title='API Cached Task', due_date=date.today(), owner=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_served_from_cache(self):
+        """Test repeated list requests don't query the database"""
+        self.client.get('/api/tasks/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_list_cache_keyed_by_query(self):
+        """Test filtered views are cached separately"""
+        self.client.get('/api/tasks/')
+        response = self.client.get('/api/tasks/', {'completed': 'true'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_api_write_invalidates_list(self):
+        """Test writes through the API are visible on the next list"""
+        self.client.get('/api/tasks/')
+        response = self.client.post('/api/tasks/', {'title': 'New', 'due_date': date.today()})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get('/api/tasks/').data['count'], 2)
+
+    def test_bulk_write_invalidates_list(self):
+        """Test bulk writes, which send no post_save, still invalidate"""
+        self.client.get('/api/tasks/')
+        self.client.post('/api/tasks/bulk/', [
+            {'title': 'Bulk 1', 'due_date': str(date.today())},
+            {'title': 'Bulk 2', 'due_date': str(date.today())},
+        ], format='json')
+        self.assertEqual(self.client.get('/api/tasks/').data['count'], 3)
+
+        task_id = self.client.get('/api/tasks/').data['results'][0]['id']
+        self.client.patch('/api/tasks/bulk/', [{'id': task_id, 'completed': True}], format='json')
+        self.assertEqual(self.client.get('/api/tasks/', {'completed': 'true'}).data['count'], 1)
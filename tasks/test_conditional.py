@@ -0,0 +1,167 @@
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+from datetime import date, timedelta
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from .models import Task
+
+
+class TaskAPIConditionalGetTest(APITestCase):
+    """Test cases for ETag / Last-Modified support on the task API"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.task = Task.objects.create(
+            title='Conditional Task',
+            due_date=date.today() + timedelta(days=1),
+            owner=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_updated_at_tracked(self):
+        """Test updated_at changes on save"""
+        before = self.task.updated_at
+        self.task.title = 'Renamed'
+        self.task.save()
+        self.assertGreater(self.task.updated_at, before)
+
+    def test_list_validators(self):
+        """Test list responses carry an ETag and Last-Modified"""
+        response = self.client.get('/api/tasks/')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_list_not_modified_without_queries(self):
+        """Test a matching If-None-Match gets a 304 without touching the database"""
+        etag = self.client.get('/api/tasks/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_if_modified_since(self):
+        """Test If-Modified-Since with the returned Last-Modified gets a 304"""
+        last_modified = self.client.get('/api/tasks/')['Last-Modified']
+        response = self.client.get('/api/tasks/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_changes_after_write(self):
+        """Test the list ETag changes once a task changes"""
+        etag = self.client.get('/api/tasks/')['ETag']
+        self.client.patch(f'/api/tasks/{self.task.pk}/', {'completed': True})
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['results'][0]['completed'])
+
+    def test_list_etag_changes_after_delete(self):
+        """Test the list ETag changes when a task is deleted"""
+        etag = self.client.get('/api/tasks/')['ETag']
+        self.task.delete()
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_per_query(self):
+        """Test different filters have different ETags"""
+        etag = self.client.get('/api/tasks/')['ETag']
+        response = self.client.get('/api/tasks/', {'completed': 'true'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_per_user(self):
+        """Test another user's ETag never matches"""
+        etag = self.client.get('/api/tasks/')['ETag']
+        other_user = User.objects.create_user(username='otheruser', password='otherpass123')
+        self.client.force_authenticate(user=other_user)
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_not_modified(self):
+        """Test a matching If-None-Match on a task gets a 304 with one small query"""
+        etag = self.client.get(f'/api/tasks/{self.task.pk}/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/tasks/{self.task.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_etag_changes_after_update(self):
+        """Test a task's ETag changes when it is updated"""
+        etag = self.client.get(f'/api/tasks/{self.task.pk}/')['ETag']
+        self.task.completed = True
+        self.task.save()
+        response = self.client.get(f'/api/tasks/{self.task.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_etag_changes_after_bulk_update(self):
+        """Test bulk updates refresh updated_at"""
+        etag = self.client.get(f'/api/tasks/{self.task.pk}/')['ETag']
+        self.client.patch('/api/tasks/bulk/', [{'id': self.task.pk, 'completed': True}], format='json')
+        response = self.client.get(f'/api/tasks/{self.task.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_missing_task(self):
+        """Test missing or invalid ids still return 404"""
+        self.assertEqual(self.client.get('/api/tasks/999999/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/tasks/abc/').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TaskListConditionalGetTest(TestCase):
+    """Test cases for ETag / Last-Modified support on the dashboard"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.task = Task.objects.create(
+            title='Dashboard Task',
+            due_date=date.today(),
+            owner=self.user
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_dashboard_not_modified(self):
+        """Test the dashboard answers revalidation with a 304"""
+        etag = self.client.get(reverse('task_list'))['ETag']
+        response = self.client.get(reverse('task_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_dashboard_modified_after_write(self):
+        """Test the dashboard is re-rendered after a task changes"""
+        etag = self.client.get(reverse('task_list'))['ETag']
+        self.client.post(reverse('task_update', args=[self.task.pk]), {
+            'title': 'Dashboard Task',
+            'description': '',
+            'due_date': date.today(),
+            'completed': 'on',
+        })
+        response = self.client.get(reverse('task_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_modified_after_login(self):
+        """Test the dashboard is re-rendered with a fresh CSRF token after logging in again"""
+        client = Client(enforce_csrf_checks=True)
+
+        def login():
+            client.get(reverse('login'))
+            client.post(reverse('login'), {
+                'username': 'testuser',
+                'password': 'testpass123',
+                'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+            })
+
+        login()
+        response = client.get(reverse('task_list'))
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        client.post(reverse('logout'), {'csrfmiddlewaretoken': client.cookies['csrftoken'].value})
+        login()
+        response = client.get(reverse('task_list'), HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        response = client.post(reverse('logout'), {'csrfmiddlewaretoken': response.context['csrf_token']})
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,213 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from .counters import reconcile_counters
+from .models import Task, UserTaskCounters, UserTaskDueCount
+from .stats import TaskStats
+
+
+class CountersTestMixin:
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other_user = User.objects.create_user(username='otheruser', password='otherpass123')
+        self.today = date.today()
+
+    def create_task(self, days=0, completed=False, owner=None):
+        return Task.objects.create(
+            title='Task', due_date=self.today + timedelta(days=days), completed=completed, owner=owner or self.user
+        )
+
+    def stats(self, user=None):
+        return TaskStats.compute(user or self.user, self.today).as_dict()
+
+    def assertCountersExact(self):
+        """Assert the counters of every user match their tasks"""
+        self.assertEqual(reconcile_counters('default'), [])
+
+
+class TaskCountersTest(CountersTestMixin, TestCase):
+    """Test cases for the incrementally maintained task counters"""
+
+    def test_save_and_delete(self):
+        """Test creating, updating and deleting tasks keeps the counters exact"""
+        task = self.create_task(days=-1)
+        self.create_task(days=1)
+        self.create_task(days=-2, completed=True)
+        self.assertEqual(self.stats(), {'total': 3, 'completed': 1, 'incomplete': 2, 'overdue': 1})
+
+        task.completed = True
+        task.save()
+        self.assertEqual(self.stats(), {'total': 3, 'completed': 2, 'incomplete': 1, 'overdue': 0})
+        task.completed = False
+        task.due_date = self.today + timedelta(days=5)
+        task.save()
+        self.assertEqual(self.stats(), {'total': 3, 'completed': 1, 'incomplete': 2, 'overdue': 0})
+
+        task.delete()
+        self.assertEqual(self.stats(), {'total': 2, 'completed': 1, 'incomplete': 1, 'overdue': 0})
+        self.assertCountersExact()
+
+    def test_overdue_by_date(self):
+        """Test overdue tasks are those open and due before the day asked for"""
+        for days in (-3, -1, 0, 2, 2):
+            self.create_task(days=days)
+        self.assertEqual(self.stats()['overdue'], 2)
+        self.assertEqual(TaskStats.compute(self.user, self.today + timedelta(days=3)).overdue, 5)
+        self.assertEqual(self.stats(self.other_user)['overdue'], 0)
+
+    def test_stats_read_counters_only(self):
+        """Test stats are one query on the counters, not on the tasks"""
+        for days in range(-5, 5):
+            self.create_task(days=days)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.stats()['overdue'], 5)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"tasks_task"', queries[0]['sql'])
+
+    def test_deferred_fields_and_update_fields(self):
+        """Test partially loaded or saved tasks count what was written"""
+        task = self.create_task(days=-1)
+        partial = Task.objects.only('title').get(pk=task.pk)
+        partial.completed = True
+        partial.save()
+        self.assertEqual(self.stats()['completed'], 1)
+
+        task = Task.objects.get(pk=task.pk)
+        task.completed = False
+        task.title = 'Renamed'
+        task.save(update_fields=['title'])
+        self.assertEqual(self.stats()['completed'], 1)
+
+        unloaded = Task(
+            pk=task.pk, title='Replaced', due_date=self.today, completed=False, owner=self.user, created_at=task.created_at
+        )
+        unloaded.save()
+        self.assertEqual(self.stats(), {'total': 1, 'completed': 0, 'incomplete': 1, 'overdue': 0})
+        self.assertCountersExact()
+
+    def test_bulk_create_and_delete(self):
+        """Test bulk_create() and queryset deletes count in bulk"""
+        Task.objects.bulk_create([
+            Task(title=f'Bulk {i}', due_date=self.today + timedelta(days=i - 5), completed=i % 3 == 0, owner=self.user)
+            for i in range(10)
+        ])
+        self.assertEqual(self.stats(), {'total': 10, 'completed': 4, 'incomplete': 6, 'overdue': 3})
+        Task.objects.filter(owner=self.user, due_date__lt=self.today).delete()
+        self.assertEqual(self.stats(), {'total': 5, 'completed': 2, 'incomplete': 3, 'overdue': 0})
+        self.assertCountersExact()
+
+    def test_bulk_create_ignore_conflicts(self):
+        """Test bulk_create() ignoring conflicts recounts the owners' tasks"""
+        task = self.create_task()
+        Task.objects.bulk_create([
+            Task(pk=task.pk, title='Duplicate', due_date=self.today, owner=self.user),
+            Task(title='New', due_date=self.today, owner=self.user),
+        ], ignore_conflicts=True)
+        self.assertEqual(self.stats()['total'], 2)
+        self.assertCountersExact()
+
+    def test_bulk_update(self):
+        """Test bulk_update() counts the changes of loaded and unloaded tasks"""
+        tasks = [self.create_task(days=-1) for _ in range(3)]
+        loaded = list(Task.objects.filter(pk__in=[task.pk for task in tasks[:2]]))
+        unloaded = Task(pk=tasks[2].pk, title='Task', due_date=self.today, owner=self.user)
+        for task in loaded:
+            task.completed = True
+        Task.objects.bulk_update(loaded + [unloaded], ['completed', 'due_date'])
+        self.assertEqual(self.stats(), {'total': 3, 'completed': 2, 'incomplete': 1, 'overdue': 0})
+        self.assertCountersExact()
+
+    def test_queryset_update(self):
+        """Test update() counts changes to values and expressions"""
+        for days in (-2, -1, 1):
+            self.create_task(days=days)
+        Task.objects.filter(due_date__lt=self.today).update(completed=True)
+        self.assertEqual(self.stats(), {'total': 3, 'completed': 2, 'incomplete': 1, 'overdue': 0})
+        Task.objects.update(completed=False, due_date=str(self.today - timedelta(days=1)))
+        self.assertEqual(self.stats()['overdue'], 3)
+        Task.objects.update(due_date=F('due_date') + timedelta(days=2))
+        self.assertEqual(self.stats()['overdue'], 0)
+        Task.objects.filter(completed=False).update(owner=self.other_user)
+        self.assertEqual(self.stats()['total'], 0)
+        self.assertEqual(self.stats(self.other_user)['total'], 3)
+        self.assertCountersExact()
+
+    def test_deleting_user_deletes_counters(self):
+        """Test a deleted user's counters go with their tasks"""
+        self.create_task(days=-1)
+        self.user.delete()
+        self.assertFalse(UserTaskCounters.objects.exists())
+        self.assertFalse(UserTaskDueCount.objects.exists())
+
+    def test_reconcile_command(self):
+        """Test reconcile_task_counters repairs drifted counters only"""
+        self.create_task(days=-1)
+        self.create_task(days=1, owner=self.other_user)
+        TaskStats.for_user(self.user, today=self.today)
+        UserTaskCounters.objects.filter(owner=self.user).update(total=F('total') + 5)
+        UserTaskDueCount.objects.create(owner=self.user, due_date=self.today - timedelta(days=9), open=2)
+        UserTaskDueCount.objects.create(owner=self.other_user, due_date=self.today, open=0)
+
+        out = StringIO()
+        call_command('reconcile_task_counters', stdout=out)
+        self.assertIn('Repaired the task counters of 1 users on default', out.getvalue())
+        self.assertEqual(TaskStats.for_user(self.user, today=self.today).as_dict(), {
+            'total': 1, 'completed': 0, 'incomplete': 1, 'overdue': 1,
+        })
+        self.assertFalse(UserTaskDueCount.objects.filter(open=0).exists())
+        self.assertCountersExact()
+
+
+class TaskAPICountersTest(CountersTestMixin, APITestCase):
+    """Test cases for the task counters through the API"""
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+
+    def test_api_writes(self):
+        """Test task API writes keep the stats exact"""
+        response = self.client.post('/api/tasks/', {'title': 'New', 'due_date': str(self.today - timedelta(days=1))})
+        pk = response.data['id']
+        self.assertEqual(self.client.get('/api/tasks/stats/').data['overdue'], 1)
+        self.client.patch(f'/api/tasks/{pk}/', {'completed': True})
+        self.assertEqual(self.client.get('/api/tasks/stats/').data, {
+            'total': 1, 'completed': 1, 'incomplete': 0, 'overdue': 0,
+        })
+        self.client.delete(f'/api/tasks/{pk}/')
+        self.assertEqual(self.client.get('/api/tasks/stats/').data['total'], 0)
+        self.assertCountersExact()
+
+    def test_bulk_api_writes(self):
+        """Test bulk create, update and delete keep the stats exact"""
+        response = self.client.post('/api/tasks/bulk/', [
+            {'title': f'Bulk {i}', 'due_date': str(self.today + timedelta(days=i - 2))} for i in range(4)
+        ], format='json')
+        ids = [task['id'] for task in response.data]
+        self.assertEqual(self.client.get('/api/tasks/stats/').data['overdue'], 2)
+        self.client.patch('/api/tasks/bulk/', [{'id': pk, 'completed': True} for pk in ids[:3]], format='json')
+        self.assertEqual(self.client.get('/api/tasks/stats/').data, {
+            'total': 4, 'completed': 3, 'incomplete': 1, 'overdue': 0,
+        })
+        self.client.delete('/api/tasks/bulk/', {'ids': ids[1:]}, format='json')
+        self.assertEqual(self.client.get('/api/tasks/stats/').data['total'], 1)
+        self.assertCountersExact()
+
+    def test_import(self):
+        """Test imported tasks are counted"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        upload = SimpleUploadedFile('tasks.ndjson', b'{"title": "A", "due_date": "2000-01-01"}\n')
+        self.client.post('/api/tasks/import/', {'file': upload}, format='multipart')
+        self.assertEqual(self.client.get('/api/tasks/stats/').data['overdue'], 1)
+        self.assertCountersExact()
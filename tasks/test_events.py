@@ -0,0 +1,168 @@
+import asyncio
+import json
+from datetime import date, timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from .events import RESYNC, get_broker, publish_task_event
+from .models import Task
+from .serializes import TaskSerializer
+
+EVENTS_URL = '/api/async/tasks/events/'
+
+
+def parse_event(chunk):
+    """
+    Return the fields of one text/event-stream message
+    """
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().splitlines())
+    fields['data'] = json.loads(fields['data'])
+    return fields
+
+
+class TaskEventsTest(TestCase):
+    """Test cases for the Server-Sent Events stream of task changes"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other_user = User.objects.create_user(username='otheruser', password='testpass123')
+        self.task = Task.objects.create(title='Existing Task', due_date=date.today(), owner=self.user)
+
+    async def open_stream(self, **headers):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(EVENTS_URL, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        return stream
+
+    async def next_event(self, stream):
+        return parse_event(await asyncio.wait_for(anext(stream), 5))
+
+    async def close_stream(self, stream):
+        # Like a client disconnecting: the ASGI handler cancels the response
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+
+    def commit(self, func):
+        with self.captureOnCommitCallbacks(execute=True):
+            return func()
+
+    async def test_requires_authentication(self):
+        """Test that the stream rejects anonymous requests"""
+        response = await self.async_client.get(EVENTS_URL)
+        self.assertEqual(response.status_code, 403)
+
+    def test_requires_asgi(self):
+        """Test that the stream is not served to WSGI workers"""
+        self.client.force_login(self.user)
+        response = self.client.get(EVENTS_URL)
+        self.assertEqual(response.status_code, 501)
+
+    async def test_stream_headers(self):
+        """Test the response is an uncached, unbuffered event stream"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(EVENTS_URL)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        stream = response.streaming_content
+        await anext(stream)
+        await self.close_stream(stream)
+
+    async def test_task_changes_are_pushed(self):
+        """Test created, updated and deleted events carry the change"""
+        stream = await self.open_stream()
+
+        task = await sync_to_async(self.commit)(lambda: Task.objects.create(
+            title='Pushed Task', due_date=date.today() + timedelta(days=1), owner=self.user,
+        ))
+        event = await self.next_event(stream)
+        self.assertEqual(event['event'], 'created')
+        self.assertEqual(event['data'], await sync_to_async(lambda: TaskSerializer(task).data)())
+
+        task.completed = True
+        await sync_to_async(self.commit)(task.save)
+        event = await self.next_event(stream)
+        self.assertEqual(event['event'], 'updated')
+        self.assertTrue(event['data']['completed'])
+
+        task_id = task.pk
+        await sync_to_async(self.commit)(task.delete)
+        event = await self.next_event(stream)
+        self.assertEqual(event['event'], 'deleted')
+        self.assertEqual(event['data'], {'id': task_id})
+        await self.close_stream(stream)
+
+    async def test_other_users_changes_not_pushed(self):
+        """Test a stream only receives its user's events"""
+        stream = await self.open_stream()
+        await sync_to_async(self.commit)(lambda: Task.objects.create(
+            title='Other Task', due_date=date.today(), owner=self.other_user,
+        ))
+        await sync_to_async(self.commit)(lambda: Task.objects.filter(pk=self.task.pk).delete())
+        event = await self.next_event(stream)
+        self.assertEqual(event['event'], 'deleted')
+        self.assertEqual(event['data'], {'id': self.task.pk})
+        await self.close_stream(stream)
+
+    async def test_bulk_changes_send_resync(self):
+        """Test bulk writes push a resync event"""
+        stream = await self.open_stream()
+
+        def bulk_create():
+            self.client.force_login(self.user)
+            response = self.client.post('/api/tasks/bulk/', [
+                {'title': f'Bulk Task {i}', 'due_date': '2030-01-01'} for i in range(3)
+            ], content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+
+        await sync_to_async(self.commit)(bulk_create)
+        event = await self.next_event(stream)
+        self.assertEqual(event['event'], RESYNC)
+        await self.close_stream(stream)
+
+    async def test_reconnect_starts_with_resync(self):
+        """Test a client sending Last-Event-ID is told to resync"""
+        stream = await self.open_stream(**{'Last-Event-ID': '41'})
+        event = await self.next_event(stream)
+        self.assertEqual(event['event'], RESYNC)
+        await self.close_stream(stream)
+
+    @override_settings(TASK_EVENTS_KEEPALIVE_SECONDS=0.01)
+    async def test_keepalive(self):
+        """Test idle streams send keepalive comments"""
+        stream = await self.open_stream()
+        self.assertEqual(await asyncio.wait_for(anext(stream), 5), b': keepalive\n\n')
+        await self.close_stream(stream)
+
+    @override_settings(TASK_EVENTS_QUEUE_SIZE=2)
+    async def test_slow_client_gets_resync(self):
+        """Test a client that falls behind loses its backlog for a resync"""
+        stream = await self.open_stream()
+        for i in range(3):
+            publish_task_event(self.user.pk, 'deleted', {'id': i})
+        await asyncio.sleep(0.01)
+        event = await self.next_event(stream)
+        self.assertEqual(event['event'], RESYNC)
+        await self.close_stream(stream)
+
+    async def test_disconnect_unsubscribes(self):
+        """Test closing the stream removes its subscription"""
+        stream = await self.open_stream()
+        self.assertTrue(get_broker().has_subscribers(self.user.pk))
+        await self.close_stream(stream)
+        self.assertFalse(get_broker().has_subscribers(self.user.pk))
+
+    def test_no_serialization_without_subscribers(self):
+        """Test events are not built when nobody listens"""
+        def fail():
+            raise AssertionError('Event data built without subscribers')
+
+        publish_task_event(self.user.pk, 'updated', fail)
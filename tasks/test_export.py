@@ -0,0 +1,141 @@
+import csv
+import json
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from .models import Task
+from .serializes import TaskSerializer
+
+
+class TaskAPIExportTest(APITestCase):
+    """Test cases for the streaming /api/tasks/export/ endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        today = date.today()
+        for i in range(5):
+            Task.objects.create(
+                title=f'Export Task {i}',
+                description='Übersicht, "quoted", with comma' if i == 0 else None,
+                due_date=today + timedelta(days=5 - i),
+                completed=i % 2 == 0,
+                owner=self.user
+            )
+        Task.objects.create(title='Other Task', due_date=today, owner=self.other_user)
+        self.client.force_authenticate(user=self.user)
+
+    def export(self, params=None, **extra):
+        response = self.client.get('/api/tasks/export/', params or {}, **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson_matches_serializer(self):
+        """Test NDJSON rows are the serializer's representation, in list order"""
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = [json.loads(line) for line in body.splitlines()]
+        expected = TaskSerializer(Task.objects.filter(owner=self.user).order_by('due_date'), many=True).data
+        self.assertEqual(rows, json.loads(json.dumps(expected)))
+
+    def test_csv(self):
+        """Test CSV export with header, quoting and unicode"""
+        response, body = self.export({'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(list(rows[0]), ['id', 'title', 'description', 'due_date', 'completed'])
+        self.assertIn('Übersicht, "quoted", with comma', [row['description'] for row in rows])
+
+    def test_csv_via_accept_header(self):
+        """Test the format can be negotiated with the Accept header"""
+        response, body = self.export(HTTP_ACCEPT='text/csv')
+        self.assertTrue(body.startswith('id,title,description,due_date,completed'))
+
+    def test_filters_applied(self):
+        """Test the export honors filter, search and ordering parameters"""
+        _, body = self.export({'completed': 'true', 'ordering': '-due_date'})
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Export Task 0', 'Export Task 2', 'Export Task 4'])
+
+        _, body = self.export({'search': 'Task 3'})
+        self.assertEqual([json.loads(line)['title'] for line in body.splitlines()], ['Export Task 3'])
+
+    def test_invalid_filter(self):
+        """Test invalid filter values are rejected before streaming"""
+        response = self.client.get('/api/tasks/export/', {'due_date_from': 'not-a-date'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_export(self):
+        """Test exports with no matching tasks"""
+        _, body = self.export({'search': 'nothingmatches'})
+        self.assertEqual(body, '')
+        _, body = self.export({'search': 'nothingmatches', 'format': 'csv'})
+        self.assertEqual(body, 'id,title,description,due_date,completed\r\n')
+
+    @override_settings(TASK_EXPORT_CHUNK_SIZE=2)
+    def test_streams_in_chunks(self):
+        """Test the body is produced one chunk of rows at a time"""
+        response = self.client.get('/api/tasks/export/')
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(sum(chunk.count(b'\n') for chunk in chunks), 5)
+
+    def test_requires_authentication(self):
+        """Test the export requires authentication"""
+        self.client.force_authenticate(user=None)
+        response = self.client.get('/api/tasks/export/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ExportTasksCommandTest(TestCase):
+    """Test cases for the export_tasks management command"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        today = date.today()
+        Task.objects.create(title='Open Task', due_date=today, owner=self.user)
+        Task.objects.create(title='Done Task', due_date=today, completed=True, owner=self.user)
+
+    def test_ndjson_to_stdout(self):
+        """Test the command writes NDJSON to stdout"""
+        out = StringIO()
+        call_command('export_tasks', 'testuser', stdout=out)
+        titles = [json.loads(line)['title'] for line in out.getvalue().splitlines()]
+        self.assertEqual(titles, ['Open Task', 'Done Task'])
+
+    def test_filters(self):
+        """Test the command accepts TaskFilter parameters"""
+        out = StringIO()
+        call_command('export_tasks', 'testuser', '--format', 'csv', '--filter', 'completed=true', stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual([row['title'] for row in rows], ['Done Task'])
+
+    def test_errors(self):
+        """Test unknown users and invalid filters raise CommandError"""
+        with self.assertRaises(CommandError):
+            call_command('export_tasks', 'nobody', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('export_tasks', 'testuser', '--filter', 'completed', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('export_tasks', 'testuser', '--filter', 'due_date_from=bad', stdout=StringIO())
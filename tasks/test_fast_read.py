@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from .models import Task
+from .renderers import FastJSONRenderer
+from .serializes import RowReader, TaskSerializer
+
+
+class TaskFastReadTest(APITestCase):
+    """Test cases for the fast read path of the task list and its JSON renderer"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        Task.objects.bulk_create([
+            Task(
+                title=f'Task {i} été \u2028',
+                description=None if i % 3 == 0 else f'Notes {i} "quoted"',
+                due_date=date(2030, 1, 1) + timedelta(days=i % 4),
+                completed=i % 2 == 0,
+                owner=self.user,
+            )
+            for i in range(30)
+        ])
+        self.client.force_authenticate(user=self.user)
+
+    def serializer_bytes(self, tasks):
+        return JSONRenderer().render(TaskSerializer(tasks, many=True).data)
+
+    def test_reader_matches_serializer(self):
+        """Test rows represented by the reader equal the serializer's data"""
+        reader = TaskSerializer.get_row_reader()
+        tasks = Task.objects.order_by('id')
+        self.assertEqual(reader.represent(tasks.values(*reader.values())), TaskSerializer(tasks, many=True).data)
+
+    def test_reader_needs_plain_columns(self):
+        """Test serializers with relations or method fields have no reader"""
+        class OwnerSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Task
+                fields = ['id', 'owner']
+
+        class MethodSerializer(serializers.ModelSerializer):
+            late = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Task
+                fields = ['id', 'late']
+
+        self.assertIsNone(RowReader.for_serializer(OwnerSerializer()))
+        self.assertIsNone(RowReader.for_serializer(MethodSerializer()))
+
+    def test_list_bytes_identical(self):
+        """Test list pages are byte-identical to the serializer's output"""
+        cases = [
+            ({}, Task.objects.order_by('due_date', 'id')[:20]),
+            ({'page': 2}, Task.objects.order_by('due_date', 'id')[20:]),
+            ({'ordering': '-title'}, Task.objects.order_by('-title')[:20]),
+            ({'completed': 'true'}, Task.objects.filter(completed=True).order_by('due_date', 'id')[:20]),
+        ]
+        for params, tasks in cases:
+            with self.subTest(params=params):
+                response = self.client.get('/api/tasks/', params)
+                self.assertEqual(response.status_code, 200)
+                results = response.content.split(b'"results":', 1)[1][:-1]
+                self.assertEqual(results, self.serializer_bytes(tasks))
+
+    def test_cursor_pages(self):
+        """Test keyset pages read their cursor from rows, whatever the ordering"""
+        for ordering in ('due_date', '-created_at', 'title'):
+            with self.subTest(ordering=ordering):
+                seen = []
+                url = f'/api/tasks/?pagination=cursor&ordering={ordering}'
+                while url:
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    seen += [task['id'] for task in response.json()['results']]
+                    url = response.json()['next']
+                self.assertEqual(sorted(seen), sorted(Task.objects.values_list('id', flat=True)))
+
+    def test_search_list(self):
+        """Test searched lists keep their rank ordering on the fast path"""
+        response = self.client.get('/api/tasks/', {'search': 'quoted'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 20)
+
+    def test_renderer_bytes_identical(self):
+        """Test FastJSONRenderer renders the same bytes as JSONRenderer"""
+        data = {
+            'text': 'café \u2028 \u2029 "\\ \n \U0001f600',
+            'numbers': [0, -1, 2 ** 62, True, None],
+            'nested': {'list': (1, 2), 3: 'int key'},
+            'date': date(2030, 1, 2),
+            'datetime': datetime(2030, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+            'decimal': Decimal('1.50'),
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_renderer_fallbacks(self):
+        """Test indented output, large integers and a missing orjson use JSONRenderer"""
+        data = {'big': 2 ** 70, 'items': [1, 2]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        indented = 'application/json; indent=4'
+        self.assertEqual(FastJSONRenderer().render(data, indented), JSONRenderer().render(data, indented))
+        with mock.patch('tasks.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render({'a': [1]}), b'{"a":[1]}')
+        self.assertEqual(FastJSONRenderer().render(None), b'')
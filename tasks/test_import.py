@@ -0,0 +1,288 @@
+import json
+import os
+import tempfile
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from .importer import ImportFileError, ImportInterrupted, import_tasks
+from .models import Task
+from .stats import TaskStats
+
+
+def ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+class TaskImporterTest(TestCase):
+    """Test cases for the streaming task importer"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+
+    def test_ndjson_import(self):
+        """Test NDJSON records are validated and inserted"""
+        lines = StringIO(ndjson(
+            {'title': 'First', 'due_date': '2030-01-01'},
+            {'id': 99, 'title': 'Second', 'description': 'Notes', 'due_date': '2030-01-02', 'completed': True},
+        ))
+        result = import_tasks(lines, 'ndjson', self.user)
+        self.assertEqual((result.processed, result.imported, result.invalid), (2, 2, 0))
+        second = Task.objects.get(title='Second')
+        self.assertEqual(second.owner, self.user)
+        self.assertTrue(second.completed)
+        self.assertEqual(second.due_date, date(2030, 1, 2))
+        self.assertNotEqual(second.pk, 99)
+
+    def test_csv_import(self):
+        """Test CSV rows with quoting and text booleans"""
+        lines = StringIO(
+            'title,description,due_date,completed\r\n'
+            'Plain,,2030-01-01,false\r\n'
+            '"Quoted, title","multi\nline",2030-01-02,True\r\n'
+        )
+        result = import_tasks(lines, 'csv', self.user)
+        self.assertEqual(result.imported, 2)
+        quoted = Task.objects.get(title='Quoted, title')
+        self.assertEqual(quoted.description, 'multi\nline')
+        self.assertTrue(quoted.completed)
+        self.assertIsNone(Task.objects.get(title='Plain').description)
+
+    def test_invalid_records_skipped(self):
+        """Test invalid records are reported with their line and skipped"""
+        lines = StringIO(ndjson(
+            {'title': 'Good', 'due_date': '2030-01-01'},
+            {'title': 'Bad date', 'due_date': 'someday'},
+            {'due_date': '2030-01-01'},
+        ) + '{not json\n' + '[1, 2]\n')
+        result = import_tasks(lines, 'ndjson', self.user)
+        self.assertEqual((result.processed, result.imported, result.invalid), (5, 1, 4))
+        self.assertEqual([error['line'] for error in result.errors], [2, 3, 4, 5])
+        self.assertIn('due_date', result.errors[0]['errors'])
+        self.assertIn('title', result.errors[1]['errors'])
+        self.assertEqual(list(Task.objects.values_list('title', flat=True)), ['Good'])
+
+    def test_wrong_value_types_reported(self):
+        """Test values of a JSON type a field cannot hold are reported as invalid records"""
+        lines = StringIO(ndjson(
+            {'title': 'Number date', 'due_date': 20240101},
+            {'title': 'List date', 'due_date': ['2024-01-01']},
+            {'title': 'Object date', 'due_date': {'year': 2024}},
+            {'title': 'Good', 'due_date': '2030-01-01'},
+        ))
+        result = import_tasks(lines, 'ndjson', self.user)
+        self.assertEqual((result.processed, result.imported, result.invalid), (4, 1, 3))
+        self.assertEqual([error['line'] for error in result.errors], [1, 2, 3])
+        for error in result.errors:
+            self.assertEqual(list(error['errors']), ['due_date'])
+
+    def test_csv_missing_columns(self):
+        """Test a CSV header without required columns is rejected"""
+        with self.assertRaises(ImportFileError):
+            import_tasks(StringIO('name,when\r\nx,y\r\n'), 'csv', self.user)
+
+    def test_batches_and_progress(self):
+        """Test records are inserted one batch per query with progress callbacks"""
+        records = [{'title': f'Task {i}', 'due_date': '2030-01-01'} for i in range(5)]
+        checkpoints = []
+        with self.assertNumQueries(3 * 5):
+            # SAVEPOINT, INSERT, counters (2), RELEASE per batch
+            import_tasks(StringIO(ndjson(*records)), 'ndjson', self.user, batch_size=2,
+                         progress=lambda result: checkpoints.append(result.processed))
+        self.assertEqual(checkpoints, [2, 4, 5])
+        self.assertEqual(Task.objects.count(), 5)
+
+    def test_resume_after_failure(self):
+        """Test an interrupted import resumes from its checkpoint without duplicates"""
+        data = ndjson(*[{'title': f'Task {i}', 'due_date': '2030-01-01'} for i in range(6)])
+        original = Task.objects.bulk_create
+        calls = []
+
+        def flaky_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise DatabaseError('disk full')
+            return original(objs, *args, **kwargs)
+
+        with mock.patch.object(Task.objects, 'bulk_create', flaky_bulk_create):
+            with self.assertRaises(ImportInterrupted) as cm:
+                import_tasks(StringIO(data), 'ndjson', self.user, batch_size=2)
+        self.assertEqual(cm.exception.result.processed, 2)
+        self.assertEqual(Task.objects.count(), 2)
+
+        result = import_tasks(StringIO(data), 'ndjson', self.user, start=2, batch_size=2)
+        self.assertEqual((result.processed, result.imported), (6, 4))
+        self.assertEqual(
+            sorted(Task.objects.values_list('title', flat=True)),
+            [f'Task {i}' for i in range(6)],
+        )
+
+    def test_import_invalidates_cache(self):
+        """Test imported tasks show up in cached stats"""
+        self.assertEqual(TaskStats.for_user(self.user).total, 0)
+        import_tasks(StringIO(ndjson({'title': 'New', 'due_date': '2030-01-01'})), 'ndjson', self.user)
+        self.assertEqual(TaskStats.for_user(self.user).total, 1)
+
+
+class TaskAPIImportTest(APITestCase):
+    """Test cases for the /api/tasks/import/ upload endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, name, content, **data):
+        upload = SimpleUploadedFile(name, content.encode('utf-8'))
+        return self.client.post('/api/tasks/import/', {'file': upload, **data}, format='multipart')
+
+    def test_upload_ndjson(self):
+        """Test uploading an NDJSON file creates the tasks"""
+        response = self.upload('tasks.ndjson', ndjson(
+            {'title': 'Uploaded', 'due_date': '2030-01-01'},
+            {'title': 'Broken', 'due_date': 'never'},
+        ))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['imported'], 1)
+        self.assertEqual(response.data['invalid'], 1)
+        self.assertEqual(response.data['errors'][0]['line'], 2)
+        self.assertTrue(Task.objects.filter(title='Uploaded', owner=self.user).exists())
+
+    def test_upload_wrong_value_types(self):
+        """Test records with non-string dates are reported, not a server error"""
+        response = self.upload('tasks.ndjson', ndjson(
+            {'title': 'Number date', 'due_date': 20240101},
+            {'title': 'List date', 'due_date': ['2024-01-01']},
+            {'title': 'Uploaded', 'due_date': '2030-01-01'},
+        ))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['imported'], response.data['invalid']), (1, 2))
+        self.assertEqual([error['line'] for error in response.data['errors']], [1, 2])
+        self.assertIn('due_date', response.data['errors'][0]['errors'])
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_upload_csv_to_disk(self):
+        """Test CSV uploads streamed from a temporary file, with a UTF-8 BOM"""
+        response = self.upload('export.txt', '﻿title,due_date\r\nÜber,2030-01-01\r\n', format='csv')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Task.objects.filter(title='Über').exists())
+
+    def test_export_round_trip(self):
+        """Test an export can be imported again"""
+        Task.objects.create(title='Exported', due_date=date(2030, 1, 1), owner=self.user)
+        export = b''.join(self.client.get('/api/tasks/export/', {'format': 'csv'}).streaming_content)
+        response = self.upload('tasks.csv', export.decode('utf-8'))
+        self.assertEqual(response.data['imported'], 1)
+        self.assertEqual(Task.objects.filter(title='Exported').count(), 2)
+
+    def test_resume_with_start(self):
+        """Test start skips records imported by an earlier upload"""
+        content = ndjson(*[{'title': f'Task {i}', 'due_date': '2030-01-01'} for i in range(3)])
+        response = self.upload('tasks.ndjson', content, start=2)
+        self.assertEqual(response.data['processed'], 3)
+        self.assertEqual(list(Task.objects.values_list('title', flat=True)), ['Task 2'])
+
+    def test_bad_requests(self):
+        """Test missing files, unknown formats and bad files are rejected"""
+        response = self.client.post('/api/tasks/import/', {}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.upload('tasks.xlsx', 'data')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('format', response.data)
+        response = self.upload('tasks.csv', 'name\r\nx\r\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('file', response.data)
+        response = self.upload('tasks.ndjson', '', start='x')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_authentication(self):
+        """Test the import requires authentication"""
+        self.client.force_authenticate(user=None)
+        response = self.upload('tasks.ndjson', '')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ImportTasksCommandTest(TestCase):
+    """Test cases for the import_tasks management command"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'tasks.ndjson')
+        with open(self.path, 'w') as f:
+            f.write(ndjson(*[{'title': f'Task {i}', 'due_date': '2030-01-01'} for i in range(5)]))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_import_file(self):
+        """Test the command imports a file and reports progress"""
+        out, err = StringIO(), StringIO()
+        call_command('import_tasks', 'testuser', self.path, '--batch-size', '2', stdout=out, stderr=err)
+        self.assertIn('Imported 5 tasks', out.getvalue())
+        self.assertEqual(err.getvalue().count('records processed'), 3)
+        self.assertEqual(Task.objects.count(), 5)
+        self.assertFalse(os.path.exists(self.path + '.checkpoint'))
+
+    def test_resume(self):
+        """Test --resume continues from the checkpoint file"""
+        with open(self.path + '.checkpoint', 'w') as f:
+            f.write('3')
+        call_command('import_tasks', 'testuser', self.path, '--resume', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(sorted(Task.objects.values_list('title', flat=True)), ['Task 3', 'Task 4'])
+
+    def test_interrupted_run_leaves_checkpoint(self):
+        """Test a failed batch keeps the checkpoint of the last committed one"""
+        original = Task.objects.bulk_create
+        calls = []
+
+        def flaky_bulk_create(objs, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise DatabaseError('disk full')
+            return original(objs, *args, **kwargs)
+
+        with mock.patch.object(Task.objects, 'bulk_create', flaky_bulk_create):
+            with self.assertRaisesMessage(CommandError, '--resume'):
+                call_command('import_tasks', 'testuser', self.path, '--batch-size', '2', stdout=StringIO(), stderr=StringIO())
+        with open(self.path + '.checkpoint') as f:
+            self.assertEqual(f.read(), '2')
+
+    def test_wrong_value_types(self):
+        """Test records with non-string dates are skipped and reported by line"""
+        with open(self.path, 'a') as f:
+            f.write(ndjson({'title': 'Number date', 'due_date': 20240101}, {'title': 'List date', 'due_date': ['2024-01-01']}))
+        out, err = StringIO(), StringIO()
+        call_command('import_tasks', 'testuser', self.path, stdout=out, stderr=err)
+        self.assertIn('Imported 5 tasks for testuser, skipped 2 invalid records', out.getvalue())
+        self.assertIn('Line 6: {"due_date"', err.getvalue())
+        self.assertIn('Line 7: {"due_date"', err.getvalue())
+
+    def test_errors(self):
+        """Test unknown users and formats raise CommandError"""
+        with self.assertRaises(CommandError):
+            call_command('import_tasks', 'nobody', self.path, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('import_tasks', 'testuser', os.path.join(self.tmpdir.name, 'tasks.xlsx'), stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('import_tasks', 'testuser', os.path.join(self.tmpdir.name, 'missing.csv'), stdout=StringIO())
@@ -0,0 +1,361 @@
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import jobs
+from .counters import reconcile_counters
+from .jobs import JobFailed, TooManyJobs, claim_job, enqueue, prune_jobs, report_progress, run_job
+from .models import Job, Task, TaskTombstone
+from .stats import TaskStats
+
+
+def ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+class JobsTestMixin:
+    def setUp(self):
+        """Set up test data, with job files in a temporary directory"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other_user = User.objects.create_user(username='otheruser', password='otherpass123')
+        self.today = date.today()
+
+    def create_tasks(self, count, owner=None, days=0):
+        return Task.objects.bulk_create([
+            Task(title=f'Task {i}', due_date=self.today + timedelta(days=days + i), owner=owner or self.user)
+            for i in range(count)
+        ])
+
+    def run_workers(self):
+        out = StringIO()
+        call_command('run_workers', '--processes', '1', '--burst', stdout=out)
+        return out.getvalue()
+
+    def job_files(self):
+        storage = jobs.get_storage()
+        if not storage.exists('jobs'):
+            return []
+        return [
+            f'{directory}/{name}'
+            for directory in storage.listdir('jobs')[0]
+            for name in storage.listdir(f'jobs/{directory}')[1]
+        ]
+
+
+class JobQueueTest(JobsTestMixin, TestCase):
+    """Test cases for the background job queue and its handlers"""
+
+    def test_complete_job(self):
+        """Test a complete job marks the matching tasks completed"""
+        self.create_tasks(5, days=-2)
+        self.create_tasks(2, owner=self.other_user, days=-2)
+        job = enqueue('complete', self.user, {'filters': {'due_date_to': [str(self.today)]}})
+        self.assertEqual(job.status, Job.Status.QUEUED)
+
+        self.assertIn('Ran 1 jobs', self.run_workers())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result, {'completed': 3})
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(TaskStats.compute(self.user, self.today).completed, 3)
+        self.assertFalse(Task.objects.filter(owner=self.other_user, completed=True).exists())
+        self.assertEqual(reconcile_counters('default'), [])
+
+    @override_settings(TASK_JOB_BATCH_SIZE=2)
+    def test_delete_job_in_batches(self):
+        """Test a delete job deletes in batches, reporting progress"""
+        tasks = self.create_tasks(5)
+        job = enqueue('delete', self.user, {'filters': {}})
+        self.run_workers()
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'deleted': 5})
+        self.assertEqual(job.progress, {'done': 5, 'total': 5})
+        self.assertFalse(Task.objects.exists())
+        # Synced clients learn about the deletions
+        self.assertEqual(TaskTombstone.objects.filter(task_id__in=[task.pk for task in tasks]).count(), 5)
+        self.assertEqual(reconcile_counters('default'), [])
+
+    def test_retries_with_backoff(self):
+        """Test failing jobs are retried later, then marked failed"""
+        handler = mock.Mock(side_effect=RuntimeError('boom'))
+        with mock.patch.dict(jobs.HANDLERS, {'flaky': handler}):
+            job = enqueue('flaky', self.user)
+            now = timezone.now()
+            for attempt in range(1, 4):
+                claimed = claim_job(now)
+                self.assertEqual((claimed.pk, claimed.attempts), (job.pk, attempt))
+                run_job(claimed)
+                self.assertIsNone(claim_job(now))
+                job.refresh_from_db()
+                if attempt < 3:
+                    self.assertEqual(job.status, Job.Status.QUEUED)
+                    delay = (job.run_after - timezone.now()).total_seconds()
+                    self.assertAlmostEqual(delay, 30 * 2 ** (attempt - 1), delta=5)
+                    now = job.run_after
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.error, 'RuntimeError: boom')
+        self.assertEqual(handler.call_count, 3)
+
+    def test_job_failed_is_not_retried(self):
+        """Test JobFailed fails the job at once"""
+        with mock.patch.dict(jobs.HANDLERS, {'hopeless': mock.Mock(side_effect=JobFailed('No way'))}):
+            job = enqueue('hopeless', self.user)
+            run_job(claim_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), (Job.Status.FAILED, 1, 'No way'))
+
+    def test_stale_lock_is_taken_over(self):
+        """Test a job whose worker stopped runs again once its lock expires"""
+        job = enqueue('complete', self.user, {'filters': {}})
+        stalled = claim_job()
+        self.assertIsNone(claim_job())
+
+        later = timezone.now() + timedelta(seconds=301)
+        retried = claim_job(later)
+        self.assertEqual((retried.pk, retried.attempts), (job.pk, 2))
+        # The stalled worker can no longer report or finish
+        self.assertFalse(report_progress(stalled, done=1))
+        jobs.finish_job(stalled, Job.Status.FAILED, error='stalled')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.RUNNING)
+
+        self.assertEqual(claim_job(later + timedelta(seconds=301)).attempts, 3)
+        self.assertIsNone(claim_job(later + timedelta(seconds=602)))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn('its worker stopped', job.error)
+
+    def test_user_concurrency(self):
+        """Test a user's jobs run one at a time, other users' meanwhile"""
+        first = enqueue('complete', self.user, {'filters': {}})
+        enqueue('delete', self.user, {'filters': {}})
+        other = enqueue('complete', self.other_user, {'filters': {}})
+        self.assertEqual(claim_job().pk, first.pk)
+        self.assertEqual(claim_job().pk, other.pk)
+        self.assertIsNone(claim_job())
+        with override_settings(TASK_JOB_USER_CONCURRENCY=2):
+            self.assertEqual(claim_job().kind, 'delete')
+
+    @override_settings(TASK_JOB_USER_QUEUE_LIMIT=2)
+    def test_queue_limit(self):
+        """Test users cannot queue more than TASK_JOB_USER_QUEUE_LIMIT jobs"""
+        enqueue('complete', self.user, {'filters': {}})
+        enqueue('complete', self.user, {'filters': {}})
+        with self.assertRaises(TooManyJobs):
+            enqueue('complete', self.user, {'filters': {}})
+        enqueue('complete', self.other_user, {'filters': {}})
+        with self.assertRaises(ValueError):
+            enqueue('unknown', self.user)
+
+    def test_export_and_prune(self):
+        """Test exports are stored until their job is pruned"""
+        self.create_tasks(3)
+        job = enqueue('export', self.user, {'filters': {}, 'format': 'csv'})
+        self.run_workers()
+        job.refresh_from_db()
+        self.assertEqual(job.result['format'], 'csv')
+        with jobs.get_storage().open(job.result['file']) as exported:
+            content = exported.read()
+        self.assertEqual(len(content), job.result['size'])
+        self.assertEqual(content.count(b'\r\n'), 4)
+
+        self.assertEqual(prune_jobs(), 0)
+        self.assertEqual(prune_jobs(timezone.now() + timedelta(days=8)), 1)
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(self.job_files(), [])
+
+    @override_settings(TASK_IMPORT_BATCH_SIZE=2)
+    def test_import_resumes_after_failure(self):
+        """Test a failed import attempt resumes from its last batch"""
+        data = ndjson(*[{'title': f'Task {i}', 'due_date': '2030-01-01'} for i in range(5)], {'title': 'Broken'})
+        name = jobs.save_job_file('tasks.ndjson', data.encode('utf-8'))
+        job = enqueue('import', self.user, {'file': name, 'format': 'ndjson', 'start': 0})
+        original = Task.objects.bulk_create
+        calls = []
+
+        def flaky_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise DatabaseError('disk full')
+            return original(objs, *args, **kwargs)
+
+        with mock.patch.object(Task.objects, 'bulk_create', flaky_bulk_create):
+            run_job(claim_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.progress['processed'], 2)
+        self.assertIn('disk full', job.error)
+
+        run_job(claim_job(job.run_after))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(
+            {key: job.result[key] for key in ('processed', 'imported', 'invalid')},
+            {'processed': 6, 'imported': 5, 'invalid': 1},
+        )
+        self.assertEqual(Task.objects.filter(owner=self.user).count(), 5)
+        self.assertEqual(self.job_files(), [])
+
+    def test_delete_account(self):
+        """Test a delete_account job deletes the user and all their tasks"""
+        self.create_tasks(3)
+        self.create_tasks(1, owner=self.other_user)
+        job = enqueue('delete_account', self.user)
+        self.run_workers()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertIsNone(job.owner)
+        self.assertFalse(User.objects.filter(username='testuser').exists())
+        self.assertEqual(list(Task.objects.values_list('owner', flat=True)), [self.other_user.pk])
+        self.assertEqual(reconcile_counters('default'), [])
+
+    def test_jobs_of_deleted_users_fail(self):
+        """Test queued jobs of a deleted user fail instead of retrying"""
+        job = enqueue('complete', self.user, {'filters': {}})
+        self.user.delete()
+        self.run_workers()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Job.Status.FAILED, 'The user was deleted'))
+
+
+class JobAPITest(JobsTestMixin, APITestCase):
+    """Test cases for the /api/jobs/ endpoints"""
+
+    def setUp(self):
+        """Set up test data"""
+        super().setUp()
+        self.client.login(username='testuser', password='testpass123')
+
+    def start(self, **data):
+        return self.client.post('/api/jobs/', data, format='json')
+
+    def test_start_and_poll(self):
+        """Test starting a job answers 202 with the URL to poll"""
+        self.create_tasks(3, days=-5)
+        response = self.start(kind='complete', filters={'overdue': True})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertEqual(response['Location'], response.data['url'])
+        self.assertTrue(response.data['url'].endswith(f'/api/jobs/{response.data["id"]}/'))
+
+        self.run_workers()
+        response = self.client.get(response['Location'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'succeeded')
+        self.assertEqual(response.data['result'], {'completed': 3})
+        self.assertIsNone(response.data['download_url'])
+        self.assertEqual(self.client.get('/api/tasks/stats/').data['completed'], 3)
+
+    def test_export_download(self):
+        """Test a finished export is downloaded from its job"""
+        self.create_tasks(2)
+        response = self.start(kind='export', format='csv', filters={'search': 'Task'})
+        url = response.data['url']
+        self.assertEqual(self.client.get(f'{url}download/').status_code, 409)
+
+        self.run_workers()
+        download_url = self.client.get(url).data['download_url']
+        response = self.client.get(download_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment; filename="tasks.csv"', response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content).count(b'Task '), 2)
+
+    def test_invalid_requests(self):
+        """Test unknown kinds, filters and formats are rejected"""
+        self.assertIn('kind', self.start(kind='import').data)
+        response = self.start(kind='delete', filters={'due_date_from': 'never'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('due_date_from', response.data['filters'])
+        self.assertEqual(self.start(kind='delete', filters=['completed']).status_code, 400)
+        self.assertIn('format', self.start(kind='export', format='xml').data)
+        self.assertFalse(Job.objects.exists())
+
+    def test_ignored_filters(self):
+        """Test only task filter parameters are kept"""
+        response = self.start(kind='complete', filters={'completed': False, 'owner': self.other_user.pk, 'page': 2})
+        self.assertEqual(Job.objects.get(pk=response.data['id']).payload, {'filters': {'completed': ['False']}})
+
+    @override_settings(TASK_JOB_USER_QUEUE_LIMIT=1)
+    def test_queue_limit(self):
+        """Test starting jobs over the user's queue limit answers 429"""
+        self.assertEqual(self.start(kind='delete').status_code, 202)
+        response = self.start(kind='delete')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('1 jobs are already queued or running', response.data['detail'])
+
+    def test_cancel(self):
+        """Test queued jobs can be cancelled, running ones cannot"""
+        url = self.start(kind='delete').data['url']
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.get(url).data['status'], 'cancelled')
+        self.run_workers()
+        self.assertEqual(self.client.delete(url).status_code, 409)
+
+        url = self.start(kind='delete').data['url']
+        claim_job()
+        self.assertEqual(self.client.delete(url).status_code, 409)
+
+    def test_jobs_are_private(self):
+        """Test users only see their own jobs"""
+        own = self.start(kind='delete').data['id']
+        other = enqueue('delete', self.other_user, {'filters': {}})
+        response = self.client.get('/api/jobs/')
+        self.assertEqual([job['id'] for job in response.data['results']], [own])
+        self.assertEqual(self.client.get(f'/api/jobs/{other.pk}/').status_code, 404)
+        self.assertEqual(self.client.delete(f'/api/jobs/{other.pk}/').status_code, 404)
+
+    def test_import_in_background(self):
+        """Test imports asked to run asynchronously, or too large, are jobs"""
+        upload = SimpleUploadedFile('tasks.ndjson', ndjson({'title': 'Later', 'due_date': '2030-01-01'}).encode())
+        response = self.client.post(
+            '/api/tasks/import/', {'file': upload}, format='multipart', HTTP_PREFER='respond-async',
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['kind'], 'import')
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(len(self.job_files()), 1)
+
+        self.run_workers()
+        self.assertEqual(self.client.get(response['Location']).data['result']['imported'], 1)
+        self.assertTrue(Task.objects.filter(title='Later', owner=self.user).exists())
+        self.assertEqual(self.job_files(), [])
+
+        with override_settings(TASK_IMPORT_INLINE_MAX_BYTES=10):
+            upload = SimpleUploadedFile('tasks.ndjson', ndjson({'title': 'Large', 'due_date': '2030-01-01'}).encode())
+            response = self.client.post('/api/tasks/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+
+    def test_delete_account(self):
+        """Test deleting the account logs the user out, then deletes them"""
+        self.create_tasks(2)
+        response = self.start(kind='delete_account')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 403)
+
+        self.run_workers()
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_requires_authentication(self):
+        """Test anonymous users cannot use jobs"""
+        self.client.logout()
+        self.assertEqual(self.start(kind='delete').status_code, 403)
+        self.assertEqual(self.client.get('/api/jobs/').status_code, 403)
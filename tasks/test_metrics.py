@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .metrics import label_key, merge_snapshots, registry, render
+from .models import Task
+
+
+def sample_value(text, line_prefix):
+    """Return the value of the first exposition line starting with ``line_prefix``"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    raise AssertionError(f'{line_prefix} not found in metrics')
+
+
+@override_settings(TASK_METRICS_DIR=None, TASK_METRICS_TOKEN=None)
+class MetricsTest(APITestCase):
+    """Test cases for request metrics and the /metrics endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        registry.reset()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        Task.objects.create(title='Metrics Task', due_date=date.today(), owner=self.user)
+        self.client.force_login(self.user)
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode('utf-8')
+
+    def test_request_metrics_per_view(self):
+        """Test requests are counted per view, method and status"""
+        self.client.get('/api/tasks/')
+        self.client.get('/api/tasks/')
+        self.client.get('/api/tasks/999999/')
+        self.client.get(reverse('task_list'))
+        text = self.scrape()
+        self.assertEqual(sample_value(text, 'task_http_requests_total{method="GET",status="200",view="task-list"}'), 2)
+        self.assertEqual(sample_value(text, 'task_http_requests_total{method="GET",status="404",view="task-detail"}'), 1)
+        self.assertEqual(sample_value(text, 'task_http_requests_total{method="GET",status="200",view="task_list"}'), 1)
+
+    def test_histograms(self):
+        """Test latency, size and query histograms are consistent"""
+        self.client.get('/api/tasks/')
+        text = self.scrape()
+        labels = '{method="GET",view="task-list"}'
+        self.assertEqual(sample_value(text, f'task_http_request_duration_seconds_count{labels}'), 1)
+        self.assertEqual(sample_value(text, 'task_http_request_duration_seconds_bucket{method="GET",view="task-list",le="+Inf"}'), 1)
+        self.assertGreater(sample_value(text, f'task_http_response_size_bytes_sum{labels}'), 0)
+        self.assertGreater(sample_value(text, f'task_db_queries_per_request_sum{labels}'), 0)
+        self.assertGreater(sample_value(text, f'task_db_query_duration_seconds_total{labels}'), 0)
+        self.assertGreater(sample_value(text, f'task_serializer_duration_seconds_total{labels}'), 0)
+
+    def test_bucket_counts_are_cumulative(self):
+        """Test rendered bucket counts never decrease"""
+        for _ in range(3):
+            self.client.get('/api/tasks/')
+        counts = [
+            float(line.rsplit(' ', 1)[1]) for line in self.scrape().splitlines()
+            if line.startswith('task_http_response_size_bytes_bucket') and 'view="task-list"' in line
+        ]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[-1], 3)
+
+    def test_streamed_response_size(self):
+        """Test streamed exports are recorded once their body was sent"""
+        response = self.client.get('/api/tasks/export/')
+        size = len(b''.join(response.streaming_content))
+        text = self.scrape()
+        self.assertEqual(sample_value(text, 'task_http_response_size_bytes_sum{method="GET",view="task-export"}'), size)
+
+    @override_settings(TASK_METRICS_TOKEN='secret')
+    def test_token(self):
+        """Test the endpoint requires the bearer token when configured"""
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_multiprocess_aggregation(self):
+        """Test /metrics sums the snapshots written by every worker"""
+        with tempfile.TemporaryDirectory() as directory:
+            other_worker = {
+                'task_http_requests_total': {
+                    label_key(view='task-list', method='GET', status='200'): 5,
+                },
+            }
+            with open(os.path.join(directory, 'metrics-1.json'), 'w') as f:
+                json.dump(other_worker, f)
+            with self.settings(TASK_METRICS_DIR=directory):
+                self.client.get('/api/tasks/')
+                text = self.scrape()
+                self.assertTrue(os.path.exists(os.path.join(directory, f'metrics-{os.getpid()}.json')))
+        self.assertEqual(sample_value(text, 'task_http_requests_total{method="GET",status="200",view="task-list"}'), 6)
+
+    def test_merge_and_render(self):
+        """Test merging histograms and label escaping"""
+        key = label_key(view='a"b', method='GET')
+        snapshot = merge_snapshots([
+            {'task_db_queries_per_request': {key: [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1]}},
+            {'task_db_queries_per_request': {key: [0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 2, 2]}},
+        ])
+        text = render(snapshot)
+        self.assertIn('task_db_queries_per_request_bucket{method="GET",view="a\\"b",le="1.0"} 2', text)
+        self.assertIn('task_db_queries_per_request_count{method="GET",view="a\\"b"} 3', text)
+        self.assertIn('# TYPE task_db_queries_per_request histogram', text)
@@ -11,6 +11,7 @@ from .models import Task
 from .forms import CustomUserCreationForm
 from .serializes import TaskSerializer
 from .filters import TaskFilter
+from .stats import TaskStats
 
 
 class TaskModelTest(TestCase):
@@ -168,3 +169,119 @@ class TaskViewsTest(TestCase):
         self.client.login(username='testuser', password='testpass123')
         response = self.client.get(reverse('task_delete', args=[other_task.pk]))
         self.assertEqual(response.status_code, 404)  # Should not be found
+
+
+class TaskStatsTest(TestCase):
+    """Test cases for aggregated dashboard stats"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        other_user = User.objects.create_user(
+            username='otheruser',
+            password='otherpass123'
+        )
+        Task.objects.create(title='Upcoming', due_date=date.today() + timedelta(days=1), owner=self.user)
+        Task.objects.create(title='Overdue', due_date=date.today() - timedelta(days=1), owner=self.user)
+        Task.objects.create(title='Done', due_date=date.today() - timedelta(days=3), completed=True, owner=self.user)
+        Task.objects.create(title='Other', due_date=date.today() - timedelta(days=1), owner=other_user)
+
+    def test_stats_for_user(self):
+        """Test stats only count the user's own tasks"""
+        stats = TaskStats.for_user(self.user)
+        self.assertEqual(stats, TaskStats(total=3, completed=1, incomplete=2, overdue=1))
+
+    def test_stats_single_query(self):
+        """Test stats are computed with one aggregate query"""
+        with self.assertNumQueries(1):
+            TaskStats.for_user(self.user)
+
+    def test_stats_empty(self):
+        """Test stats for a user without tasks"""
+        new_user = User.objects.create_user(username='emptyuser', password='emptypass123')
+        self.assertEqual(TaskStats.for_user(new_user).as_dict(), {
+            'total': 0, 'completed': 0, 'incomplete': 0, 'overdue': 0,
+        })
+
+    def test_dashboard_stats_context(self):
+        """Test dashboard exposes the aggregated stats"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('task_list'))
+        self.assertEqual(response.context['total_tasks'], 3)
+        self.assertEqual(response.context['completed_tasks'], 1)
+        self.assertEqual(response.context['incomplete_tasks'], 2)
+        self.assertEqual(response.context['overdue_tasks'], 1)
+
+
+class TaskPaginationTest(TestCase):
+    """Test cases for dashboard pagination and the load-more fragment"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        Task.objects.bulk_create([
+            Task(
+                title=f'Paged Task {i:02d}',
+                due_date=date.today() + timedelta(days=i),
+                owner=self.user
+            )
+            for i in range(25)
+        ])
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_first_page(self):
+        """Test the dashboard only renders the first page of tasks"""
+        response = self.client.get(reverse('task_list'))
+        self.assertEqual(len(response.context['tasks']), 20)
+        self.assertTrue(response.context['is_paginated'])
+        self.assertContains(response, 'Paged Task 19')
+        self.assertNotContains(response, 'Paged Task 20')
+        self.assertContains(response, 'id="loadMore"')
+
+    def test_second_page(self):
+        """Test the second page renders the remaining tasks"""
+        response = self.client.get(reverse('task_list'), {'page': 2})
+        self.assertEqual(len(response.context['tasks']), 5)
+        self.assertContains(response, 'Paged Task 24')
+        self.assertNotContains(response, 'id="loadMore"')
+
+    def test_stats_cover_all_pages(self):
+        """Test stats count all tasks, not just the current page"""
+        response = self.client.get(reverse('task_list'))
+        self.assertEqual(response.context['total_tasks'], 25)
+
+    def test_fragment_returns_cards_only(self):
+        """Test the fragment endpoint renders card markup without the page layout"""
+        response = self.client.get(reverse('task_list_fragment'), {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Paged Task 20')
+        self.assertNotContains(response, '<html')
+        self.assertNotIn('total_tasks', response.context)
+        self.assertNotIn('X-Next-Page', response)
+
+    def test_fragment_next_page_header(self):
+        """Test the fragment advertises the next page and keeps filters"""
+        response = self.client.get(reverse('task_list_fragment'), {'completed': 'false'})
+        self.assertEqual(
+            response['X-Next-Page'],
+            reverse('task_list_fragment') + '?completed=false&page=2'
+        )
+
+    def test_fragment_out_of_range_page(self):
+        """Test requesting a page past the end returns 404"""
+        response = self.client.get(reverse('task_list_fragment'), {'page': 99})
+        self.assertEqual(response.status_code, 404)
+
+    def test_fragment_requires_login(self):
+        """Test the fragment endpoint requires login"""
+        self.client.logout()
+        response = self.client.get(reverse('task_list_fragment'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,185 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import Task
+from .querybudget import QueryBudgetExceeded, QueryBudgetTestMixin, get_query_budget
+from .views import TaskListView, TaskViewSet
+
+# Every view is exercised with more rows than its budget, so an N+1 query
+# (e.g. touching task.owner per row) cannot stay within it
+TASK_COUNT = 30
+
+# Budgets are for the worst case: nothing served from the cache
+uncached = override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    TASK_QUERY_BUDGET_RAISE=True,
+)
+
+
+def create_tasks(owner, count=TASK_COUNT):
+    return Task.objects.bulk_create([
+        Task(
+            title=f'Budget Task {i}',
+            description='Description',
+            due_date=date.today() + timedelta(days=i - 5),
+            completed=i % 2 == 0,
+            owner=owner,
+        )
+        for i in range(count)
+    ])
+
+
+@uncached
+class TaskViewsQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    """Test the web views stay within their query budgets"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.tasks = create_tasks(self.user)
+        self.client.force_login(self.user)
+
+    def test_task_list(self):
+        """Test the dashboard and its fragment, filtered and searched"""
+        for params in [{}, {'completed': 'false'}, {'overdue': 'true'}, {'search': 'Budget'}, {'page': 2}]:
+            self.assertWithinQueryBudget(self.client.get(reverse('task_list'), params))
+            self.assertWithinQueryBudget(self.client.get(reverse('task_list_fragment'), params))
+
+    def test_create_update_delete(self):
+        """Test the task form views"""
+        task = self.tasks[0]
+        self.assertWithinQueryBudget(self.client.get(reverse('task_create')))
+        self.assertWithinQueryBudget(self.client.post(reverse('task_create'), {
+            'title': 'New', 'description': '', 'due_date': '2030-01-01',
+        }))
+        self.assertWithinQueryBudget(self.client.get(reverse('task_update', args=[task.pk])))
+        self.assertWithinQueryBudget(self.client.post(reverse('task_update', args=[task.pk]), {
+            'title': 'Renamed', 'description': '', 'due_date': '2030-01-01', 'completed': 'on',
+        }))
+        self.assertWithinQueryBudget(self.client.get(reverse('task_delete', args=[task.pk])))
+        self.assertWithinQueryBudget(self.client.post(reverse('task_delete', args=[task.pk])))
+
+    def test_signup(self):
+        """Test the signup view"""
+        self.client.logout()
+        self.assertWithinQueryBudget(self.client.get(reverse('signup')))
+        self.assertWithinQueryBudget(self.client.post(reverse('signup'), {
+            'username': 'newuser', 'email': 'new@example.com',
+            'password1': 'complexpass123!', 'password2': 'complexpass123!',
+        }))
+
+
+@uncached
+class TaskAPIQueryBudgetTest(QueryBudgetTestMixin, APITestCase):
+    """Test every TaskViewSet action stays within its query budget"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.tasks = create_tasks(self.user)
+        # Session authentication, as used by the browsable API
+        self.client.force_login(self.user)
+
+    def test_read_actions(self):
+        """Test list, retrieve, export, changes and stats"""
+        for params in [{}, {'completed': 'true'}, {'search': 'Budget'}, {'pagination': 'cursor'}]:
+            self.assertWithinQueryBudget(self.client.get('/api/tasks/', params))
+        self.assertWithinQueryBudget(self.client.get(f'/api/tasks/{self.tasks[0].pk}/'))
+        self.assertWithinQueryBudget(self.client.get('/api/tasks/export/'))
+        self.assertWithinQueryBudget(self.client.get('/api/tasks/changes/'))
+        self.assertWithinQueryBudget(self.client.get('/api/tasks/stats/'))
+
+    def test_write_actions(self):
+        """Test create, update, partial update and destroy"""
+        task = self.tasks[0]
+        data = {'title': 'API Task', 'due_date': '2030-01-01'}
+        self.assertWithinQueryBudget(self.client.post('/api/tasks/', data))
+        self.assertWithinQueryBudget(self.client.put(f'/api/tasks/{task.pk}/', data))
+        self.assertWithinQueryBudget(self.client.patch(f'/api/tasks/{task.pk}/', {'completed': True}))
+        self.assertWithinQueryBudget(self.client.delete(f'/api/tasks/{task.pk}/'))
+
+    def test_bulk_actions(self):
+        """Test bulk writes of the maximum number of items"""
+        count = TaskViewSet.bulk_max_items
+        self.assertWithinQueryBudget(self.client.post('/api/tasks/bulk/', [
+            {'title': f'Bulk {i}', 'due_date': '2030-01-01'} for i in range(count - TASK_COUNT)
+        ], format='json'))
+        ids = list(Task.objects.values_list('pk', flat=True))
+        self.assertEqual(len(ids), count)
+        self.assertWithinQueryBudget(self.client.patch('/api/tasks/bulk/', [
+            {'id': pk, 'completed': True} for pk in ids
+        ], format='json'))
+        self.assertWithinQueryBudget(self.client.delete('/api/tasks/bulk/', {'ids': ids}, format='json'))
+
+    def test_query_stats_recorded(self):
+        """Test the middleware records query count and time on the request"""
+        response = self.client.get('/api/tasks/')
+        stats = response.wsgi_request.query_stats
+        self.assertGreater(stats.count, 0)
+        self.assertGreater(stats.duration, 0)
+
+    def test_import_is_unbudgeted(self):
+        """Test imports (one insert per batch) declare no budget"""
+        upload = SimpleUploadedFile('tasks.ndjson', b'{"title": "A", "due_date": "2030-01-01"}\n')
+        response = self.client.post('/api/tasks/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(get_query_budget(response.wsgi_request))
+
+
+class QueryBudgetEnforcementTest(QueryBudgetTestMixin, TestCase):
+    """Test what happens when a view goes over its budget"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        create_tasks(self.user)
+        self.client.force_login(self.user)
+
+    @override_settings(TASK_QUERY_BUDGET_RAISE=True)
+    def test_raises_when_strict(self):
+        """Test an over-budget request raises in development and tests"""
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            original = TaskListView.query_budget
+            TaskListView.query_budget = 1
+            try:
+                with self.assertRaises(QueryBudgetExceeded):
+                    self.client.get(reverse('task_list'))
+            finally:
+                TaskListView.query_budget = original
+
+    @override_settings(TASK_QUERY_BUDGET_RAISE=False)
+    def test_logs_in_production(self):
+        """Test an over-budget request is logged and still served"""
+        original = TaskListView.query_budget
+        TaskListView.query_budget = 1
+        try:
+            with self.assertLogs('tasks.querybudget', 'WARNING') as logs:
+                response = self.client.get(reverse('task_list'))
+        finally:
+            TaskListView.query_budget = original
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('budget is 1', logs.output[0])
+
+    def test_assert_max_queries(self):
+        """Test the assertMaxQueries helper catches an N+1 loop"""
+        with self.assertRaises(AssertionError):
+            with self.assertMaxQueries(2):
+                for task in Task.objects.all():
+                    task.owner.username
+        with self.assertMaxQueries(2):
+            for task in Task.objects.select_related('owner'):
+                task.owner.username
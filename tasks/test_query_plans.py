@@ -0,0 +1,79 @@
+from unittest import skipUnless
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from datetime import date, timedelta
+
+from .counters import reconcile_counters
+from .models import Task
+from .stats import TaskStats
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plan assertions use SQLite EXPLAIN QUERY PLAN output')
+class TaskQueryPlanTest(TestCase):
+    """Test that owner-scoped queries are served by the composite indexes"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        for offset in range(-3, 4):
+            Task.objects.create(
+                title=f'Task {offset}',
+                due_date=date.today() + timedelta(days=offset),
+                completed=offset % 2 == 0,
+                owner=self.user
+            )
+
+    def assertUsesIndex(self, plan):
+        """Assert a plan searches an index without a table scan or temp sort"""
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('SCAN tasks_task', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_list_query_uses_index(self):
+        """Test the dashboard/API list query uses the (owner, due_date) index"""
+        plan = Task.objects.filter(owner=self.user).order_by('due_date').explain()
+        self.assertUsesIndex(plan)
+
+    def test_completed_filter_uses_index(self):
+        """Test filtering by status and ordering by due date uses an index"""
+        plan = Task.objects.filter(owner=self.user, completed=False).order_by('due_date').explain()
+        self.assertUsesIndex(plan)
+
+    def test_overdue_query_uses_index(self):
+        """Test the overdue query uses an index"""
+        plan = Task.objects.filter(
+            owner=self.user,
+            completed=False,
+            due_date__lt=date.today()
+        ).order_by('due_date').explain()
+        self.assertUsesIndex(plan)
+
+    def explain_captured(self, func, table):
+        """Return the query plan of the query on ``table`` run by ``func``"""
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        sql = next(query['sql'] for query in queries if f'FROM "{table}"' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    def test_stats_query_uses_index(self):
+        """Test the stats query searches the counters by primary key and the due counts by their unique index"""
+        plan = self.explain_captured(lambda: TaskStats.compute(self.user, date.today()), 'tasks_usertaskcounters')
+        self.assertIn('SEARCH tasks_usertaskcounters USING INTEGER PRIMARY KEY', plan)
+        # The (owner, due_date) unique constraint is created with the table
+        self.assertRegex(plan, r'SEARCH U0 USING INDEX \S*usertaskduecount\S* \(owner_id=\? AND due_date<\?\)')
+        self.assertNotIn('SCAN', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_reconcile_query_uses_index(self):
+        """Test recounting a user's tasks for the counters reads an index only"""
+        plan = self.explain_captured(lambda: reconcile_counters('default', [self.user.pk]), 'tasks_task')
+        self.assertUsesIndex(plan)
+        self.assertIn('COVERING INDEX', plan)
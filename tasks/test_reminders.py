@@ -0,0 +1,180 @@
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import OverdueWatermark, Task, TaskReminder
+from .reminders import ConsoleNotifier, FileNotifier, prune_reminders, queue_reminders, run_scheduler
+
+
+class ListNotifier:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    def send(self, reminders):
+        if self.fail:
+            raise ConnectionError('Notification service unavailable')
+        self.sent += [(reminder.title, reminder.due_date) for reminder in reminders]
+
+
+class TaskReminderTest(TestCase):
+    """Test cases for the overdue scheduler and its notifiers"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other_user = User.objects.create_user(username='otheruser', password='otherpass123')
+        self.today = date(2030, 6, 15)
+        self.notifier = ListNotifier()
+
+    def create_task(self, title, days, completed=False, owner=None):
+        return Task.objects.create(
+            title=title, due_date=self.today + timedelta(days=days), completed=completed, owner=owner or self.user
+        )
+
+    def tick(self, days=0):
+        return run_scheduler(self.notifier, self.today + timedelta(days=days))
+
+    def test_first_tick_starts_with_yesterday(self):
+        """Test the first tick reminds of the tasks due yesterday only"""
+        self.create_task('Long overdue', -3)
+        self.create_task('Due yesterday', -1)
+        self.create_task('Done yesterday', -1, completed=True)
+        self.create_task('Other user', -1, owner=self.other_user)
+        self.create_task('Due today', 0)
+        self.assertEqual(self.tick(), (2, 2))
+        self.assertEqual(sorted(self.notifier.sent), [
+            ('Due yesterday', self.today - timedelta(days=1)),
+            ('Other user', self.today - timedelta(days=1)),
+        ])
+        self.assertEqual(self.tick(), (0, 0))
+
+    def test_ticks_follow_the_days(self):
+        """Test each task is reminded of once, the day after its due date"""
+        self.tick()
+        for days in (0, 1, 1, 3):
+            self.create_task(f'Due in {days} days', days)
+        sent = []
+        for days in range(6):
+            self.tick(days)
+            sent.append(len(self.notifier.sent))
+        self.assertEqual(sent, [0, 1, 3, 3, 4, 4])
+        self.assertEqual(TaskReminder.objects.filter(sent_at__isnull=False).count(), 4)
+
+    @override_settings(TASK_REMINDER_BATCH_SIZE=2)
+    def test_batches_and_watermark(self):
+        """Test ticks read open tasks in batches from the watermark on"""
+        self.tick()
+        tasks = [self.create_task(f'Task {i}', i % 3) for i in range(7)]
+        self.create_task('Not yet', 3)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(queue_reminders('default', self.today + timedelta(days=3)), 7)
+        scans = [query['sql'] for query in queries if 'FROM "tasks_task"' in query['sql']]
+        # The watermark's date, then each date: its batches, one more when the
+        # last was full, and the look for the next date
+        self.assertEqual(len(scans), 11)
+        watermark = OverdueWatermark.objects.get()
+        self.assertEqual((watermark.due_date, watermark.task_id), (self.today + timedelta(days=2), tasks[5].pk))
+
+        self.create_task('Late addition', 2)
+        self.assertEqual(queue_reminders('default', self.today + timedelta(days=3)), 1)
+        self.assertEqual(TaskReminder.objects.count(), 8)
+
+    def test_stale_reminders_are_dropped(self):
+        """Test reminders of tasks completed, rescheduled or deleted are not sent"""
+        self.tick()
+        tasks = [self.create_task(f'Task {i}', 0) for i in range(4)]
+        queue_reminders('default', self.today + timedelta(days=1))
+        tasks[0].completed = True
+        tasks[0].save()
+        tasks[1].due_date = self.today + timedelta(days=7)
+        tasks[1].save()
+        tasks[2].delete()
+        self.assertEqual(self.tick(1), (0, 1))
+        self.assertEqual(self.notifier.sent, [('Task 3', self.today)])
+        self.assertEqual(list(TaskReminder.objects.values_list('task_id', flat=True)), [tasks[3].pk])
+
+    def test_failed_notifier_retried(self):
+        """Test reminders stay queued until their notifier succeeds"""
+        self.create_task('Due yesterday', -1)
+        self.notifier.fail = True
+        with self.assertLogs('tasks.reminders', 'ERROR'):
+            self.assertEqual(self.tick(), (1, 0))
+        self.assertTrue(TaskReminder.objects.filter(sent_at__isnull=True).exists())
+        self.notifier.fail = False
+        self.assertEqual(self.tick(), (0, 1))
+        self.assertEqual(self.notifier.sent, [('Due yesterday', self.today - timedelta(days=1))])
+
+    def test_notifiers(self):
+        """Test the console and file notifiers write one line per reminder"""
+        task = self.create_task('Write "report"', -1)
+        reminder = TaskReminder(task_id=task.pk, owner=self.user, title=task.title, due_date=task.due_date)
+        stream = StringIO()
+        ConsoleNotifier(stream).send([reminder])
+        self.assertEqual(
+            stream.getvalue(),
+            f'Task {task.pk} of user {self.user.pk} is overdue: "Write "report"" was due 2030-06-14\n',
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'reminders.ndjson')
+            FileNotifier(path).send([reminder])
+            FileNotifier(path).send([reminder])
+            with open(path, encoding='utf-8') as output:
+                lines = [json.loads(line) for line in output]
+        self.assertEqual(lines, [
+            {'task_id': task.pk, 'owner_id': self.user.pk, 'title': 'Write "report"', 'due_date': '2030-06-14'},
+        ] * 2)
+
+    def test_command(self):
+        """Test run_overdue_scheduler --once sends through the configured notifier"""
+        Task.objects.create(title='Due yesterday', due_date=timezone.localdate() - timedelta(days=1), owner=self.user)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'reminders.ndjson')
+            out = StringIO()
+            with override_settings(TASK_REMINDER_NOTIFIER='tasks.reminders.FileNotifier', TASK_REMINDER_FILE=path):
+                call_command('run_overdue_scheduler', '--once', stdout=out)
+            with open(path, encoding='utf-8') as output:
+                self.assertEqual(json.loads(output.read())['title'], 'Due yesterday')
+        self.assertIn('Found 1 newly overdue tasks, sent 1 reminders', out.getvalue())
+
+    def test_prune_reminders(self):
+        """Test sent reminders are pruned after the retention window"""
+        self.create_task('Due yesterday', -1)
+        self.create_task('Queued', -1, owner=self.other_user)
+        self.tick()
+        TaskReminder.objects.filter(title='Queued').update(sent_at=None)
+        self.assertEqual(prune_reminders(), 0)
+        self.assertEqual(prune_reminders(timezone.now() + timedelta(days=31)), 1)
+        self.assertEqual(list(TaskReminder.objects.values_list('title', flat=True)), ['Queued'])
+
+    def test_deleting_user_deletes_reminders(self):
+        """Test a deleted user's reminders go with them"""
+        self.create_task('Due yesterday', -1)
+        self.tick()
+        self.user.delete()
+        self.assertFalse(TaskReminder.objects.exists())
+
+    @skipUnless(connection.vendor == 'sqlite', 'Query plan assertions use SQLite EXPLAIN QUERY PLAN output')
+    def test_scans_use_index(self):
+        """Test the scheduler's task queries search the open tasks index, without sorting"""
+        open_tasks = Task.objects.filter(completed=False)
+        plans = [
+            open_tasks.filter(due_date=self.today, id__gt=10).order_by('id').values_list('id', 'owner_id', 'title')[:100],
+            open_tasks.filter(due_date__gt=self.today, due_date__lt=self.today + timedelta(days=9))
+            .order_by('due_date').values_list('due_date', flat=True)[:1],
+        ]
+        for queryset in plans:
+            plan = queryset.explain()
+            self.assertIn('task_open_due_id_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
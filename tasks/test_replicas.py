@@ -0,0 +1,146 @@
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from .cache import get_cache, modified_key
+from .models import Task
+from .routers import DatabaseRoutingMiddleware
+
+REPLICA = 'replica'
+
+
+@override_settings(TASK_READ_REPLICAS=[REPLICA], TASK_REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTest(TestCase):
+    """
+    Test cases for read-replica routing.
+
+    The replica is a second SQLite file holding different rows than the
+    primary, standing in for a replica that has not caught up yet, so every
+    response shows which database it was read from.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # The replica is added for this class only, after the test runner
+        # set up its databases, and rolled back after each test like them
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.settings[REPLICA] = {
+            **connections.settings['default'],
+            'NAME': str(Path(cls.directory.name) / 'replica.sqlite3'),
+        }
+        call_command('migrate', database=REPLICA, verbosity=0)
+        cls.databases = {'default', REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        cls.directory.cleanup()
+
+    def setUp(self):
+        """Set up different rows on the primary and the replica"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        User.objects.using(REPLICA).create(pk=self.user.pk, username='testuser', password=self.user.password)
+        Task.objects.create(title='Primary Task', due_date=date.today(), owner=self.user)
+        Task.objects.using(REPLICA).create(title='Replica Task', due_date=date.today(), owner_id=self.user.pk)
+        get_cache().clear()
+        self.client.force_login(self.user)
+        self.age_last_write()
+
+    def age_last_write(self):
+        # Last write longer ago than the sticky window; drop cached pages
+        # too, as they were read from wherever the writer was reading
+        get_cache().clear()
+        get_cache().set(modified_key(self.user.pk), time.time() - 60, None)
+
+    def api_titles(self, **params):
+        response = self.client.get('/api/tasks/', params)
+        self.assertEqual(response.status_code, 200)
+        return [task['title'] for task in response.data['results']]
+
+    def test_reads_go_to_replica(self):
+        """Test task reads in requests are served by the replica"""
+        self.assertEqual(self.api_titles(), ['Replica Task'])
+        response = self.client.get('/')
+        self.assertContains(response, 'Replica Task')
+        self.assertNotContains(response, 'Primary Task')
+
+    def test_search_on_replica(self):
+        """Test full-text search runs against the replica's index"""
+        self.assertEqual(self.api_titles(search='replica'), ['Replica Task'])
+        self.assertEqual(self.api_titles(search='primary'), [])
+
+    async def test_async_api_on_replica(self):
+        """Test the async API reads and searches the replica"""
+        await self.async_client.aforce_login(self.user)
+        for params in ({}, {'search': 'task'}):
+            response = await self.async_client.get('/api/async/tasks/', params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([task['title'] for task in response.json()['results']], ['Replica Task'])
+
+    def test_writes_go_to_primary(self):
+        """Test writes are sent to the primary"""
+        response = self.client.post('/api/tasks/', {'title': 'New Task', 'due_date': '2030-01-01'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Task.objects.using('default').filter(title='New Task').exists())
+        self.assertFalse(Task.objects.using(REPLICA).filter(title='New Task').exists())
+
+    def test_read_your_writes(self):
+        """Test a user reads from the primary for the sticky window after a write"""
+        self.client.post('/api/tasks/', {'title': 'New Task', 'due_date': '2030-01-01'})
+        self.assertEqual(self.api_titles(), ['Primary Task', 'New Task'])
+
+        self.age_last_write()
+        self.assertEqual(self.api_titles(), ['Replica Task'])
+
+    def test_sticky_per_user(self):
+        """Test another user's write does not move this user's reads to the primary"""
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.force_login(other)
+        self.client.post('/api/tasks/', {'title': 'Other Task', 'due_date': '2030-01-01'})
+        self.client.force_login(self.user)
+        self.assertEqual(self.api_titles(), ['Replica Task'])
+
+    def test_request_reads_after_its_own_write(self):
+        """Test a request that wrote reads its following queries from the primary"""
+        def view(request):
+            before = list(Task.objects.values_list('title', flat=True))
+            Task.objects.create(title='Written', due_date=date.today(), owner=self.user)
+            after = list(Task.objects.order_by('id').values_list('title', flat=True))
+            return HttpResponse(repr((before, after)))
+
+        request = RequestFactory().get('/')
+        request.user = self.user
+        response = DatabaseRoutingMiddleware(view)(request)
+        self.assertEqual(response.content.decode(), repr((['Replica Task'], ['Primary Task', 'Written'])))
+
+    def test_transactions_read_primary(self):
+        """Test reads inside a transaction use the primary"""
+        def view(request):
+            with transaction.atomic():
+                titles = list(Task.objects.values_list('title', flat=True))
+            return HttpResponse(repr(titles))
+
+        request = RequestFactory().get('/')
+        request.user = self.user
+        response = DatabaseRoutingMiddleware(view)(request)
+        self.assertEqual(response.content.decode(), repr(['Primary Task']))
+
+    def test_outside_requests_use_primary(self):
+        """Test commands and background work read from the primary"""
+        self.assertEqual(list(Task.objects.values_list('title', flat=True)), ['Primary Task'])
+
+    @override_settings(TASK_READ_REPLICAS=[])
+    def test_without_replicas(self):
+        """Test everything uses the primary when no replica is configured"""
+        self.assertEqual(self.api_titles(), ['Primary Task'])
@@ -0,0 +1,160 @@
+from unittest import mock
+
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.db import connection
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from datetime import date, timedelta
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from .models import Task
+from .search import SEARCH_RANK, get_search_backend, search_tasks
+
+
+class TaskFullTextSearchTest(TestCase):
+    """Test cases for the full-text search backend"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.title_match = Task.objects.create(
+            title='Quarterly report',
+            description='Numbers for the board',
+            due_date=date.today(),
+            owner=self.user
+        )
+        self.description_match = Task.objects.create(
+            title='Board meeting',
+            description='Present the quarterly report draft',
+            due_date=date.today() - timedelta(days=1),
+            owner=self.user
+        )
+        self.no_match = Task.objects.create(
+            title='Groceries',
+            description=None,
+            due_date=date.today(),
+            owner=self.user
+        )
+
+    def search(self, value):
+        queryset = search_tasks(Task.objects.filter(owner=self.user), value)
+        return list(queryset.order_by(SEARCH_RANK, 'id').values_list('title', flat=True))
+
+    def test_search_backend_available(self):
+        """Test the test database has a full-text index"""
+        self.assertIn(get_search_backend('default'), ('sqlite', 'postgresql'))
+
+    def test_search_matches_title_and_description(self):
+        """Test a term matches both titles and descriptions"""
+        self.assertCountEqual(self.search('report'), ['Quarterly report', 'Board meeting'])
+
+    def test_search_is_case_insensitive(self):
+        """Test matching ignores case"""
+        self.assertCountEqual(self.search('REPORT'), ['Quarterly report', 'Board meeting'])
+
+    def test_search_matches_word_prefixes(self):
+        """Test terms match the start of words"""
+        self.assertEqual(self.search('groc'), ['Groceries'])
+
+    def test_search_requires_all_terms(self):
+        """Test every term has to match"""
+        self.assertEqual(self.search('board draft'), ['Board meeting'])
+
+    def test_search_ranks_title_matches_first(self):
+        """Test title matches rank above description-only matches"""
+        self.assertEqual(self.search('quarterly'), ['Quarterly report', 'Board meeting'])
+
+    def test_search_punctuation_only(self):
+        """Test a query without word characters falls back to substring matching"""
+        self.assertEqual(self.search('!!'), [])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        """Test the index is kept in sync by updates and deletes"""
+        self.no_match.title = 'Renamed errand'
+        self.no_match.save()
+        self.assertEqual(self.search('errand'), ['Renamed errand'])
+        self.assertEqual(self.search('groceries'), [])
+
+        Task.objects.filter(pk=self.no_match.pk).update(description='pick up parcel')
+        self.assertEqual(self.search('parcel'), ['Renamed errand'])
+
+        self.no_match.delete()
+        self.assertEqual(self.search('errand'), [])
+
+    def test_search_index_follows_bulk_create(self):
+        """Test bulk inserted tasks are searchable"""
+        Task.objects.bulk_create([
+            Task(title=f'Imported {i}', due_date=date.today(), owner=self.user)
+            for i in range(3)
+        ])
+        self.assertEqual(len(self.search('imported')), 3)
+
+    def test_search_applied_once(self):
+        """Test searching an already searched queryset does not filter twice"""
+        queryset = search_tasks(Task.objects.all(), 'report')
+        self.assertIs(search_tasks(queryset, 'report'), queryset)
+
+    def test_search_fallback_without_index(self):
+        """Test searching without a full-text index uses substring matching"""
+        with mock.patch('tasks.search.get_search_backend', return_value=None):
+            self.assertCountEqual(self.search('port'), ['Quarterly report', 'Board meeting'])
+
+
+class TaskSearchViewsTest(APITestCase):
+    """Test cases for full-text search in the dashboard and the API"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        Task.objects.create(
+            title='Write documentation',
+            description='Explain the deploy process',
+            due_date=date.today() - timedelta(days=5),
+            owner=self.user
+        )
+        Task.objects.create(
+            title='Deploy release',
+            description='Ship it',
+            due_date=date.today() + timedelta(days=5),
+            owner=self.user
+        )
+
+    def test_api_search_ranked_by_relevance(self):
+        """Test API search results are ordered by relevance by default"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/tasks/', {'search': 'deploy'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [task['title'] for task in response.data['results']]
+        self.assertEqual(titles, ['Deploy release', 'Write documentation'])
+
+    def test_api_search_explicit_ordering(self):
+        """Test an explicit ordering overrides relevance"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/tasks/', {'search': 'deploy', 'ordering': 'due_date'})
+        titles = [task['title'] for task in response.data['results']]
+        self.assertEqual(titles, ['Write documentation', 'Deploy release'])
+
+    def test_api_search_single_match_condition(self):
+        """Test TaskFilter and the DRF search backend share one full-text filter"""
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/tasks/', {'search': 'deploy'})
+        results_sql = queries.captured_queries[-1]['sql']
+        if connection.vendor == 'sqlite':
+            self.assertEqual(results_sql.count(' MATCH '), 1)
+
+    def test_dashboard_search_ranked_by_relevance(self):
+        """Test dashboard search results are ordered by relevance"""
+        client = Client()
+        client.login(username='testuser', password='testpass123')
+        response = client.get(reverse('task_list'), {'search': 'deploy'})
+        titles = [task.title for task in response.context['tasks']]
+        self.assertEqual(titles, ['Deploy release', 'Write documentation'])
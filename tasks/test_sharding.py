@@ -0,0 +1,264 @@
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .cache import get_cache
+from .models import OverdueWatermark, Task, TaskReminder, TaskTombstone, UserShard, UserTaskCounters
+from .reminders import queue_reminders, run_scheduler
+from .sharding import SHARD_ID_RANGE, get_owner_shard, move_owner_tasks
+from .stats import TaskStats
+from .sync import encode_cursor, prune_tombstones
+
+SHARD = 'shard_1'
+
+
+class ShardingTest(TestCase):
+    """
+    Test cases for sharding tasks by owner.
+
+    Tasks are sharded over the default database and a second SQLite file,
+    so every test can check which database a task was written to.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # The shard is added for this class only, after the test runner set
+        # up its databases, and rolled back after each test like them
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.shards = override_settings(TASK_SHARDS=['default', SHARD])
+        cls.shards.enable()
+        connections.settings[SHARD] = {
+            **connections.settings['default'],
+            'NAME': str(Path(cls.directory.name) / 'shard.sqlite3'),
+        }
+        call_command('migrate', database=SHARD, verbosity=0)
+        cls.databases = {'default', SHARD}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[SHARD].close()
+        del connections[SHARD]
+        del connections.settings[SHARD]
+        cls.shards.disable()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        """Set up a user on each shard"""
+        get_cache().clear()
+        self.user = self.create_user('testuser', SHARD)
+        self.other_user = self.create_user('otheruser', 'default')
+        self.task = Task.objects.for_owner(self.user).create(
+            title='Sharded Task', due_date=date.today(), owner=self.user
+        )
+        self.other_task = Task.objects.for_owner(self.other_user).create(
+            title='Default Task', due_date=date.today(), owner=self.other_user
+        )
+        self.client.force_login(self.user)
+
+    def create_user(self, username, shard):
+        user = User.objects.create_user(username=username, password='testpass123')
+        UserShard.objects.filter(user=user).update(shard=shard)
+        get_cache().clear()
+        return user
+
+    def titles_on(self, shard):
+        return sorted(Task.objects.using(shard).values_list('title', flat=True))
+
+    def test_new_users_get_a_shard(self):
+        """Test new users are spread over the shards by id"""
+        users = [User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(4)]
+        for user in users:
+            expected = ['default', SHARD][user.pk % 2]
+            self.assertEqual(UserShard.objects.get(user=user).shard, expected)
+            self.assertEqual(get_owner_shard(user.pk), expected)
+
+    def test_users_without_entry_stay_on_default(self):
+        """Test users created before sharding keep their tasks on default"""
+        UserShard.objects.filter(user=self.other_user).delete()
+        get_cache().clear()
+        self.assertEqual(get_owner_shard(self.other_user.pk), 'default')
+
+    @override_settings(TASK_SHARDS=['default'])
+    def test_without_shards(self):
+        """Test everything uses the default database when tasks are not sharded"""
+        self.assertEqual(get_owner_shard(self.user.pk), 'default')
+
+    def test_tasks_stored_on_owner_shard(self):
+        """Test tasks are written to their owner's shard only"""
+        self.assertEqual(self.titles_on(SHARD), ['Sharded Task'])
+        self.assertEqual(self.titles_on('default'), ['Default Task'])
+
+    def test_shard_allocates_ids_from_its_range(self):
+        """Test a shard's task ids don't collide with the default database's"""
+        self.assertGreater(self.task.pk, SHARD_ID_RANGE)
+        self.assertLess(self.other_task.pk, SHARD_ID_RANGE)
+
+    def test_api_crud_on_shard(self):
+        """Test the task API reads and writes the requesting user's shard"""
+        response = self.client.post('/api/tasks/', {'title': 'New Task', 'due_date': '2030-01-01'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.titles_on(SHARD), ['New Task', 'Sharded Task'])
+
+        response = self.client.get('/api/tasks/')
+        self.assertEqual([task['title'] for task in response.json()['results']], ['Sharded Task', 'New Task'])
+        response = self.client.patch(f'/api/tasks/{self.task.pk}/', {'completed': True}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Task.objects.using(SHARD).get(pk=self.task.pk).completed)
+
+        response = self.client.delete(f'/api/tasks/{self.task.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.titles_on(SHARD), ['New Task'])
+        self.assertTrue(TaskTombstone.objects.using(SHARD).filter(task_id=self.task.pk).exists())
+        self.assertFalse(TaskTombstone.objects.using('default').exists())
+
+    def test_other_shard_tasks_hidden(self):
+        """Test a user cannot reach tasks stored with the same id on another shard"""
+        response = self.client.get(f'/api/tasks/{self.other_task.pk}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_on_shard(self):
+        """Test bulk create, update and delete run on the user's shard"""
+        response = self.client.post(
+            '/api/tasks/bulk/', [{'title': 'Bulk 1', 'due_date': '2030-01-01'}, {'title': 'Bulk 2', 'due_date': '2030-01-02'}],
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        ids = [task['id'] for task in response.json()]
+        response = self.client.patch(
+            '/api/tasks/bulk/', [{'id': pk, 'completed': True} for pk in ids], content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Task.objects.using(SHARD).filter(completed=True).count(), 2)
+
+        response = self.client.delete('/api/tasks/bulk/', {'ids': ids}, content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.titles_on(SHARD), ['Sharded Task'])
+        self.assertEqual(self.titles_on('default'), ['Default Task'])
+
+    def test_dashboard_and_stats_on_shard(self):
+        """Test the dashboard lists and counts the user's sharded tasks"""
+        response = self.client.get('/')
+        self.assertContains(response, 'Sharded Task')
+        self.assertNotContains(response, 'Default Task')
+        self.assertEqual(TaskStats.compute(self.user, date.today()).total, 1)
+
+    def test_counters_on_shard(self):
+        """Test task counters are kept in the owner's shard"""
+        Task.objects.for_owner(self.user).filter(pk=self.task.pk).update(completed=True)
+        self.assertEqual(UserTaskCounters.objects.using(SHARD).get(owner=self.user).completed, 1)
+        self.assertEqual(UserTaskCounters.objects.using('default').get().owner_id, self.other_user.pk)
+        self.user.delete()
+        self.assertFalse(UserTaskCounters.objects.using(SHARD).exists())
+
+    def test_task_owner_read_from_default(self):
+        """Test the owner of a sharded task is read from the default database"""
+        task = Task.objects.for_owner(self.user).get(pk=self.task.pk)
+        self.assertEqual(task._state.db, SHARD)
+        self.assertEqual(task.owner, self.user)
+        self.assertEqual([task.title for task in self.user.task_set.all()], ['Sharded Task'])
+
+    async def test_async_api_on_shard(self):
+        """Test the async API reads and writes the user's shard"""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            '/api/async/tasks/', {'title': 'Async Task', 'due_date': '2030-01-01'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        response = await self.async_client.get('/api/async/tasks/')
+        self.assertEqual([task['title'] for task in response.json()['results']], ['Sharded Task', 'Async Task'])
+        self.assertTrue(await Task.objects.using(SHARD).filter(title='Async Task').aexists())
+
+        await self.async_client.aforce_login(self.other_user)
+        response = await self.async_client.get('/api/async/tasks/', {'search': 'task'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task['title'] for task in response.json()['results']], ['Default Task'])
+
+    def test_deleting_user_deletes_sharded_tasks(self):
+        """Test deleting a user removes their tasks from their shard"""
+        Task.objects.for_owner(self.user).get(pk=self.task.pk).delete()
+        Task.objects.for_owner(self.user).create(title='Left', due_date=date.today(), owner=self.user)
+        self.user.delete()
+        self.assertEqual(self.titles_on(SHARD), [])
+        self.assertFalse(TaskTombstone.objects.using(SHARD).exists())
+        self.assertFalse(UserShard.objects.filter(user_id=self.user.pk).exists())
+
+    def test_prune_tombstones_on_every_shard(self):
+        """Test old tombstones are pruned from every shard"""
+        TaskTombstone.objects.using(SHARD).create(task_id=1, owner=self.user)
+        TaskTombstone.objects.using('default').create(task_id=2, owner=self.other_user)
+        self.assertEqual(prune_tombstones(now=timezone.now() + timedelta(days=365)), 2)
+
+    def test_reminders_on_every_shard(self):
+        """Test the overdue scheduler queues reminders in each shard, and moves keep them"""
+        tomorrow = date.today() + timedelta(days=1)
+        self.assertEqual(queue_reminders(SHARD, tomorrow) + queue_reminders('default', tomorrow), 2)
+        self.assertEqual(TaskReminder.objects.using(SHARD).get().task_id, self.task.pk)
+        self.assertEqual(OverdueWatermark.objects.using(SHARD).get().task_id, self.task.pk)
+
+        move_owner_tasks(self.user, 'default')
+        moved = Task.objects.for_owner(self.user).get()
+        self.assertFalse(TaskReminder.objects.using(SHARD).exists())
+        self.assertEqual(
+            sorted(TaskReminder.objects.using('default').values_list('task_id', flat=True)),
+            [self.other_task.pk, moved.pk],
+        )
+        notifier = mock.Mock()
+        # The moved task is found again on its new shard, but not queued twice
+        self.assertEqual(run_scheduler(notifier, tomorrow), (1, 2))
+        self.user.delete()
+        self.assertEqual(TaskReminder.objects.using('default').count(), 1)
+
+    def test_move_owner_tasks(self):
+        """Test moving a user copies their tasks and tombstones to the new shard"""
+        TaskTombstone.objects.using(SHARD).create(task_id=1, owner=self.user)
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Task.objects.using(SHARD).filter(pk=self.task.pk).update(created_at=hour_ago, updated_at=hour_ago)
+        since = encode_cursor(hour_ago + timedelta(minutes=1))
+        self.assertEqual(move_owner_tasks(self.user, 'default'), 1)
+
+        self.assertEqual(get_owner_shard(self.user.pk), 'default')
+        self.assertEqual(UserShard.objects.get(user=self.user).shard, 'default')
+        self.assertEqual(self.titles_on(SHARD), [])
+        self.assertFalse(TaskTombstone.objects.using(SHARD).exists())
+        self.assertEqual(self.titles_on('default'), ['Default Task', 'Sharded Task'])
+        self.assertFalse(UserTaskCounters.objects.using(SHARD).exists())
+        self.assertEqual(TaskStats.compute(self.user, date.today()).total, 1)
+
+        moved = Task.objects.for_owner(self.user).get()
+        self.assertNotEqual(moved.pk, self.task.pk)
+        self.assertEqual(moved.created_at, hour_ago)
+        response = self.client.get('/api/tasks/changes/', {'since': since})
+        self.assertEqual(response.json()['created'], [])
+        self.assertEqual([task['id'] for task in response.json()['updated']], [moved.pk])
+        self.assertEqual(response.json()['deleted'], [1, self.task.pk])
+        response = self.client.get('/api/tasks/')
+        self.assertEqual([task['title'] for task in response.json()['results']], ['Sharded Task'])
+
+    def test_rebalance_command(self):
+        """Test rebalance_shards moves users and skips those already there"""
+        out = StringIO()
+        call_command('rebalance_shards', 'testuser', 'otheruser', '--to', SHARD, stdout=out)
+        self.assertIn('testuser is already on shard_1', out.getvalue())
+        self.assertIn('Moved 1 tasks of otheruser from default to shard_1', out.getvalue())
+        self.assertEqual(self.titles_on(SHARD), ['Default Task', 'Sharded Task'])
+
+    def test_rebalance_command_errors(self):
+        """Test rebalance_shards rejects unknown shards and users"""
+        with self.assertRaisesMessage(CommandError, "Unknown shard 'nowhere'"):
+            call_command('rebalance_shards', 'testuser', '--to', 'nowhere')
+        with self.assertRaisesMessage(CommandError, "User 'nobody' does not exist"):
+            call_command('rebalance_shards', 'nobody', '--to', SHARD)
+        with override_settings(TASK_SHARDS=['default']):
+            with self.assertRaisesMessage(CommandError, 'not sharded'):
+                call_command('rebalance_shards', 'testuser', '--to', 'default')
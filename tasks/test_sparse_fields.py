@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+from unittest import skipIf, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from .models import Task
+from .renderers import msgpack
+
+
+class TaskSparseFieldsTest(APITestCase):
+    """Test cases for sparse fieldsets, the columnar layout and MessagePack responses"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.tasks = Task.objects.bulk_create([
+            Task(
+                title=f'Task {i}',
+                description='A long description ' * 20,
+                due_date=date(2030, 1, 1) + timedelta(days=i),
+                completed=i % 2 == 0,
+                owner=self.user,
+            )
+            for i in range(25)
+        ])
+        self.task = self.tasks[0]
+        self.client.force_authenticate(user=self.user)
+
+    def task_queries(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries if 'FROM "tasks_task"' in query['sql']]
+
+    def test_list_fields(self):
+        """Test ?fields= narrows list items and the SELECT, in serializer order"""
+        response, queries = self.task_queries('/api/tasks/', {'fields': 'title, id'})
+        self.assertEqual(response.data['results'][0], {'id': self.task.pk, 'title': 'Task 0'})
+        self.assertEqual(response.data['count'], 25)
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertNotIn('"description"', sql)
+
+    def test_retrieve_fields(self):
+        """Test ?fields= narrows a single task and its SELECT"""
+        response, queries = self.task_queries(f'/api/tasks/{self.task.pk}/', {'fields': 'completed,due_date'})
+        self.assertEqual(response.data, {'due_date': '2030-01-01', 'completed': True})
+        for sql in queries:
+            self.assertNotIn('"description"', sql)
+
+    def test_unknown_fields(self):
+        """Test unknown field names are rejected"""
+        response = self.client.get('/api/tasks/', {'fields': 'id,owner,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['fields'],
+            ['Unknown field(s): owner, secret. Choose from: id, title, description, due_date, completed.'],
+        )
+
+    def test_writes_return_all_fields(self):
+        """Test ?fields= does not narrow what writes validate and return"""
+        response = self.client.post('/api/tasks/?fields=id', {'title': 'New Task', 'due_date': '2030-01-01'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(set(response.data), {'id', 'title', 'description', 'due_date', 'completed'})
+
+    def test_retrieve_etag_per_fieldset(self):
+        """Test each fieldset of a task has its own ETag"""
+        url = f'/api/tasks/{self.task.pk}/'
+        full = self.client.get(url)
+        sparse = self.client.get(url, {'fields': 'id'})
+        self.assertNotEqual(full['ETag'], sparse['ETag'])
+        response = self.client.get(url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=full['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_columns_layout(self):
+        """Test ?layout=columns returns one array per field"""
+        objects = self.client.get('/api/tasks/').data['results']
+        response = self.client.get('/api/tasks/', {'layout': 'columns'})
+        self.assertEqual(response.status_code, 200)
+        columns = response.data['results']
+        self.assertEqual(list(columns), ['id', 'title', 'description', 'due_date', 'completed'])
+        self.assertEqual(columns['due_date'], [task['due_date'] for task in objects])
+        self.assertEqual(columns['id'], [task['id'] for task in objects])
+        self.assertLess(len(response.content), len(self.client.get('/api/tasks/').content))
+
+    def test_columns_layout_with_fields(self):
+        """Test the columnar layout combines with sparse fieldsets and keyset pages"""
+        ids = []
+        url = '/api/tasks/?pagination=cursor&fields=title&layout=columns&ordering=-due_date'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.data['results']), ['title'])
+            ids += response.data['results']['title']
+            url = response.data['next']
+        self.assertEqual(ids, [f'Task {i}' for i in reversed(range(25))])
+
+    def test_empty_columns(self):
+        """Test an empty page still names its columns"""
+        response = self.client.get('/api/tasks/', {'layout': 'columns', 'fields': 'id,title', 'search': 'nothing'})
+        self.assertEqual(response.data['results'], {'id': [], 'title': []})
+
+    def test_invalid_layout(self):
+        """Test unknown layouts are rejected"""
+        response = self.client.get('/api/tasks/', {'layout': 'rows'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('layout', response.data)
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack(self):
+        """Test MessagePack responses carry the same data as JSON"""
+        response = self.client.get('/api/tasks/', {'fields': 'id,due_date'}, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get('/api/tasks/', {'fields': 'id,due_date'}).json())
+
+    @skipIf(msgpack, 'msgpack is installed')
+    def test_msgpack_not_offered(self):
+        """Test MessagePack is not offered without msgpack"""
+        response = self.client.get('/api/tasks/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 406)
@@ -0,0 +1,191 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from taskmanager.database import database_from_env
+
+WRITERS = 8
+READERS = 4
+WRITES_PER_WRITER = 25
+
+
+class SQLiteTuningTest(SimpleTestCase):
+    """
+    Test cases for the DATABASE_SQLITE_TUNING profile.
+
+    They run against a scratch database file: the test database is in
+    memory, where WAL and file locking do not apply.
+    """
+    # The scratch database's alias; the test database itself is not used
+    databases = {'default'}
+
+    def setUp(self):
+        """Create a scratch database file with the tuned settings"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        database = database_from_env({
+            'DATABASE_URL': f'sqlite:///{Path(directory.name) / "tuning.sqlite3"}',
+            'DATABASE_SQLITE_TUNING': '1',
+            'DATABASE_CONN_MAX_AGE': '0',
+        }, directory.name)
+        self.handler = ConnectionHandler({'default': database})
+        self.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)')
+        self.addCleanup(self.handler.close_all)
+
+    def connection(self):
+        # One connection per thread, like request handlers
+        return self.handler['default']
+
+    def execute(self, sql, params=()):
+        with self.connection().cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def write_transaction(self, *statements):
+        """
+        Run ``statements`` in one transaction, the way ``atomic`` starts it
+        """
+        connection = self.connection()
+        connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        try:
+            for sql, params in statements:
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.set_autocommit(True)
+
+    def in_thread(self, func, *args):
+        errors = []
+
+        def run():
+            try:
+                func(*args)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                self.connection().close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread, errors
+
+    def test_options(self):
+        """Test the profile is opt-in and sets pragmas, transaction mode and busy timeout"""
+        self.assertNotIn('OPTIONS', database_from_env({}, '/srv'))
+        options = database_from_env({'DATABASE_SQLITE_TUNING': 'true', 'DATABASE_SQLITE_BUSY_TIMEOUT': '5'}, '/srv')['OPTIONS']
+        self.assertIn('PRAGMA journal_mode=WAL', options['init_command'])
+        self.assertEqual(options['transaction_mode'], 'IMMEDIATE')
+        self.assertEqual(options['timeout'], 5.0)
+
+        # Not applied to PostgreSQL
+        database = database_from_env({'DATABASE_URL': 'postgres://localhost/tasks', 'DATABASE_SQLITE_TUNING': '1'}, '/srv')
+        self.assertEqual(database['OPTIONS'], {})
+
+    def test_pragmas_applied_to_new_connections(self):
+        """Test every new connection gets the tuned pragmas"""
+        for _ in range(2):
+            self.assertEqual(self.execute('PRAGMA journal_mode'), [('wal',)])
+            self.assertEqual(self.execute('PRAGMA synchronous'), [(1,)])
+            self.assertEqual(self.execute('PRAGMA cache_size'), [(-65536,)])
+            self.assertEqual(self.execute('PRAGMA busy_timeout'), [(20000,)])
+            self.assertEqual(self.execute('PRAGMA temp_store'), [(2,)])
+            self.connection().close()
+
+    def test_reads_not_blocked_by_writer(self):
+        """Test reads proceed, seeing committed data, while a write transaction is open"""
+        self.execute('INSERT INTO counter (value) VALUES (1)')
+        writing = threading.Event()
+        release = threading.Event()
+
+        def write():
+            connection = self.connection()
+            connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            with connection.cursor() as cursor:
+                cursor.execute('UPDATE counter SET value = 2')
+            writing.set()
+            release.wait(5)
+            connection.commit()
+            connection.set_autocommit(True)
+
+        thread, errors = self.in_thread(write)
+        self.assertTrue(writing.wait(5))
+        started = time.perf_counter()
+        self.assertEqual(self.execute('SELECT value FROM counter'), [(1,)])
+        self.assertLess(time.perf_counter() - started, 1)
+        release.set()
+        thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.execute('SELECT value FROM counter'), [(2,)])
+
+    def test_concurrent_readers_and_writers(self):
+        """Stress test: concurrent read-then-write transactions never fail with "database is locked" """
+        self.execute('INSERT INTO counter (value) VALUES (0)')
+        stop = threading.Event()
+        reads = []
+
+        def write():
+            for _ in range(WRITES_PER_WRITER):
+                # Reads before writing, which fails a deferred transaction
+                # that another writer got ahead of
+                self.write_transaction(
+                    ('SELECT value FROM counter', ()),
+                    ('UPDATE counter SET value = value + 1', ()),
+                )
+
+        def read():
+            while not stop.is_set():
+                self.execute('SELECT COUNT(*), MAX(value) FROM counter')
+                reads.append(1)
+
+        readers = [self.in_thread(read) for _ in range(READERS)]
+        writers = [self.in_thread(write) for _ in range(WRITERS)]
+        for thread, _ in writers:
+            thread.join()
+        stop.set()
+        for thread, _ in readers:
+            thread.join()
+
+        errors = [error for _, thread_errors in readers + writers for error in thread_errors]
+        self.assertEqual(errors, [])
+        self.assertEqual(self.execute('SELECT value FROM counter'), [(WRITERS * WRITES_PER_WRITER,)])
+        self.assertGreater(len(reads), 0)
+
+    def test_deferred_transactions_fail_without_profile(self):
+        """Test the failure the profile prevents: a deferred read-then-write transaction losing the race"""
+        self.handler = ConnectionHandler({'default': {
+            **self.connection().settings_dict, 'OPTIONS': {'timeout': 5},
+        }})
+        self.execute('PRAGMA journal_mode=WAL')
+        self.execute('INSERT INTO counter (value) VALUES (0)')
+        read_done = threading.Event()
+        release = threading.Event()
+
+        def write():
+            connection = self.connection()
+            connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT value FROM counter')
+                read_done.set()
+                release.wait(5)
+                cursor.execute('UPDATE counter SET value = value + 1')
+            connection.commit()
+            connection.set_autocommit(True)
+
+        thread, errors = self.in_thread(write)
+        self.assertTrue(read_done.wait(5))
+        # Another writer commits after the transaction's snapshot was taken
+        self.execute('UPDATE counter SET value = 10')
+        release.set()
+        thread.join()
+        # The busy timeout cannot help: the snapshot is stale
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], OperationalError)
@@ -0,0 +1,142 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from datetime import date, timedelta
+from io import StringIO
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from .models import Task, TaskTombstone
+from .sync import encode_cursor
+
+
+@override_settings(TASK_SYNC_CURSOR_OVERLAP_SECONDS=0)
+class TaskAPISyncTest(APITestCase):
+    """Test cases for the /api/tasks/changes/ delta sync endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.task = Task.objects.create(
+            title='Synced Task',
+            due_date=date.today() + timedelta(days=1),
+            owner=self.user
+        )
+        # Pretend the existing task was synced an hour ago
+        self.hour_ago = timezone.now() - timedelta(hours=1)
+        Task.objects.filter(pk=self.task.pk).update(created_at=self.hour_ago, updated_at=self.hour_ago)
+        self.task.refresh_from_db()
+        self.since = encode_cursor(self.hour_ago + timedelta(minutes=1))
+        self.client.force_authenticate(user=self.user)
+
+    def changes(self, since=None):
+        params = {} if since is None else {'since': since}
+        response = self.client.get('/api/tasks/changes/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_initial_sync_returns_all_tasks(self):
+        """Test a sync without a cursor returns every task as created"""
+        Task.objects.create(title='Other', due_date=date.today(), owner=self.other_user)
+        data = self.changes()
+        self.assertEqual([t['id'] for t in data['created']], [self.task.pk])
+        self.assertEqual(data['updated'], [])
+        self.assertEqual(data['deleted'], [])
+        self.assertTrue(data['cursor'].isdigit())
+
+    def test_no_changes(self):
+        """Test nothing is returned when nothing changed since the cursor"""
+        data = self.changes(self.since)
+        self.assertEqual((data['created'], data['updated'], data['deleted']), ([], [], []))
+
+    def test_created_updated_deleted(self):
+        """Test new, modified and deleted tasks are reported separately"""
+        new = Task.objects.create(title='New', due_date=date.today(), owner=self.user)
+        gone = Task.objects.create(title='Gone', due_date=date.today(), owner=self.user)
+        Task.objects.filter(pk=gone.pk).update(created_at=self.hour_ago, updated_at=self.hour_ago)
+        self.task.completed = True
+        self.task.save()
+        gone_id = gone.pk
+        gone.delete()
+
+        data = self.changes(self.since)
+        self.assertEqual([t['id'] for t in data['created']], [new.pk])
+        self.assertEqual([t['id'] for t in data['updated']], [self.task.pk])
+        self.assertTrue(data['updated'][0]['completed'])
+        self.assertEqual(data['deleted'], [gone_id])
+
+    def test_cursor_advances(self):
+        """Test changes before the returned cursor are not sent again"""
+        Task.objects.create(title='New', due_date=date.today(), owner=self.user)
+        cursor = self.changes(self.since)['cursor']
+        data = self.changes(cursor)
+        self.assertEqual((data['created'], data['updated'], data['deleted']), ([], [], []))
+
+    def test_bulk_changes_reported(self):
+        """Test bulk updates and deletes show up in the delta"""
+        self.client.patch('/api/tasks/bulk/', [{'id': self.task.pk, 'title': 'Bulk'}], format='json')
+        data = self.changes(self.since)
+        self.assertEqual([t['title'] for t in data['updated']], ['Bulk'])
+
+        self.client.delete('/api/tasks/bulk/', {'ids': [self.task.pk]}, format='json')
+        data = self.changes(self.since)
+        self.assertEqual(data['updated'], [])
+        self.assertEqual(data['deleted'], [self.task.pk])
+
+    def test_other_users_changes_hidden(self):
+        """Test other users' changes and deletions are not reported"""
+        other = Task.objects.create(title='Other', due_date=date.today(), owner=self.other_user)
+        other.delete()
+        data = self.changes(self.since)
+        self.assertEqual((data['created'], data['updated'], data['deleted']), ([], [], []))
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get('/api/tasks/changes/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('since', response.data)
+
+    def test_out_of_range_cursor(self):
+        """Test a cursor too far in the future to be a date is rejected"""
+        for since in ('99999999999999999999999999', '9' * 400):
+            response = self.client.get('/api/tasks/changes/', {'since': since})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('since', response.data)
+
+    @override_settings(TASK_TOMBSTONE_RETENTION_DAYS=1)
+    def test_expired_cursor(self):
+        """Test a cursor older than the tombstone retention gets a 410"""
+        since = encode_cursor(timezone.now() - timedelta(days=2))
+        response = self.client.get('/api/tasks/changes/', {'since': since})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_deleting_user_leaves_no_tombstones(self):
+        """Test tasks removed along with their owner are not tombstoned"""
+        self.user.delete()
+        self.assertFalse(TaskTombstone.objects.exists())
+
+    @override_settings(TASK_TOMBSTONE_RETENTION_DAYS=1)
+    def test_prune_tombstones(self):
+        """Test the prune_tombstones command removes only expired tombstones"""
+        old = TaskTombstone.objects.create(task_id=1, owner=self.user)
+        TaskTombstone.objects.filter(pk=old.pk).update(deleted_at=timezone.now() - timedelta(days=2))
+        TaskTombstone.objects.create(task_id=2, owner=self.user)
+
+        out = StringIO()
+        call_command('prune_tombstones', stdout=out)
+        self.assertIn('Deleted 1 tombstones', out.getvalue())
+        self.assertEqual(list(TaskTombstone.objects.values_list('task_id', flat=True)), [2])
+
+    def test_requires_authentication(self):
+        """Test the changes endpoint requires authentication"""
+        self.client.force_authenticate(user=None)
+        response = self.client.get('/api/tasks/changes/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
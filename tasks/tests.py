@@ -1,18 +1,73 @@
 # Import all test classes
-from .test_models_views import TaskModelTest, TaskViewsTest
+from .test_models_views import TaskModelTest, TaskViewsTest, TaskStatsTest, TaskPaginationTest
 from .test_filtering_auth import TaskFilteringTest, AuthenticationTest
-from .test_api import TaskAPITest, TaskAPIFilteringTest
+from .test_api import TaskAPITest, TaskAPIFilteringTest, TaskAPICursorPaginationTest, TaskAPIBulkTest
 from .test_serializers_forms import TaskSerializerTest, TaskFilterTest, CustomUserCreationFormTest
+from .test_query_plans import TaskQueryPlanTest
+from .test_search import TaskFullTextSearchTest, TaskSearchViewsTest
+from .test_cache import TaskCacheTest, TaskAPICacheTest
+from .test_conditional import TaskAPIConditionalGetTest, TaskListConditionalGetTest
+from .test_sync import TaskAPISyncTest
+from .test_export import TaskAPIExportTest, ExportTasksCommandTest
+from .test_import import TaskImporterTest, TaskAPIImportTest, ImportTasksCommandTest
+from .test_query_budget import TaskViewsQueryBudgetTest, TaskAPIQueryBudgetTest, QueryBudgetEnforcementTest
+from .test_metrics import MetricsTest
+from .test_async_api import TaskAsyncAPITest
+from .test_events import TaskEventsTest
+from .test_database import DatabaseConfigTest, HealthCheckTest
+from .test_sqlite_tuning import SQLiteTuningTest
+from .test_replicas import ReplicaRoutingTest
+from .test_sharding import ShardingTest
+from .test_fast_read import TaskFastReadTest
+from .test_sparse_fields import TaskSparseFieldsTest
+from .test_counters import TaskCountersTest, TaskAPICountersTest
+from .test_jobs import JobQueueTest, JobAPITest
+from .test_reminders import TaskReminderTest
 
 # Make all test classes available when running tests
 __all__ = [
     'TaskModelTest',
     'TaskViewsTest', 
+    'TaskStatsTest',
+    'TaskPaginationTest',
     'TaskFilteringTest',
     'AuthenticationTest',
     'TaskAPITest',
     'TaskAPIFilteringTest',
+    'TaskAPICursorPaginationTest',
+    'TaskAPIBulkTest',
     'TaskSerializerTest',
     'TaskFilterTest',
     'CustomUserCreationFormTest',
+    'TaskQueryPlanTest',
+    'TaskFullTextSearchTest',
+    'TaskSearchViewsTest',
+    'TaskCacheTest',
+    'TaskAPICacheTest',
+    'TaskAPIConditionalGetTest',
+    'TaskListConditionalGetTest',
+    'TaskAPISyncTest',
+    'TaskAPIExportTest',
+    'ExportTasksCommandTest',
+    'TaskImporterTest',
+    'TaskAPIImportTest',
+    'ImportTasksCommandTest',
+    'TaskViewsQueryBudgetTest',
+    'TaskAPIQueryBudgetTest',
+    'QueryBudgetEnforcementTest',
+    'MetricsTest',
+    'TaskAsyncAPITest',
+    'TaskEventsTest',
+    'DatabaseConfigTest',
+    'HealthCheckTest',
+    'SQLiteTuningTest',
+    'ReplicaRoutingTest',
+    'ShardingTest',
+    'TaskFastReadTest',
+    'TaskSparseFieldsTest',
+    'TaskCountersTest',
+    'TaskAPICountersTest',
+    'JobQueueTest',
+    'JobAPITest',
+    'TaskReminderTest',
 ]
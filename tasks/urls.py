@@ -4,12 +4,14 @@ from django.urls import path
 from .views import (
     SignUpView,
     TaskListView,
+    TaskListFragmentView,
     TaskCreateView,
     TaskUpdateView,
     TaskDeleteView
 )
 urlpatterns = [
     path('', TaskListView.as_view(), name='task_list'),
+    path('task/fragment/', TaskListFragmentView.as_view(), name='task_list_fragment'),
     path('signup/', SignUpView.as_view(), name='signup'),
     path('task/create/', TaskCreateView.as_view(), name='task_create'),
     path('task/<int:pk>/update/', TaskUpdateView.as_view(), name='task_update'),
@@ -1,20 +1,45 @@
 # tasks/views.py
 
+import io
+
 from django.shortcuts import render
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
-from rest_framework import viewsets
+from django.core.paginator import Page
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework import mixins, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import Throttled
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
 
-from .models import Task
+from .models import Job, Task
 from .forms import CustomUserCreationForm
-from .serializes import TaskSerializer
+from .serializes import JobSerializer, TaskSerializer, strict_int
+from .cache import cached_for_user
+from .conditional import not_modified, set_validators, task_validators, user_list_validators
+from .export import EXPORT_FORMATS, export_tasks
+from .importer import ImportFileError, ImportInterrupted, RECORD_READERS, guess_format, import_tasks
+from .jobs import TooManyJobs, cancel_job, enqueue, get_filterset, get_storage, job_filter_params, save_job_file
 from .filters import TaskFilter
+from .pagination import TaskPagination
+from .renderers import CSVRenderer, FastJSONRenderer, NDJSONRenderer, get_optional_renderers
+from .search import SEARCH_RANK, search_tasks
+from .sharding import get_owner_shard
+from .stats import TaskStats
+from .sync import CursorExpired, InvalidCursor, get_changes
 
 
 class SignUpView(CreateView):
+    # Username check, insert
+    query_budget = 4
     form_class = CustomUserCreationForm
     success_url = reverse_lazy('login')
     template_name = 'registration/signup.html'
@@ -25,13 +50,24 @@ class TaskListView(LoginRequiredMixin, ListView):
     model = Task
     template_name = 'task/task_list.html'
     context_object_name = 'tasks'
+    paginate_by = 20
+    # Session, user, count, page, stats (+ FTS lookup on the first search);
+    # must not grow with the page size
+    query_budget = 6
+
+    def get(self, request, *args, **kwargs):
+        # Answer revalidations with 304 before running any query
+        etag, last_modified = user_list_validators(request, 'dashboard', page=True)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(super().get(request, *args, **kwargs), etag, last_modified)
 
     def get_queryset(self):
-        from django.db.models import Q
         from django.utils import timezone
         
         # Start with user's tasks
-        queryset = Task.objects.filter(owner=self.request.user)
+        queryset = Task.objects.for_owner(self.request.user)
         
         # Get filter parameters
         search = self.request.GET.get('search')
@@ -39,12 +75,9 @@ class TaskListView(LoginRequiredMixin, ListView):
         overdue = self.request.GET.get('overdue')
         ordering = self.request.GET.get('ordering')
         
-        # Apply search filter
+        # Apply full-text search filter
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search)
-            )
+            queryset = search_tasks(queryset, search)
         
         # Apply completion status filter
         if completed == 'true':
@@ -59,38 +92,86 @@ class TaskListView(LoginRequiredMixin, ListView):
                 completed=False
             )
         
-        # Apply ordering
+        # Apply ordering (id breaks ties so pages don't overlap);
+        # search results default to relevance order
         if ordering:
-            queryset = queryset.order_by(ordering)
+            queryset = queryset.order_by(ordering, 'id')
+        elif search:
+            queryset = queryset.order_by(SEARCH_RANK, 'id')
         else:
-            queryset = queryset.order_by('due_date')
+            queryset = queryset.order_by('due_date', 'id')
         
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        from django.utils import timezone
+
+        # Cache the rows and total count of each page until the user's
+        # tasks change, then rebuild the page objects around them
+        def get_page():
+            paginator, page, object_list, is_paginated = super(TaskListView, self).paginate_queryset(queryset, page_size)
+            return paginator.count, page.number, list(object_list)
+
+        parts = (self.request.GET.urlencode(), timezone.now().date())
+        count, number, tasks = cached_for_user(self.request.user, 'dashboard', parts, get_page)
+
+        paginator = self.get_paginator(
+            queryset,
+            page_size,
+            orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty(),
+        )
+        paginator.count = count
+        page = Page(tasks, number, paginator)
+        return paginator, page, tasks, paginator.num_pages > 1
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         from django.utils import timezone
         
-        # Get all user's tasks for stats (not filtered)
-        all_tasks = Task.objects.filter(owner=self.request.user)
-        
-        # Calculate stats
-        context['total_tasks'] = all_tasks.count()
-        context['completed_tasks'] = all_tasks.filter(completed=True).count()
-        context['incomplete_tasks'] = all_tasks.filter(completed=False).count()
-        context['overdue_tasks'] = all_tasks.filter(
-            due_date__lt=timezone.now().date(),
-            completed=False
-        ).count()
-        context['today'] = timezone.now().date()
+        today = timezone.now().date()
+        context.update(self.get_stats_context(today))
+        context['today'] = today
         
         return context
 
+    def get_stats_context(self, today):
+        # Stats cover all of the user's tasks (not filtered), in one query
+        stats = TaskStats.for_user(self.request.user, today=today)
+        return {
+            'total_tasks': stats.total,
+            'completed_tasks': stats.completed,
+            'incomplete_tasks': stats.incomplete,
+            'overdue_tasks': stats.overdue,
+        }
+
+class TaskListFragmentView(TaskListView):
+    """
+    Rendered task cards for one page of the dashboard, used by "Load More".
+    """
+    template_name = 'task/_task_cards.html'
+    query_budget = 5
+
+    def get_stats_context(self, today):
+        # The fragment only contains cards, so skip the stats query
+        return {}
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        page_obj = context['page_obj']
+        if page_obj.has_next():
+            query = self.request.GET.copy()
+            query['page'] = page_obj.next_page_number()
+            response['X-Next-Page'] = f'{self.request.path}?{query.urlencode()}'
+        return response
+
 class TaskCreateView(LoginRequiredMixin, CreateView):
     model = Task
     fields = ['title', 'description', 'due_date'] # Fields the user can fill out
     template_name = 'task/task_form.html'
     success_url = reverse_lazy('task_list')
+    # Session, user, insert, counters (2)
+    query_budget = 5
 
     def form_valid(self, form):
         # Before saving the form, set the owner to the current user.
@@ -102,32 +183,402 @@ class TaskUpdateView(LoginRequiredMixin, UpdateView):
     fields = ['title', 'description', 'due_date', 'completed'] # Allow updating the completed status
     template_name = 'task/task_form.html'
     success_url = reverse_lazy('task_list')
+    # Session, user, task, update, counters (2)
+    query_budget = 6
 
     def get_queryset(self):
         # Ensure the user can only update their own tasks.
-        return Task.objects.filter(owner=self.request.user)
+        return Task.objects.for_owner(self.request.user)
 
 class TaskDeleteView(LoginRequiredMixin, DeleteView):
     model = Task
     template_name = 'task/task_confirm_delete.html'
     success_url = reverse_lazy('task_list')
+    # Session, user, task, delete, tombstone, counters (2)
+    query_budget = 7
 
     def get_queryset(self):
         # Ensure the user can only delete their own tasks.
-        return Task.objects.filter(owner=self.request.user)
+        return Task.objects.for_owner(self.request.user)
 
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
     filterset_class = TaskFilter
+    pagination_class = TaskPagination
+    # Same bytes as DRF's JSONRenderer, faster with orjson installed;
+    # MessagePack with msgpack installed
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer, *get_optional_renderers()]
+    # Sparse fieldsets (?fields=id,title) of list and retrieve responses,
+    # and the columnar layout of lists (?layout=columns: one array per
+    # field instead of one object per task)
+    fields_query_param = 'fields'
+    sparse_actions = ('list', 'retrieve')
+    layout_query_param = 'layout'
+    layouts = ('objects', 'columns')
+    bulk_max_items = 1000
     search_fields = ['title', 'description']
     ordering_fields = ['due_date', 'title', 'created_at']
     ordering = ['due_date']
+    # Per action, including session authentication (2 queries); the first
+    # search of a process also looks up the FTS table. Writes also update
+    # the owner's counters (2 queries). Bulk actions are sized for
+    # bulk_max_items, which SQLite's parameter limit splits into up to ten
+    # statements per write. Imports run one insert per batch by design, so
+    # are not budgeted.
+    query_budgets = {
+        'list': 5,
+        'retrieve': 4,
+        'create': 5,
+        'update': 6,
+        'partial_update': 6,
+        'destroy': 7,
+        'bulk': 30,
+        'export': 2,
+        'import_file': None,
+        'changes': 4,
+        'stats': 3,
+    }
 
     def get_queryset(self):
         # Ensure users can only see and manage their own tasks
-        return Task.objects.filter(owner=self.request.user)
+        queryset = Task.objects.for_owner(self.request.user)
+        fields = self.get_requested_fields()
+        if fields is not None:
+            # Don't read the columns of the fields left out
+            reader = self.get_serializer_class().get_row_reader(fields)
+            if reader is not None:
+                queryset = queryset.only(*reader.values())
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def get_requested_fields(self):
+        """
+        The field names asked for with ?fields=, or None for all of them
+        """
+        if self.action not in self.sparse_actions:
+            return None
+        value = self.request.query_params.get(self.fields_query_param, '')
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        if not names:
+            return None
+        try:
+            return self.get_serializer_class().validate_field_names(names)
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({self.fields_query_param: exc.detail})
+
+    def get_layout(self):
+        layout = self.request.query_params.get(self.layout_query_param, self.layouts[0])
+        if layout not in self.layouts:
+            raise serializers.ValidationError({self.layout_query_param: [f"Choose from: {', '.join(self.layouts)}."]})
+        return layout
+
+    def list(self, request, *args, **kwargs):
+        from django.utils import timezone
+
+        # Answer revalidations with 304 before running any query
+        etag, last_modified = user_list_validators(request, 'api-list')
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        # Paginated responses are cached per user and query string
+        parts = (request.build_absolute_uri(), timezone.now().date())
+        data = cached_for_user(
+            request.user,
+            'api-list',
+            parts,
+            lambda: self.list_data(request, *args, **kwargs),
+        )
+        return set_validators(Response(data), etag, last_modified)
+
+    def list_data(self, request, *args, **kwargs):
+        """
+        The list response data, built from ``.values()`` rows of the
+        serialized columns rather than from model instances
+        """
+        columnar = self.get_layout() == 'columns'
+        reader = self.get_serializer_class().get_row_reader(self.get_requested_fields())
+        if reader is None:
+            data = super().list(request, *args, **kwargs).data
+            if columnar:
+                names = list(self.get_serializer().fields)
+                data['results'] = {name: [item[name] for item in data['results']] for name in names}
+            return data
+
+        queryset = self.filter_queryset(self.get_queryset()).values(*reader.values())
+        represent = reader.represent_columns if columnar else reader.represent
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return represent(queryset)
+        return self.get_paginated_response(represent(page)).data
+
+    def retrieve(self, request, *args, **kwargs):
+        # Only the updated_at column is needed to answer a revalidation
+        try:
+            updated_at = self.get_queryset().filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            updated_at = None
+        if updated_at is None:
+            # Let the regular lookup produce the 404
+            return super().retrieve(request, *args, **kwargs)
+
+        etag, last_modified = task_validators(request, kwargs['pk'], updated_at)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(super().retrieve(request, *args, **kwargs), etag, last_modified)
 
     def perform_create(self, serializer):
         # Automatically assign the logged-in user as the owner
-        serializer.save(owner=self.request.user)
\ No newline at end of file
+        serializer.save(owner=self.request.user)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        Create (POST), partially update (PATCH) or delete (DELETE) many tasks
+        in one transaction. Nothing is written if any item is invalid; the
+        400 response lists the errors per item, in request order.
+        """
+        if request.method == 'POST':
+            return self.bulk_create(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_destroy(request)
+
+    def bulk_create(self, request):
+        serializer = self.get_serializer(data=request.data, many=True, max_length=self.bulk_max_items)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic(using=get_owner_shard(request.user.pk)):
+            serializer.save(owner=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        # Only the user's own tasks can be targeted; other ids are "not found"
+        tasks = list(self.get_queryset().filter(pk__in=self.get_bulk_ids(request.data)))
+        serializer = self.get_serializer(tasks, data=request.data, many=True, partial=True, max_length=self.bulk_max_items)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic(using=get_owner_shard(request.user.pk)):
+            serializer.save()
+        return Response(serializer.data)
+
+    def bulk_destroy(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids:
+            raise serializers.ValidationError({'ids': ['A non-empty list of task ids is required.']})
+        if len(ids) > self.bulk_max_items:
+            raise serializers.ValidationError({'ids': [f'Ensure this field has no more than {self.bulk_max_items} elements.']})
+
+        wanted = self.get_bulk_ids([{'id': pk} for pk in ids])
+        with transaction.atomic(using=get_owner_shard(request.user.pk)):
+            queryset = self.get_queryset().filter(pk__in=wanted)
+            found = set(queryset.values_list('pk', flat=True))
+            errors = [
+                {'id': ['A valid task id is required.']} if pk is None else
+                {} if pk in found else {'id': ['Task not found.']}
+                for pk in (strict_int(value) for value in ids)
+            ]
+            if any(errors):
+                raise serializers.ValidationError({'ids': errors})
+            queryset.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def get_bulk_ids(self, items):
+        """
+        Integer ids of the items of a bulk request (invalid ids are skipped)
+        """
+        if not isinstance(items, list):
+            return []
+        ids = (strict_int(item.get('id')) for item in items if isinstance(item, dict))
+        return [pk for pk in ids if pk is not None]
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Stream all matching tasks as NDJSON (default) or CSV.
+
+        Takes the same filter, search and ordering parameters as the list;
+        pick the format with ``?format=csv`` or the Accept header.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            export_tasks(queryset, renderer.format),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="tasks.{renderer.format}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """
+        Import an uploaded CSV or NDJSON ``file``.
+
+        The format comes from the file name or a ``format`` field. Invalid
+        records are skipped and reported; send ``start`` (the ``processed``
+        count of an interrupted upload) to resume. Files larger than
+        TASK_IMPORT_INLINE_MAX_BYTES, or sent with ``Prefer: respond-async``,
+        are imported by a background job: the response is ``202 Accepted``
+        with the job's status.
+        """
+        upload = request.data.get('file')
+        if upload is None:
+            raise serializers.ValidationError({'file': ['No file was submitted.']})
+        import_format = request.data.get('format') or guess_format(upload.name)
+        if import_format not in RECORD_READERS:
+            raise serializers.ValidationError({'format': [f'Use one of: {", ".join(sorted(RECORD_READERS))}.']})
+        start = strict_int(request.data.get('start', 0))
+        if start is None or start < 0:
+            raise serializers.ValidationError({'start': ['A valid integer is required.']})
+        if prefers_async(request) or upload.size > get_import_inline_max_bytes():
+            name = save_job_file(upload.name, upload)
+            job = start_job(request, 'import', {'file': name, 'format': import_format, 'start': start})
+            return job_accepted(request, job)
+
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            result = import_tasks(lines, import_format, request.user, start)
+        except ImportFileError as exc:
+            raise serializers.ValidationError({'file': [str(exc)]})
+        except ImportInterrupted as exc:
+            return Response(
+                {'detail': 'Import interrupted, resume with start=processed.', **exc.result.as_dict()},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        finally:
+            lines.detach()
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Tasks created, updated or deleted since the ``since`` cursor.
+
+        Clients store the returned ``cursor`` and send it as ``since`` on the
+        next sync; without ``since`` every task is returned.
+        """
+        try:
+            created, updated, deleted, cursor = get_changes(
+                self.get_queryset(),
+                request.user,
+                request.query_params.get('since'),
+            )
+        except InvalidCursor:
+            raise serializers.ValidationError({'since': ['Invalid cursor.']})
+        except CursorExpired:
+            return Response(
+                {'detail': 'Cursor expired, download all tasks again.'},
+                status=status.HTTP_410_GONE,
+            )
+
+        return Response({
+            'cursor': cursor,
+            'created': self.get_serializer(created, many=True).data,
+            'updated': self.get_serializer(updated, many=True).data,
+            'deleted': deleted,
+        })
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        # Dashboard counters for the current user (unfiltered)
+        return Response(TaskStats.for_user(request.user).as_dict())
+
+
+def get_import_inline_max_bytes():
+    return getattr(settings, 'TASK_IMPORT_INLINE_MAX_BYTES', 1024 * 1024)
+
+
+def prefers_async(request):
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+
+def start_job(request, kind, payload):
+    """
+    Queue a job for the current user; over their queue limit, answer 429
+    """
+    try:
+        return enqueue(kind, request.user, payload)
+    except TooManyJobs as exc:
+        raise Throttled(detail=f'{exc}, wait for them to finish.')
+
+
+def job_accepted(request, job):
+    data = JobSerializer(job, context={'request': request}).data
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['url']})
+
+
+class JobViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Background jobs of the current user.
+
+    POST a ``kind`` to start one: ``complete`` or ``delete`` the tasks
+    matching ``filters`` (the list's filter parameters, as an object),
+    ``export`` them in ``format``, or ``delete_account``. The response is
+    ``202 Accepted`` with the job's status URL to poll. DELETE cancels a
+    job that has not started yet.
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+    # Imports start from /api/tasks/import/
+    kinds = ('complete', 'delete', 'export', 'delete_account')
+    # Per action, including session authentication (2 queries); starting
+    # a job also counts the user's pending jobs
+    query_budgets = {
+        'list': 4,
+        'retrieve': 3,
+        'create': 5,
+        'destroy': 4,
+        'download': 3,
+    }
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user).order_by('-created_at', '-id')
+
+    def create(self, request):
+        kind = request.data.get('kind')
+        if kind not in self.kinds:
+            raise serializers.ValidationError({'kind': [f'Use one of: {", ".join(self.kinds)}.']})
+        if kind == 'delete_account':
+            job = start_job(request, kind, {})
+            # Logged out everywhere until the job deletes the account
+            User.objects.filter(pk=request.user.pk).update(is_active=False)
+            return job_accepted(request, job)
+
+        filters = request.data.get('filters') or {}
+        if not isinstance(filters, dict):
+            raise serializers.ValidationError({'filters': ['Expected an object of filter parameters.']})
+        payload = {'filters': job_filter_params(filters)}
+        filterset = get_filterset(request.user, payload['filters'])
+        if not filterset.is_valid():
+            raise serializers.ValidationError({'filters': filterset.errors})
+        if kind == 'export':
+            payload['format'] = request.data.get('format') or 'ndjson'
+            if payload['format'] not in EXPORT_FORMATS:
+                raise serializers.ValidationError({'format': [f'Use one of: {", ".join(EXPORT_FORMATS)}.']})
+        return job_accepted(request, start_job(request, kind, payload))
+
+    def destroy(self, request, *args, **kwargs):
+        if not cancel_job(self.get_object()):
+            return Response({'detail': 'The job already started.'}, status=status.HTTP_409_CONFLICT)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        The file of a finished export
+        """
+        job = self.get_object()
+        if job.kind != 'export':
+            raise serializers.ValidationError({'detail': 'Only exports have a file.'})
+        if job.status != Job.Status.SUCCEEDED:
+            return Response({'detail': 'The export is not finished.'}, status=status.HTTP_409_CONFLICT)
+        return FileResponse(
+            get_storage().open(job.result['file'], 'rb'),
+            as_attachment=True,
+            filename=f'tasks.{job.result["format"]}',
+        )